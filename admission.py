@@ -0,0 +1,228 @@
+"""Admission control for the bot server: rate limits and load shedding
+
+Two things keep expensive bot moves from taking a worker down:
+
+- A token bucket per client. Each /make_move and /reset_game takes tokens
+  from the caller's bucket, more for the costly difficulties, and the
+  bucket refills at a steady rate. A request that finds too few tokens is
+  answered 429 with Retry-After before anything runs.
+- A load monitor. While the host's load average per CPU or the smoothed
+  request latency is over its threshold, the hard bot's 4x4 and 5x5
+  searches are cut down to a shallow one (see app_bot.shed_move), so the
+  server keeps answering at a lower strength instead of falling behind.
+
+Buckets live in a backend with a single method, take(). LocalBuckets keeps
+them in this process; every worker then limits on its own, which is enough
+with sticky sessions. With TIKTACTOE_REDIS_URL set, SharedBuckets keeps them
+on that server next to the games, so the limit holds across all workers.
+"""
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import g, jsonify
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from state_store import RedisClient, RedisError
+
+DEFAULT_COSTS = {'easy': 1, 'medium': 1, 'hard': 5}
+
+
+def parse_costs(value):
+    """Token cost per difficulty from e.g. 'easy=1,medium=2,hard=5'"""
+    costs = dict(DEFAULT_COSTS)
+    for item in value.split(','):
+        name, _, cost = item.partition('=')
+        if name.strip() and cost.strip():
+            costs[name.strip()] = float(cost)
+    return costs
+
+
+class LocalBuckets:
+    """Token buckets kept in this process, least recently used dropped first"""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        # Key -> (tokens, monotonic time they were counted)
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, cost, rate, burst):
+        """Take cost tokens from key's bucket.
+
+        Returns 0 if they were taken, else the seconds until there will be
+        enough; nothing is taken then.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            wait = 0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class SharedBuckets:
+    """Token buckets kept on a Redis-compatible server, shared by every worker.
+
+    A bucket is read with WATCH and GET and written back with MULTI, SET and
+    EXEC, as state_store does for games. Two workers taking from the same
+    bucket at once make one of them read it again. Buckets expire once they
+    would be full anyway. If the server can't be reached, requests are let
+    through rather than refused.
+    """
+
+    def __init__(self, client, prefix='tiktactoe:rate', attempts=5):
+        self.client = client
+        self.prefix = prefix
+        self.attempts = attempts
+
+    def take(self, key, cost, rate, burst):
+        """Take cost tokens from key's bucket, as LocalBuckets.take does"""
+        key = f'{self.prefix}:{key}'
+        # Long enough for an empty bucket to fill up again
+        ttl_ms = math.ceil(burst / rate * 1000) + 1000
+        try:
+            with self.client.connection() as conn:
+                for _ in range(self.attempts):
+                    _, stored = conn.pipeline([('WATCH', key), ('GET', key)])
+                    # Wall-clock time, since the buckets are shared between hosts
+                    now = time.time()
+                    tokens, updated = burst, now
+                    if stored is not None:
+                        tokens, updated = (float(part) for part in stored.split())
+                    tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+                    wait = 0
+                    if tokens >= cost:
+                        tokens -= cost
+                    else:
+                        wait = (cost - tokens) / rate
+                    written = conn.pipeline([
+                        ('MULTI',), ('SET', key, f'{tokens!r} {now!r}', 'PX', ttl_ms), ('EXEC',)
+                    ])[-1]
+                    if written is not None:
+                        return wait
+        except (OSError, RedisError, ValueError) as e:
+            logging.warning(f'Rate limit buckets unavailable, not limiting: {e!r}')
+            return 0
+        # Too busy to get a word in: wait as if the bucket were empty
+        return cost / rate
+
+
+def open_buckets():
+    """SharedBuckets if TIKTACTOE_REDIS_URL is set, else LocalBuckets"""
+    url = os.environ.get('TIKTACTOE_REDIS_URL')
+    if not url:
+        return LocalBuckets()
+    return SharedBuckets(RedisClient(url))
+
+
+class RateLimiter:
+    """Token bucket limits: ``rate`` tokens a second, at most ``burst`` saved"""
+
+    def __init__(self, rate=10, burst=50, costs=None, backend=None):
+        self.rate = rate
+        self.burst = burst
+        self.costs = costs or dict(DEFAULT_COSTS)
+        self.backend = backend or LocalBuckets()
+
+    @property
+    def enabled(self):
+        return self.rate > 0
+
+    def cost(self, difficulty, bot_move=True):
+        """Tokens for a request: the difficulty's cost if the bot moves, else 1"""
+        return self.costs.get(difficulty, 1) if bot_move else 1
+
+    def take(self, key, cost):
+        """Seconds the caller has to wait; 0 when the request may go ahead"""
+        if not self.enabled:
+            return 0
+        # A cost above the burst could never be paid
+        return self.backend.take(key, min(cost, self.burst), self.rate, self.burst)
+
+
+class LoadMonitor:
+    """Whether the host is too busy for full-strength searches.
+
+    ``max_load`` is the 1-minute load average per CPU and ``max_latency`` the
+    smoothed request time in seconds; 0 turns either check off.
+    """
+
+    def __init__(self, max_load=2.0, max_latency=1.0, smoothing=0.1, check_interval=1.0):
+        self.max_load = max_load
+        self.max_latency = max_latency
+        self.smoothing = smoothing
+        self.check_interval = check_interval
+        self.latency = 0.0
+        self._load = 0.0
+        self._checked = 0.0
+
+    def observe(self, seconds):
+        """Fold one request's time into the smoothed latency"""
+        self.latency += self.smoothing * (seconds - self.latency)
+
+    def load(self):
+        """Load average per CPU, read at most once per check_interval"""
+        now = time.monotonic()
+        if now - self._checked >= self.check_interval:
+            self._checked = now
+            try:
+                self._load = os.getloadavg()[0] / (os.cpu_count() or 1)
+            except (AttributeError, OSError):  # Not available on Windows
+                self._load = 0.0
+        return self._load
+
+    def overloaded(self):
+        if self.max_latency and self.latency > self.max_latency:
+            return True
+        return bool(self.max_load) and self.load() > self.max_load
+
+
+def trust_proxies(app, hops):
+    """Take the client address from X-Forwarded-For, set by ``hops`` proxies.
+
+    Behind a reverse proxy every request comes from the proxy's address, so
+    per-client limits would put all clients in one bucket. Only the last
+    ``hops`` addresses in the header are believed; clients can write the
+    rest themselves.
+    """
+    if hops > 0:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops)
+
+
+def install_load_monitor(app, monitor):
+    """Feed the time of every request to app into monitor"""
+
+    @app.before_request
+    def start_load_timer():
+        g.load_start = time.perf_counter()
+
+    @app.after_request
+    def observe_load(response):
+        start = g.pop('load_start', None)
+        if start is not None:
+            monitor.observe(time.perf_counter() - start)
+        return response
+
+
+def retry_response(status, message, retry_after):
+    """JSON refusal with Retry-After, for a request that is safe to repeat"""
+    retry_after_ms = max(1, math.ceil(retry_after * 1000))
+    response = jsonify({
+        'success': False,
+        'message': message,
+        'retry_after_ms': retry_after_ms
+    })
+    response.status_code = status
+    response.headers['Retry-After'] = str(math.ceil(retry_after_ms / 1000))
+    return response
@@ -0,0 +1,78 @@
+"""Batch move evaluation for analytics and coaching tools
+
+Runs the TikTacToeBot move logic over many positions in one pass. Each
+position is loaded into a single scratch bot, so no live game is touched.
+"""
+from bot_tables import lookup_move_score, side_to_move
+from engine import CELL_MASKS, Board
+from learned_policy import DIFFICULTIES as LEARNED_DIFFICULTIES
+
+DIFFICULTIES = ('easy', 'medium', 'hard') + LEARNED_DIFFICULTIES
+
+
+def parse_position(position):
+    """Validate one batch entry.
+
+    Returns ``(board, player, difficulty)`` or raises ValueError with a
+    message suitable for the client.
+    """
+    if not isinstance(position, dict):
+        raise ValueError('Position must be an object')
+
+    cells = position.get('board')
+    if not isinstance(cells, list) or len(cells) != 9:
+        raise ValueError('Board must be a list of 9 cells')
+    if any(cell not in ('', 'X', 'O') for cell in cells):
+        raise ValueError("Cells must be '', 'X' or 'O'")
+    board = Board.from_list(cells)
+
+    player = position.get('player', side_to_move(board))
+    if player not in ('X', 'O'):
+        raise ValueError("Player must be 'X' or 'O'")
+
+    difficulty = position.get('difficulty', 'hard')
+    if difficulty not in DIFFICULTIES:
+        raise ValueError('Difficulty must be easy, medium, hard or learned-<level>')
+
+    if board.winner() is not None or board.is_full():
+        raise ValueError('Game is already over')
+
+    return board, player, difficulty
+
+
+def evaluate_positions(positions, bot_class):
+    """Yield the bot's move and its minimax score for each position.
+
+    ``positions`` is any iterable of dicts with ``board`` (nine cells as in
+    the JSON API), optional ``player`` (side to move, inferred from the move
+    count by default) and optional ``difficulty`` (default ``'hard'``).
+    Results come out in input order, one per position, as
+    ``{'index', 'move', 'score'}`` or ``{'index', 'error'}``. Scores are from
+    the point of view of the side to move, as minimax_move computes them.
+    """
+    bot = bot_class()
+    for index, position in enumerate(positions):
+        try:
+            board, player, difficulty = parse_position(position)
+        except ValueError as e:
+            yield {'index': index, 'error': str(e)}
+            continue
+
+        bot.board = board
+        bot.bot_player = player
+        bot.human_player = 'O' if player == 'X' else 'X'
+        bot.current_player = player
+        bot.difficulty = difficulty
+        bot.move_count = board.move_count()
+
+        move = bot.choose_move()
+
+        score = None
+        if player == side_to_move(board):
+            score = lookup_move_score(board, move)
+        if score is None:
+            # Not a reachable position, search it
+            score = bot._alphabeta(board.mask(player) | CELL_MASKS[move],
+                                   board.mask(bot.human_player), 0, False)
+
+        yield {'index': index, 'move': move, 'score': score}
@@ -1,352 +1,313 @@
-from flask import Flask, render_template, request, jsonify, session
+from flask import Blueprint, Flask, current_app, request, jsonify, session
 import os
+import time
+
+from engine import Board, parse_board_settings
+from game_state import (not_modified, requested_version, state_etag, state_or_delta,
+                        with_etag)
+from game_store import InvalidGameId, invalid_game_id_response, request_game_id
+from metrics import install_metrics, record_move, serve_metrics
+from records import record_game
+from state_store import GameConflict, game_conflict_response, open_game_store
+from static_assets import install_page
+
+# The human-vs-human routes; served on their own by app below, or under
+# /human by server.py together with the bot
+human = Blueprint('human', __name__)
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-here'  # Change this to a random string
 
 
 class TikTacToe:
-    def __init__(self):
-        self.board = ['' for _ in range(9)]
+    __slots__ = ('board', 'current_player', 'game_active', 'winner', 'moves',
+                 'redo_moves', 'started_at', 'version', 'rewind_version',
+                 'recorded')
+
+    def __init__(self, size=3, win_length=None):
+        self.board = Board.empty(size, win_length)
         self.current_player = 'X'
         self.game_active = True
         self.winner = None
-
-    def reset_game(self):
-        self.board = ['' for _ in range(9)]
+        self.moves = bytearray()
+        # Moves taken back by undo, the next one to redo last
+        self.redo_moves = bytearray()
+        self.started_at = time.time()
+        # Goes up by one with every move, undo, redo and reset
+        self.version = 0
+        # Version of the last reset or undo; moves made since can be listed
+        self.rewind_version = 0
+        # Set once the finished game has gone to the record store
+        self.recorded = False
+
+    def reset_game(self, size=3, win_length=None):
+        self.board = Board.empty(size, win_length)
         self.current_player = 'X'
         self.game_active = True
         self.winner = None
+        self.moves = bytearray()
+        self.redo_moves = bytearray()
+        self.started_at = time.time()
+        self.version += 1
+        self.rewind_version = self.version
+        self.recorded = False
 
     def make_move(self, position):
-        if not self.game_active or self.board[position] != '':
+        if not 0 <= position < self.board.geometry.cells:
+            return False
+        if not self.game_active or not self.board.is_empty(position):
+            return False
+
+        # A new move starts a new line of play
+        self.redo_moves.clear()
+        self.play(position)
+        return True
+
+    def undo(self):
+        """Take back the last move; False if there is none"""
+        if not self.moves:
+            return False
+        position = self.moves.pop()
+        self.board.remove(position)
+        self.redo_moves.append(position)
+        # X moved first, so whoever made the move is to play again
+        self.current_player = 'X' if len(self.moves) % 2 == 0 else 'O'
+        self.game_active = True
+        self.winner = None
+        self.version += 1
+        self.rewind_version = self.version
+        return True
+
+    def redo(self):
+        """Play the last move taken back again; False if there is none"""
+        if not self.redo_moves:
             return False
+        self.play(self.redo_moves.pop())
+        return True
 
-        self.board[position] = self.current_player
+    def play(self, position):
+        """Put the current player's mark on an empty cell and move the game on"""
+        self.board.place(position, self.current_player)
+        self.moves.append(position)
+        self.version += 1
 
         # Check for winner
-        if self.check_winner():
+        if self.check_winner(position):
             self.game_active = False
             self.winner = self.current_player
-            return True
+            return
 
         # Check for tie
-        if '' not in self.board:
+        if self.board.is_full():
             self.game_active = False
             self.winner = 'Tie'
-            return True
+            return
 
         # Switch player
         self.current_player = 'O' if self.current_player == 'X' else 'X'
-        return True
 
-    def check_winner(self):
-        winning_combinations = [
-            [0, 1, 2], [3, 4, 5], [6, 7, 8],  # rows
-            [0, 3, 6], [1, 4, 7], [2, 5, 8],  # columns
-            [0, 4, 8], [2, 4, 6]              # diagonals
-        ]
+    def check_winner(self, position):
+        # Only the player who just moved, and only a line through the cell
+        # they took, can have completed a line
+        return self.board.geometry.wins_through(
+            self.board.mask(self.current_player), position)
 
-        for combo in winning_combinations:
-            if (self.board[combo[0]] == self.board[combo[1]] == self.board[combo[2]]
-                    and self.board[combo[0]] != ''):
-                return True
-        return False
+    def get_record(self):
+        return {
+            'mode': 'human',
+            'size': self.board.geometry.size,
+            'win_length': self.board.geometry.win_length,
+            'winner': self.winner,
+            'started_at': self.started_at,
+            'finished_at': time.time(),
+            'moves': bytes(self.moves)
+        }
 
-    def get_game_state(self):
+    def take_record(self):
+        """get_record() the first time a finished game asks; None otherwise
+
+        Undoing the last move and playing it again does not record the
+        game a second time.
+        """
+        if self.game_active or self.recorded:
+            return None
+        self.recorded = True
+        return self.get_record()
+
+    def get_status(self):
+        """Everything in the game state except the board"""
         return {
-            'board': self.board,
+            'version': self.version,
             'current_player': self.current_player,
             'game_active': self.game_active,
-            'winner': self.winner
+            'winner': self.winner,
+            'can_undo': bool(self.moves),
+            'can_redo': bool(self.redo_moves)
         }
 
-
-# Initialize game
-game = TikTacToe()
+    def get_game_state(self):
+        return {
+            'board': self.board.to_list(),
+            'size': self.board.geometry.size,
+            'win_length': self.board.geometry.win_length,
+            **self.get_status()
+        }
 
 
-@app.route('/')
-def index():
-    return render_template('index.html')
+# One game per client session or explicit game id, held by this process or,
+# with TIKTACTOE_REDIS_URL set, shared by all workers through that server
+games = open_game_store(
+    TikTacToe, 'human',
+    max_games=int(os.environ.get('TIKTACTOE_MAX_GAMES', 10000)),
+    ttl=int(os.environ.get('TIKTACTOE_GAME_TTL', 1800))
+)
+human.register_error_handler(InvalidGameId, invalid_game_id_response)
+human.register_error_handler(GameConflict, game_conflict_response)
+install_metrics(human, games, 'human')
+install_page(human, 'human')
 
 
-@app.route('/make_move', methods=['POST'])
+@human.route('/make_move', methods=['POST'])
 def make_move():
     data = request.get_json()
     position = int(data['position'])
+    since = requested_version(data)
+    game_id = request_game_id()
 
-    success = game.make_move(position)
+    with games.checkout(game_id) as game:
+        success = game.make_move(position)
+        game_state = state_or_delta(game, since)
+        record = game.take_record()
+
+    # Counted only once the move is saved; a 409 raised above counts nothing
+    record_move('human', success)
+    if record is not None:
+        record_game(record)
 
     if success:
         return jsonify({
             'success': True,
-            'game_state': game.get_game_state()
+            'game_id': game_id,
+            'game_state': game_state
         })
     else:
         return jsonify({
             'success': False,
+            'game_id': game_id,
             'message': 'Invalid move'
         })
 
 
-@app.route('/reset_game', methods=['POST'])
+@human.route('/reset_game', methods=['POST'])
 def reset_game():
-    game.reset_game()
+    data = request.get_json(silent=True)
+    size, win_length = parse_board_settings(data if isinstance(data, dict) else {})
+    game_id = request_game_id()
+    with games.checkout(game_id) as game:
+        game.reset_game(size, win_length)
+        game_state = game.get_game_state()
+
     return jsonify({
         'success': True,
-        'game_state': game.get_game_state()
+        'game_id': game_id,
+        'game_state': game_state
     })
 
 
-@app.route('/get_game_state', methods=['GET'])
-def get_game_state():
-    return jsonify(game.get_game_state())
+@human.route('/undo', methods=['POST'])
+def undo():
+    return history_move('undo')
 
 
-if __name__ == '__main__':
-    # Create templates folder if it doesn't exist
-    if not os.path.exists('templates'):
-        os.makedirs('templates')
-
-    # Create the HTML template
-    html_content = '''<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Python TikTacToe</title>
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
+@human.route('/redo', methods=['POST'])
+def redo():
+    return history_move('redo')
 
-        body {
-            font-family: 'Arial', sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            display: flex;
-            justify-content: center;
-            align-items: center;
-            color: white;
-        }
 
-        .game-container {
-            text-align: center;
-            background: rgba(255, 255, 255, 0.1);
-            backdrop-filter: blur(10px);
-            border-radius: 20px;
-            padding: 40px;
-            box-shadow: 0 8px 32px rgba(0, 0, 0, 0.3);
-            border: 1px solid rgba(255, 255, 255, 0.2);
-        }
+def history_move(action):
+    """Take back a move, or play one taken back again"""
+    data = request.get_json(silent=True)
+    since = requested_version(data)
+    game_id = request_game_id()
 
-        h1 {
-            font-size: 2.5em;
-            margin-bottom: 20px;
-            text-shadow: 2px 2px 4px rgba(0, 0, 0, 0.3);
-        }
+    with games.checkout(game_id) as game:
+        success = game.undo() if action == 'undo' else game.redo()
+        game_state = state_or_delta(game, since)
+        # A redo can end the game
+        record = game.take_record()
 
-        .game-info {
-            margin-bottom: 30px;
-            font-size: 1.2em;
-        }
+    if record is not None:
+        record_game(record)
 
-        .current-player {
-            font-weight: bold;
-            color: #ffd700;
-            text-shadow: 1px 1px 2px rgba(0, 0, 0, 0.5);
-        }
+    if not success:
+        return jsonify({
+            'success': False,
+            'game_id': game_id,
+            'message': f'Nothing to {action}'
+        })
+    return jsonify({
+        'success': True,
+        'game_id': game_id,
+        'game_state': game_state
+    })
 
-        .game-board {
-            display: grid;
-            grid-template-columns: repeat(3, 1fr);
-            gap: 10px;
-            margin: 30px auto;
-            max-width: 300px;
-        }
 
-        .cell {
-            width: 90px;
-            height: 90px;
-            background: rgba(255, 255, 255, 0.2);
-            border: 2px solid rgba(255, 255, 255, 0.3);
-            border-radius: 15px;
-            display: flex;
-            justify-content: center;
-            align-items: center;
-            font-size: 2em;
-            font-weight: bold;
-            cursor: pointer;
-            transition: all 0.3s ease;
-            backdrop-filter: blur(5px);
-        }
+@human.route('/get_game_state', methods=['GET'])
+def get_game_state():
+    game_id = request_game_id()
+    with games.checkout(game_id) as game:
+        etag = state_etag(game)
+        if request.if_none_match.contains(etag):
+            return not_modified(etag)
+        game_state = game.get_game_state()
 
-        .cell:hover {
-            background: rgba(255, 255, 255, 0.3);
-            transform: scale(1.05);
-            box-shadow: 0 4px 15px rgba(0, 0, 0, 0.2);
-        }
+    game_state['game_id'] = game_id
+    return with_etag(jsonify(game_state), etag)
 
-        .cell.disabled {
-            cursor: not-allowed;
-            opacity: 0.7;
-        }
 
-        .x { color: #ff6b6b; }
-        .o { color: #4ecdc4; }
+@human.route('/ready', methods=['GET'])
+def ready_check():
+    if not current_app.config.get('READY'):
+        return jsonify({'status': 'starting'}), 503
+    return jsonify({'status': 'ready'})
 
-        .game-status {
-            margin: 20px 0;
-            font-size: 1.3em;
-            font-weight: bold;
-            min-height: 40px;
-        }
 
-        .win-message {
-            color: #ffd700;
-            text-shadow: 2px 2px 4px rgba(0, 0, 0, 0.5);
-        }
+@human.route('/health', methods=['GET'])
+def health_check():
+    response = {
+        'status': 'healthy',
+        'active_games': len(games)
+    }
 
-        .reset-button {
-            background: linear-gradient(45deg, #ff6b6b, #ee5a52);
-            color: white;
-            border: none;
-            padding: 15px 30px;
-            font-size: 1.1em;
-            font-weight: bold;
-            border-radius: 25px;
-            cursor: pointer;
-            transition: all 0.3s ease;
-            box-shadow: 0 4px 15px rgba(0, 0, 0, 0.2);
-        }
+    game = games.peek(request_game_id(issue=False))
+    if game is not None:
+        response['game_active'] = game.game_active
+        response['current_player'] = game.current_player
+    return jsonify(response)
 
-        .reset-button:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 6px 20px rgba(0, 0, 0, 0.3);
-        }
 
-        .python-badge {
-            position: fixed;
-            top: 20px;
-            right: 20px;
-            background: #3776ab;
-            color: white;
-            padding: 10px 15px;
-            border-radius: 10px;
-            font-size: 0.9em;
-            font-weight: bold;
-        }
-    </style>
-</head>
-<body>
-    <div class="python-badge">🐍 Powered by Python Flask</div>
-    
-    <div class="game-container">
-        <h1>🎮 Python TikTacToe</h1>
-        
-        <div class="game-info">
-            Current Player: <span class="current-player" id="currentPlayer">X</span>
-        </div>
-
-        <div class="game-board" id="gameBoard">
-            <div class="cell" data-index="0" onclick="makeMove(0)"></div>
-            <div class="cell" data-index="1" onclick="makeMove(1)"></div>
-            <div class="cell" data-index="2" onclick="makeMove(2)"></div>
-            <div class="cell" data-index="3" onclick="makeMove(3)"></div>
-            <div class="cell" data-index="4" onclick="makeMove(4)"></div>
-            <div class="cell" data-index="5" onclick="makeMove(5)"></div>
-            <div class="cell" data-index="6" onclick="makeMove(6)"></div>
-            <div class="cell" data-index="7" onclick="makeMove(7)"></div>
-            <div class="cell" data-index="8" onclick="makeMove(8)"></div>
-        </div>
-
-        <div class="game-status" id="gameStatus">Make your move!</div>
-
-        <button class="reset-button" onclick="resetGame()">🔄 New Game</button>
-    </div>
-
-    <script>
-        function makeMove(position) {
-            fetch('/make_move', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({position: position})
-            })
-            .then(response => response.json())
-            .then(data => {
-                if (data.success) {
-                    updateGameDisplay(data.game_state);
-                }
-            });
-        }
+app.register_blueprint(human)
+serve_metrics(app)
 
-        function resetGame() {
-            fetch('/reset_game', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                }
-            })
-            .then(response => response.json())
-            .then(data => {
-                if (data.success) {
-                    updateGameDisplay(data.game_state);
-                }
-            });
-        }
 
-        function updateGameDisplay(gameState) {
-            const cells = document.querySelectorAll('.cell');
-            const currentPlayer = document.getElementById('currentPlayer');
-            const gameStatus = document.getElementById('gameStatus');
-
-            // Update board
-            cells.forEach((cell, index) => {
-                cell.textContent = gameState.board[index];
-                cell.className = 'cell';
-                if (gameState.board[index] !== '') {
-                    cell.classList.add(gameState.board[index].toLowerCase());
-                    cell.classList.add('disabled');
-                }
-            });
-
-            // Update current player
-            currentPlayer.textContent = gameState.current_player;
-
-            // Update game status
-            if (!gameState.game_active) {
-                if (gameState.winner === 'Tie') {
-                    gameStatus.innerHTML = '<span class="win-message">🤝 It\\'s a Tie!</span>';
-                } else {
-                    gameStatus.innerHTML = `<span class="win-message">🎉 Player ${gameState.winner} Wins!</span>`;
-                }
-            } else {
-                gameStatus.textContent = `Player ${gameState.current_player}\\'s turn`;
-            }
-        }
+def create_app(config=None):
+    """Set the app up for serving and return it.
 
-        // Load initial game state
-        fetch('/get_game_state')
-            .then(response => response.json())
-            .then(data => {
-                updateGameDisplay(data);
-            });
-    </script>
-</body>
-</html>'''
+    WSGI servers load the app through this, e.g.
+    gunicorn -c gunicorn.conf.py 'app:create_app()'
+    """
+    if not app.config.get('READY'):
+        app.secret_key = os.environ.get('TIKTACTOE_SECRET_KEY', app.secret_key)
+        if config:
+            app.config.update(config)
+        app.config['READY'] = True
+    return app
 
-    # Write the HTML template
-    with open('templates/index.html', 'w', encoding='utf-8') as f:
-        f.write(html_content)
 
+if __name__ == '__main__':
     print("🎮 Python TikTacToe Server Starting!")
-    print("📂 Created templates/index.html")
     print("🌐 Open your browser to: http://localhost:5000")
     print("🛑 Press Ctrl+C to stop the server")
 
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # Development server only; see gunicorn.conf.py for serving
+    create_app().run(debug=True, host='0.0.0.0', port=5000)
@@ -1,17 +1,110 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Blueprint, Flask, Response, current_app, request, jsonify
 import os
+import json
 import random
 import logging
 import math
 import time
 
+from admission import (LoadMonitor, RateLimiter, install_load_monitor, open_buckets,
+                       parse_costs, retry_response, trust_proxies)
+from analysis import evaluate_positions
+from bot_pool import SearchPool
+from bot_tables import compiled_move, load as load_tables
+from engine import (Board, CELL_MASKS, FULL_MASK, STANDARD, SUPPORTED_SIZES,
+                    get_geometry, has_won, iter_bits, parse_board_settings)
+from search import iterative_deepening
+from transposition import (TRANSPOSITIONS, canonicalize, from_canonical_mask,
+                           to_canonical_move)
+from learned_policy import DIFFICULTIES as LEARNED_DIFFICULTIES, LEARNED
+from log_pipeline import setup_logging
+from position_stats import build_stats, get_stats, parse_board
+from game_state import (not_modified, requested_version, state_etag, state_or_delta,
+                        with_etag)
+from game_store import InvalidGameId, invalid_game_id_response, request_game_id
+from metrics import (BOT_MOVE_SECONDS, RATE_LIMITED, SHED_MOVES, install_load_metrics,
+                     install_metrics, install_pool_metrics, install_transposition_metrics,
+                     record_move, serve_metrics)
+from records import record_game
+from state_store import GameConflict, game_conflict_response, open_game_store
+from static_assets import install_page
+
+# The human-vs-bot routes; served on their own by app below, or under /bot
+# by server.py together with the human game
+bot = Blueprint('bot', __name__)
+
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-here-bot'
 
+# Optional server-side pacing of bot replies, in milliseconds. The reply is
+# computed straight away but only revealed to the client once this much time
+# has passed, so no worker is held while the bot "thinks". With the default of
+# 0 the reply is returned immediately and the page adds the pause itself.
+BOT_PACING_MS = int(os.environ.get('TIKTACTOE_BOT_PACING_MS', 0))
+
+# /analyze batches bigger than this are streamed back as JSON lines
+ANALYZE_STREAM_THRESHOLD = 1000
+ANALYZE_MAX_POSITIONS = int(os.environ.get('TIKTACTOE_ANALYZE_MAX_POSITIONS', 100000))
+
+# Search order for minimax: center, then corners, then edges, the same
+# preference get_strategic_move uses. Strong moves first prune more.
+MOVE_ORDER = (4, 0, 2, 6, 8, 1, 3, 5, 7)
+
+# Kinds of transposition table entries for alpha-beta nodes
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Time budget and depth cap for the hard bot's search on 4x4 and 5x5 boards.
+# The classic board needs neither, its moves come from the solved table.
+SEARCH_BUDGET_MS = int(os.environ.get('TIKTACTOE_SEARCH_BUDGET_MS', 250))
+SEARCH_MAX_DEPTH = int(os.environ.get('TIKTACTOE_SEARCH_MAX_DEPTH', 0)) or None
+
+# That search runs in a pool of processes, so it does not hold up the other
+# requests. A move not back within the deadline is played by the medium
+# policy instead; with no room left in the pool, moves are refused with 503.
+# With 0 workers the search runs on the request thread.
+BOT_POOL = SearchPool(
+    workers=int(os.environ.get('TIKTACTOE_BOT_POOL_WORKERS', 2)),
+    max_pending=int(os.environ.get('TIKTACTOE_BOT_POOL_QUEUE', 8)),
+    deadline=int(os.environ.get('TIKTACTOE_BOT_DEADLINE_MS', 2 * SEARCH_BUDGET_MS)) / 1000
+)
+install_pool_metrics(BOT_POOL)
+install_transposition_metrics(TRANSPOSITIONS)
+
+# Token buckets per client for /make_move and /reset_game: RATE_LIMIT tokens
+# a second, at most RATE_BURST saved up. A move costs its difficulty's price
+# (TIKTACTOE_RATE_COSTS); a reset costs 1, or the price if the bot opens.
+# The buckets are shared by all workers when the games are.
+RATE_LIMITER = RateLimiter(
+    rate=float(os.environ.get('TIKTACTOE_RATE_LIMIT', 10)),
+    burst=float(os.environ.get('TIKTACTOE_RATE_BURST', 50)),
+    costs=parse_costs(os.environ.get('TIKTACTOE_RATE_COSTS', '')),
+    backend=open_buckets()
+)
+# 'client' limits per remote address, 'game' per game id
+RATE_LIMIT_KEY = os.environ.get('TIKTACTOE_RATE_LIMIT_KEY', 'client')
+# Reverse proxies in front of the server; the client address is then read
+# from X-Forwarded-For, as the last of these proxies saw it
+PROXY_HOPS = int(os.environ.get('TIKTACTOE_PROXY_HOPS', 0))
+
+# While the host is over either threshold, hard moves on 4x4 and 5x5 boards
+# come from a SHED_DEPTH-ply search on the request thread instead of the pool
+LOAD = LoadMonitor(
+    max_load=float(os.environ.get('TIKTACTOE_SHED_LOAD', 2.0)),
+    max_latency=int(os.environ.get('TIKTACTOE_SHED_LATENCY_MS', 1000)) / 1000
+)
+SHED_DEPTH = 2
+install_load_metrics(LOAD)
+
 
 class TikTacToeBot:
-    def __init__(self, difficulty='medium', human_symbol='X'):
-        self.board = ['' for _ in range(9)]
+    __slots__ = ('board', 'human_player', 'bot_player', 'current_player',
+                 'game_active', 'winner', 'difficulty', 'move_count',
+                 'last_bot_move', 'bot_ready_at', 'last_search',
+                 'search_nodes', 'moves', 'redo_moves', 'started_at', 'version',
+                 'rewind_version', 'recorded')
+
+    def __init__(self, difficulty='medium', human_symbol='X', size=3, win_length=None):
+        self.board = Board.empty(size, win_length)
         self.human_player = human_symbol
         self.bot_player = 'O' if human_symbol == 'X' else 'X'
         self.current_player = 'X'  # X always starts
@@ -19,9 +112,23 @@ class TikTacToeBot:
         self.winner = None
         self.difficulty = difficulty
         self.move_count = 0
-
-    def reset_game(self, difficulty='medium', human_symbol='X'):
-        self.board = ['' for _ in range(9)]
+        self.last_bot_move = None
+        self.bot_ready_at = 0
+        self.last_search = None
+        self.search_nodes = 0
+        self.moves = bytearray()
+        # Moves taken back by undo, the next one to redo last
+        self.redo_moves = bytearray()
+        self.started_at = time.time()
+        # Goes up by one with every move, undo, redo and reset
+        self.version = 0
+        # Version of the last reset or undo; moves made since can be listed
+        self.rewind_version = 0
+        # Set once the finished game has gone to the record store
+        self.recorded = False
+
+    def reset_game(self, difficulty='medium', human_symbol='X', size=3, win_length=None):
+        self.board = Board.empty(size, win_length)
         self.human_player = human_symbol
         self.bot_player = 'O' if human_symbol == 'X' else 'X'
         self.current_player = 'X'  # X always starts
@@ -29,79 +136,144 @@ class TikTacToeBot:
         self.winner = None
         self.difficulty = difficulty
         self.move_count = 0
+        self.last_bot_move = None
+        self.bot_ready_at = 0
+        self.last_search = None
+        self.moves = bytearray()
+        self.redo_moves = bytearray()
+        self.started_at = time.time()
+        self.version += 1
+        self.rewind_version = self.version
+        self.recorded = False
 
     def make_human_move(self, position):
         """Make a human move and validate it"""
+        if self.bot_pending():
+            return {'success': False, 'message': 'Bot is thinking'}
+
         if not self.game_active:
             return {'success': False, 'message': 'Game is over'}
 
-        if self.board[position] != '':
+        if not 0 <= position < self.board.geometry.cells:
+            return {'success': False, 'message': 'Invalid position'}
+
+        if not self.board.is_empty(position):
             return {'success': False, 'message': 'Cell already occupied'}
 
         if self.current_player != self.human_player:
             return {'success': False, 'message': 'Not your turn'}
 
-        # Make the move
-        self.board[position] = self.human_player
-        self.move_count += 1
-
-        # Check for winner
-        if self.check_winner():
-            self.game_active = False
-            self.winner = self.human_player
-            return {'success': True, 'game_over': True}
-
-        # Check for tie
-        if self.move_count >= 9:
-            self.game_active = False
-            self.winner = 'Tie'
-            return {'success': True, 'game_over': True}
-
-        # Switch to bot
-        self.current_player = self.bot_player
-        return {'success': True, 'game_over': False}
+        # A new move starts a new line of play
+        self.redo_moves.clear()
+        return {'success': True, 'game_over': self.play(position)}
 
-    def make_bot_move(self):
-        """Make a bot move based on difficulty"""
+    def make_bot_move(self, position=None):
+        """Make a bot move based on difficulty, or the one already chosen"""
         if not self.game_active or self.current_player != self.bot_player:
             return {'success': False, 'message': 'Not bot\'s turn'}
 
-        # Get bot move based on difficulty
-        position = None
-        if self.difficulty == 'easy':
-            position = self.get_easy_move()
-        elif self.difficulty == 'medium':
-            position = self.get_medium_move()
-        else:  # hard
-            position = self.get_hard_move()
-
+        if position is None:
+            position = self.choose_move()
         if position is None:
             return {'success': False, 'message': 'No valid moves'}
 
-        # Make the move
-        self.board[position] = self.bot_player
+        self.redo_moves.clear()
+        return {'success': True, 'game_over': self.play(position), 'position': position}
+
+    def play(self, position):
+        """Put the current player's mark on an empty cell; True if that ends the game"""
+        player = self.current_player
+        self.board.place(position, player)
         self.move_count += 1
+        self.moves.append(position)
+        self.version += 1
+        if player == self.bot_player:
+            self.last_bot_move = position
 
-        # Check for winner
-        if self.check_winner():
+        # Check for winner; only the lines through the new mark can have changed
+        if self.board.geometry.wins_through(self.board.mask(player), position):
             self.game_active = False
-            self.winner = self.bot_player
-            return {'success': True, 'game_over': True, 'position': position}
+            self.winner = player
+            return True
 
         # Check for tie
-        if self.move_count >= 9:
+        if self.board.is_full():
             self.game_active = False
             self.winner = 'Tie'
-            return {'success': True, 'game_over': True, 'position': position}
-
-        # Switch to human
+            return True
+
+        # Switch sides
+        self.current_player = self.human_player if player == self.bot_player else self.bot_player
+        return False
+
+    def is_human_move(self, index):
+        """Whether the index-th move of the game was the human's (X moves first)"""
+        return (index % 2 == 0) == (self.human_player == 'X')
+
+    def undo(self):
+        """Take back moves until the human's last one, so it is their turn again"""
+        if self.bot_pending():
+            return {'success': False, 'message': 'Bot is thinking'}
+        # The bot's opening move, when it plays X, is not the human's to take back
+        if not any(self.is_human_move(i) for i in range(len(self.moves))):
+            return {'success': False, 'message': 'Nothing to undo'}
+
+        while True:
+            position = self.moves.pop()
+            self.board.remove(position)
+            self.redo_moves.append(position)
+            if self.is_human_move(len(self.moves)):
+                break
+        self.move_count = len(self.moves)
         self.current_player = self.human_player
-        return {'success': True, 'game_over': False, 'position': position}
+        self.game_active = True
+        self.winner = None
+        # Whatever is left ends on the bot's move, if anything
+        self.last_bot_move = self.moves[-1] if self.moves else None
+        self.bot_ready_at = 0
+        self.last_search = None
+        self.version += 1
+        self.rewind_version = self.version
+        return {'success': True}
+
+    def redo(self):
+        """Play the human's move taken back last again, and the bot's reply to it"""
+        if self.bot_pending():
+            return {'success': False, 'message': 'Bot is thinking'}
+        if not self.redo_moves:
+            return {'success': False, 'message': 'Nothing to redo'}
+
+        self.play(self.redo_moves.pop())
+        while self.redo_moves and self.game_active \
+                and self.current_player == self.bot_player:
+            self.play(self.redo_moves.pop())
+        # No reply was kept when the move was taken back before the bot's
+        # search came in, so the bot makes a new one
+        if self.game_active and self.current_player == self.bot_player:
+            self.make_bot_move()
+        return {'success': True}
+
+    def choose_move(self):
+        """Pick the bot's next move based on difficulty"""
+        self.last_search = None
+        if self.difficulty in LEARNED_DIFFICULTIES:
+            return self.get_learned_move()
+        # On the classic board easy and medium play from the tables compiled
+        # in bot_tables; the methods below work moves out on bigger boards
+        if self.difficulty != 'hard' and self.board.geometry is STANDARD:
+            position = compiled_move(self.board, self.bot_player, self.difficulty)
+            if position is not None:
+                return position
+        if self.difficulty == 'easy':
+            return self.get_easy_move()
+        elif self.difficulty == 'medium':
+            return self.get_medium_move()
+        else:  # hard
+            return self.get_hard_move()
 
     def get_easy_move(self):
         """Easy bot - mostly random with occasional smart moves"""
-        available_moves = [i for i, cell in enumerate(
-            self.board) if cell == '']
+        available_moves = self.board.available_moves()
         if not available_moves:
             return None
 
@@ -128,9 +300,27 @@ class TikTacToeBot:
         # Otherwise make a strategic move
         return self.get_strategic_move()
 
+    def get_learned_move(self):
+        """Learned bot - the move its self-play checkpoint saved for this board"""
+        if self.board.geometry is STANDARD:
+            position = LEARNED.move(self.board, self.bot_player, self.difficulty)
+            if position is not None:
+                return position
+        # Checkpoints only cover the classic board
+        return self.get_medium_move()
+
     def get_hard_move(self):
-        """Hard bot - uses minimax algorithm"""
-        return self.minimax_move()
+        """Hard bot - perfect play looked up in the solved-game table"""
+        if self.board.geometry is not STANDARD:
+            return self.deepening_move()
+
+        start = time.perf_counter()
+        move = compiled_move(self.board, self.bot_player, 'hard')
+        if move is None:
+            # Not a reachable position, fall back to searching it
+            return self.minimax_move()
+        self.record_search('table', 0, start)
+        return move
 
     def get_smart_move(self):
         """Basic smart move logic"""
@@ -148,810 +338,763 @@ class TikTacToeBot:
 
     def get_strategic_move(self):
         """Strategic move selection"""
-        available_moves = [i for i, cell in enumerate(
-            self.board) if cell == '']
-        if not available_moves:
+        empty = self.board.empty_mask()
+        if not empty:
             return None
 
         # Prefer center
-        if 4 in available_moves:
-            return 4
+        center_moves = list(iter_bits(empty & self.board.geometry.center_mask))
+        if len(center_moves) == 1:
+            return center_moves[0]
+        if center_moves:
+            return random.choice(center_moves)
 
         # Prefer corners
-        corners = [0, 2, 6, 8]
-        corner_moves = [i for i in corners if i in available_moves]
+        corner_moves = list(iter_bits(empty & self.board.geometry.corners_mask))
         if corner_moves:
             return random.choice(corner_moves)
 
         # Take any available move
-        return random.choice(available_moves)
+        return random.choice(list(iter_bits(empty)))
 
     def find_winning_move(self, player):
         """Find a move that would result in a win for the given player"""
-        for i in range(9):
-            if self.board[i] == '':
-                # Try this move
-                self.board[i] = player
-                if self.check_winner():
-                    self.board[i] = ''  # Undo the move
-                    return i
-                self.board[i] = ''  # Undo the move
-        return None
+        wins = self.winning_cells(player)
+        if not wins:
+            return None
+        # Lowest index first, as a plain scan of the board would find it
+        return (wins & -wins).bit_length() - 1
+
+    def winning_cells(self, player):
+        """Mask of empty cells that would complete a line for the player"""
+        geometry = self.board.geometry
+        if geometry is not STANDARD:
+            mask = self.board.mask(player)
+            wins = 0
+            for i in iter_bits(self.board.empty_mask()):
+                if geometry.wins_through(mask | geometry.cell_masks[i], i):
+                    wins |= geometry.cell_masks[i]
+            return wins
+
+        key, symmetry = canonicalize(self.board.x, self.board.o)
+        cache_key = ('wins', key)
+        wins = TRANSPOSITIONS.get(cache_key)
+        if wins is None:
+            # Work out both players' winning cells in canonical orientation
+            x, o = key & FULL_MASK, key >> 9
+            x_wins = o_wins = 0
+            for i in iter_bits(FULL_MASK & ~(x | o)):
+                if has_won(x | CELL_MASKS[i]):
+                    x_wins |= CELL_MASKS[i]
+                if has_won(o | CELL_MASKS[i]):
+                    o_wins |= CELL_MASKS[i]
+            wins = (x_wins, o_wins)
+            TRANSPOSITIONS.put(cache_key, wins)
+        return from_canonical_mask(wins[0 if player == 'X' else 1], symmetry)
+
+    def deepening_move(self):
+        """Depth- and time-limited search for boards too big to solve"""
+        result = iterative_deepening(self.board, self.bot_player,
+                                     SEARCH_BUDGET_MS / 1000, SEARCH_MAX_DEPTH)
+        self.last_search = {
+            'source': 'deepening',
+            'nodes': result['nodes'],
+            'depth': result['depth'],
+            'elapsed_ms': result['elapsed_ms']
+        }
+        return result['move']
 
     def minimax_move(self):
-        """Use minimax algorithm to find the best move"""
+        """Use alpha-beta minimax search to find the best move (3x3 only)"""
+        start = time.perf_counter()
+        self.search_nodes = 0
         best_score = float('-inf')
         best_move = None
 
-        available_moves = [i for i, cell in enumerate(
-            self.board) if cell == '']
+        bot_mask = self.board.mask(self.bot_player)
+        human_mask = self.board.mask(self.human_player)
+        available_moves = self.board.available_moves()
+
+        # Exact scores of every move are cached per canonical position, so
+        # the same position in any orientation is only ever searched once
+        key, symmetry = canonicalize(bot_mask, human_mask)
+        cache_key = ('root', key)
+        move_scores = TRANSPOSITIONS.get(cache_key)
+        if move_scores is None:
+            move_scores = [None] * 9
+            for i in available_moves:
+                move_scores[to_canonical_move(i, symmetry)] = self._alphabeta(
+                    bot_mask | CELL_MASKS[i], human_mask, 0, False)
+            move_scores = tuple(move_scores)
+            TRANSPOSITIONS.put(cache_key, move_scores)
 
+        # Scan in index order so that, as with plain minimax, the lowest
+        # index wins ties
         for i in available_moves:
-            self.board[i] = self.bot_player
-            score = self.minimax(0, False)
-            self.board[i] = ''
+            score = move_scores[to_canonical_move(i, symmetry)]
 
             if score > best_score:
                 best_score = score
                 best_move = i
 
+        self.record_search('search', self.search_nodes, start)
         return best_move if best_move is not None else random.choice(available_moves)
 
     def minimax(self, depth, is_maximizing):
         """Minimax algorithm implementation"""
+        return self._alphabeta(self.board.mask(self.bot_player),
+                               self.board.mask(self.human_player),
+                               depth, is_maximizing)
+
+    def _alphabeta(self, bot_mask, human_mask, depth, is_maximizing,
+                   alpha=float('-inf'), beta=float('inf')):
+        """Minimax with alpha-beta pruning over the two players' masks.
+
+        Scores strictly inside (alpha, beta) are exact; anything else is only
+        a bound, which is all the caller needs to reject that branch.
+        Results are shared through the transposition table, stored as if the
+        node were at depth 0 so they can be reused at any depth.
+        """
+        self.search_nodes += 1
+
         # Check for terminal states
-        winner = self.check_winner_for_minimax()
-        if winner == self.bot_player:
+        if has_won(bot_mask):
             return 10 - depth
-        elif winner == self.human_player:
+        elif has_won(human_mask):
             return depth - 10
 
-        available_moves = [i for i, cell in enumerate(
-            self.board) if cell == '']
-
-        if not available_moves:
+        empty = FULL_MASK & ~(bot_mask | human_mask)
+        if not empty:
             return 0
 
+        key, _ = canonicalize(bot_mask, human_mask)
+        cache_key = ('node', key, is_maximizing)
+        entry = TRANSPOSITIONS.get(cache_key)
+        if entry is not None:
+            bound, score = entry[0], _score_at_depth(entry[1], depth)
+            if bound == EXACT:
+                return score
+            if bound == LOWER:
+                alpha = max(alpha, score)
+            else:
+                beta = min(beta, score)
+            if alpha >= beta:
+                return score
+        alpha_orig, beta_orig = alpha, beta
+
         if is_maximizing:
             # Bot's turn
             best_score = float('-inf')
-            for i in available_moves:
-                self.board[i] = self.bot_player
-                score = self.minimax(depth + 1, False)
-                self.board[i] = ''
+            for i in MOVE_ORDER:
+                if not empty & CELL_MASKS[i]:
+                    continue
+                score = self._alphabeta(bot_mask | CELL_MASKS[i], human_mask,
+                                        depth + 1, False, alpha, beta)
                 best_score = max(score, best_score)
-            return best_score
+                alpha = max(alpha, best_score)
+                if alpha >= beta:
+                    break
         else:
             # Human's turn
             best_score = float('inf')
-            for i in available_moves:
-                self.board[i] = self.human_player
-                score = self.minimax(depth + 1, True)
-                self.board[i] = ''
+            for i in MOVE_ORDER:
+                if not empty & CELL_MASKS[i]:
+                    continue
+                score = self._alphabeta(bot_mask, human_mask | CELL_MASKS[i],
+                                        depth + 1, True, alpha, beta)
                 best_score = min(score, best_score)
-            return best_score
+                beta = min(beta, best_score)
+                if alpha >= beta:
+                    break
+
+        if best_score <= alpha_orig:
+            bound = UPPER
+        elif best_score >= beta_orig:
+            bound = LOWER
+        else:
+            bound = EXACT
+        TRANSPOSITIONS.put(cache_key, (bound, _score_at_depth(best_score, -depth)))
+        return best_score
+
+    def record_search(self, source, nodes, start):
+        """Keep the cost of the last hard-mode move choice"""
+        self.last_search = {
+            'source': source,
+            'nodes': nodes,
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 3)
+        }
 
     def check_winner_for_minimax(self):
         """Check winner for minimax (returns player symbol or None)"""
-        winning_combinations = [
-            [0, 1, 2], [3, 4, 5], [6, 7, 8],  # rows
-            [0, 3, 6], [1, 4, 7], [2, 5, 8],  # columns
-            [0, 4, 8], [2, 4, 6]              # diagonals
-        ]
-
-        for combo in winning_combinations:
-            if (self.board[combo[0]] == self.board[combo[1]] == self.board[combo[2]]
-                    and self.board[combo[0]] != ''):
-                return self.board[combo[0]]
-        return None
+        return self.board.winner()
 
     def check_winner(self):
         """Check if there's a winner"""
         return self.check_winner_for_minimax() is not None
 
-    def get_game_state(self):
-        """Get current game state"""
+    def get_record(self):
+        """Summary of a finished game for the record store"""
         return {
-            'board': self.board,
+            'mode': 'bot',
+            'size': self.board.geometry.size,
+            'win_length': self.board.geometry.win_length,
+            'difficulty': self.difficulty,
+            'human_player': self.human_player,
+            'winner': self.winner,
+            'started_at': self.started_at,
+            'finished_at': time.time(),
+            'moves': bytes(self.moves)
+        }
+
+    def take_record(self):
+        """get_record() the first time a finished game asks; None otherwise
+
+        Undoing the last move and playing it again does not record the
+        game a second time.
+        """
+        if self.game_active or self.recorded:
+            return None
+        self.recorded = True
+        return self.get_record()
+
+    def bot_pending(self):
+        """Check if the bot's last move is still being held back by pacing"""
+        return self.bot_ready_at > 0 and time.time() < self.bot_ready_at
+
+    def get_status(self):
+        """Everything in the game state except the board and settings"""
+        if self.bot_pending():
+            # As it was before the paced bot move
+            return {
+                'version': self.version - 1,
+                'current_player': self.bot_player,
+                'game_active': True,
+                'winner': None,
+                'move_count': self.move_count - 1,
+                'bot_pending': True,
+                'retry_after_ms': max(1, math.ceil((self.bot_ready_at - time.time()) * 1000))
+            }
+        return {
+            'version': self.version,
             'current_player': self.current_player,
             'game_active': self.game_active,
             'winner': self.winner,
+            'move_count': self.move_count,
+            'can_undo': any(self.is_human_move(i) for i in range(min(2, len(self.moves)))),
+            'can_redo': bool(self.redo_moves)
+        }
+
+    def get_game_state(self):
+        """Get current game state"""
+        status = self.get_status()
+        board = self.board.to_list()
+        if status.get('bot_pending'):
+            board[self.last_bot_move] = ''
+        return {
+            'board': board,
+            'size': self.board.geometry.size,
+            'win_length': self.board.geometry.win_length,
             'difficulty': self.difficulty,
             'human_player': self.human_player,
             'bot_player': self.bot_player,
-            'move_count': self.move_count
+            **status
         }
 
 
-# Initialize game
-game = TikTacToeBot()
+def analyze_positions(positions):
+    """Evaluate a batch of positions with the bot without touching any game"""
+    return evaluate_positions(positions, TikTacToeBot)
+
+
+def _score_at_depth(score, depth):
+    """Re-express a depth-0 minimax score at another depth"""
+    if score > 0:
+        return score - depth
+    if score < 0:
+        return score + depth
+    return 0
+
+
+def sheds_search(difficulty, size):
+    """Whether the bot's search in such a game is cut short to shed load"""
+    return difficulty == 'hard' and size != 3 and LOAD.overloaded()
+
 
+def uses_search_pool(difficulty, size):
+    """Whether the bot's moves in such a game are searched in BOT_POOL"""
+    return BOT_POOL.enabled and difficulty == 'hard' and size != 3 \
+        and not LOAD.overloaded()
 
-@app.route('/')
-def index():
-    return render_template('index.html')
 
+def shed_move(game):
+    """A shallow search instead of the full one, while the host is overloaded"""
+    result = iterative_deepening(game.board, game.bot_player,
+                                 SEARCH_BUDGET_MS / 1000, SHED_DEPTH)
+    game.last_search = {
+        'source': 'shed',
+        'nodes': result['nodes'],
+        'depth': result['depth'],
+        'elapsed_ms': result['elapsed_ms']
+    }
+    SHED_MOVES.inc(game.board.geometry.size)
+    return result['move']
 
-@app.route('/make_move', methods=['POST'])
+
+def pooled_search(board, player):
+    """Search the bot's move in BOT_POOL.
+
+    Called outside games.checkout() with a copy of the board, so the wait
+    holds up neither other games nor, under a shared store, this one.
+    Returns the search for timed_bot_move(), to be made in a new checkout
+    once the game is known to be still where it was searched.
+    """
+    start = time.perf_counter()
+    result = BOT_POOL.search(board, player, SEARCH_BUDGET_MS / 1000, SEARCH_MAX_DEPTH)
+    return {'result': result, 'start': start}
+
+
+def pooled_move(game, search):
+    """The move found by pooled_search(), or the medium policy's without one"""
+    result = search['result']
+    if result is not None:
+        game.last_search = {
+            'source': 'deepening',
+            'nodes': result['nodes'],
+            'depth': result['depth'],
+            'elapsed_ms': result['elapsed_ms']
+        }
+        return result['move']
+
+    position = game.get_medium_move()
+    game.last_search = {
+        'source': 'fallback',
+        'nodes': 0,
+        'elapsed_ms': round((time.perf_counter() - search['start']) * 1000, 3)
+    }
+    return position
+
+
+def busy_response():
+    """503 for a move the search pool has no room for; safe to retry"""
+    return retry_response(503, 'Server busy, try again', BOT_POOL.deadline)
+
+
+def limited_response(route, game_id, cost):
+    """429 if the caller has run out of tokens for this request, else None"""
+    key = game_id if RATE_LIMIT_KEY == 'game' else request.remote_addr
+    wait = RATE_LIMITER.take(key, cost)
+    if not wait:
+        return None
+    RATE_LIMITED.inc(route)
+    return retry_response(429, 'Too many requests, slow down', wait)
+
+
+def timed_bot_move(game, route, game_id, search=None):
+    """Make the bot's move and log what it cost.
+
+    ``search`` is the pooled_search() for the move, if it was searched in
+    the pool; its time counts towards the cost.
+    """
+    start = time.perf_counter() if search is None else search['start']
+    position = None
+    if search is not None:
+        position = pooled_move(game, search)
+    elif sheds_search(game.difficulty, game.board.geometry.size):
+        position = shed_move(game)
+    bot_result = game.make_bot_move(position)
+    elapsed = time.perf_counter() - start
+    BOT_MOVE_SECONDS.observe(elapsed, game.difficulty, game.board.geometry.size)
+    fields = {
+        'route': route,
+        'game_id': game_id,
+        'difficulty': game.difficulty,
+        'bot_move': bot_result.get('position'),
+        'search_ms': round(elapsed * 1000, 3)
+    }
+    if game.last_search is not None:
+        fields['search_source'] = game.last_search['source']
+        fields['search_nodes'] = game.last_search['nodes']
+    logging.info('Bot move', extra=fields)
+    return bot_result
+
+
+def opening_reply(game, game_id, search=None):
+    """Make the bot's opening move as X; returns the game state"""
+    bot_result = timed_bot_move(game, 'reset_game', game_id, search)
+    game_state = game.get_game_state()
+    if bot_result['success']:
+        game_state['bot_move'] = bot_result.get('position')
+        if game.last_search is not None:
+            game_state['bot_search'] = game.last_search
+    return game_state
+
+
+def bot_reply(game, since, route, game_id, search=None):
+    """Make the bot's move in reply to the human's; returns the game state"""
+    bot_result = timed_bot_move(game, route, game_id, search)
+
+    if bot_result['success'] and BOT_PACING_MS > 0:
+        game.bot_ready_at = time.time() + BOT_PACING_MS / 1000
+
+    game_state = state_or_delta(game, since)
+    if bot_result['success'] and not game.bot_pending():
+        game_state['bot_move'] = bot_result.get('position')
+        if game.last_search is not None:
+            game_state['bot_search'] = game.last_search
+    return game_state
+
+
+# One game per client session or explicit game id, held by this process or,
+# with TIKTACTOE_REDIS_URL set, shared by all workers through that server
+games = open_game_store(
+    TikTacToeBot, 'bot',
+    max_games=int(os.environ.get('TIKTACTOE_MAX_GAMES', 10000)),
+    ttl=int(os.environ.get('TIKTACTOE_GAME_TTL', 1800))
+)
+bot.register_error_handler(InvalidGameId, invalid_game_id_response)
+bot.register_error_handler(GameConflict, game_conflict_response)
+install_metrics(bot, games, 'bot')
+install_page(bot, 'bot')
+install_load_monitor(bot, LOAD)
+
+
+@bot.route('/make_move', methods=['POST'])
 def make_move():
     """Handle human move and bot response"""
+    game_id = request_game_id()
     try:
         data = request.get_json()
-        logging.info(f"Received move request: {data}")
+        logging.info('Received move request', extra={
+            'route': 'make_move', 'game_id': game_id, 'position': data.get('position')
+        })
         position = int(data['position'])
-
-        # Validate position
-        if position < 0 or position > 8:
-            return jsonify({
-                'success': False,
-                'message': 'Invalid position'
-            })
-
-        # Make human move
-        result = game.make_human_move(position)
-
+        since = requested_version(data)
+
+        # Charged at the price of the game's difficulty; a new game is medium
+        current = games.peek(game_id)
+        limited = limited_response('make_move', game_id, RATE_LIMITER.cost(
+            current.difficulty if current is not None else 'medium'))
+        if limited is not None:
+            return limited
+
+        with games.checkout(game_id) as game:
+            pooled = uses_search_pool(game.difficulty, game.board.geometry.size)
+            # Refuse before the human move is made, so a retry is safe
+            if pooled and not BOT_POOL.has_capacity():
+                return busy_response()
+
+            # Make human move
+            result = game.make_human_move(position)
+            bot_turn = False
+            record = None
+
+            if result['success']:
+                game_state = state_or_delta(game, since)
+
+                # If game is still active and it's bot's turn, make bot move.
+                # The reply is computed right away; any "thinking" pause happens
+                # in the browser or through pacing, never on this thread.
+                bot_turn = game.game_active and game.current_player == game.bot_player
+                if bot_turn and pooled:
+                    searched_version = game.version
+                    board = Board(game.board.x, game.board.o, game.board.geometry)
+                    bot_player = game.bot_player
+                elif bot_turn:
+                    game_state = bot_reply(game, since, 'make_move', game_id)
+
+                record = game.take_record()
+
+        # Counted only once the move is saved; a 409 raised above counts nothing
+        record_move('bot', result['success'])
         if not result['success']:
             return jsonify(result)
 
-        game_state = game.get_game_state()
+        if bot_turn and pooled:
+            # The human move is saved; search with the game let go
+            search = pooled_search(board, bot_player)
+            with games.checkout(game_id) as game:
+                # Unless the game was undone or reset meanwhile
+                if game.version == searched_version:
+                    game_state = bot_reply(game, since, 'make_move', game_id, search)
+                    record = game.take_record()
+                else:
+                    game_state = state_or_delta(game, since)
 
-        # If game is still active and it's bot's turn, make bot move
-        if game.game_active and game.current_player == game.bot_player:
-            # Add small delay for better UX (simulate thinking)
-            time.sleep(0.3)
-            bot_result = game.make_bot_move()
-            game_state = game.get_game_state()
-
-            if bot_result['success']:
-                game_state['bot_move'] = bot_result.get('position')
+        if record is not None:
+            record_game(record)
 
         return jsonify({
             'success': True,
+            'game_id': game_id,
             'game_state': game_state
         })
 
+    except GameConflict:
+        raise
     except Exception as e:
-        logging.error(f"Error in /make_move endpoint: {e}", exc_info=True)
+        logging.error(f"Error in /make_move endpoint: {e}", exc_info=True,
+                      extra={'route': 'make_move', 'game_id': game_id})
         return jsonify({
             'success': False,
             'message': f'Error: {str(e)}'
         })
 
 
-@app.route('/reset_game', methods=['POST'])
+@bot.route('/reset_game', methods=['POST'])
 def reset_game():
     """Reset the game with new settings"""
+    game_id = request_game_id()
     try:
         data = request.get_json()
-        logging.info(f"Received reset_game request: {data}")
+        logging.info('Received reset_game request', extra={
+            'route': 'reset_game', 'game_id': game_id,
+            'difficulty': data.get('difficulty'), 'human_symbol': data.get('human_symbol'),
+            'size': data.get('size')
+        })
         difficulty = data.get('difficulty', 'medium')
         human_symbol = data.get('human_symbol', 'X')
+        size, win_length = parse_board_settings(data)
 
         # Validate inputs
-        if difficulty not in ['easy', 'medium', 'hard']:
+        if difficulty not in ['easy', 'medium', 'hard'] and not LEARNED.available(difficulty):
             difficulty = 'medium'
         if human_symbol not in ['X', 'O']:
             human_symbol = 'X'
 
-        game.reset_game(difficulty, human_symbol)
+        limited = limited_response('reset_game', game_id, RATE_LIMITER.cost(
+            difficulty, bot_move=human_symbol == 'O'))
+        if limited is not None:
+            return limited
 
-        game_state = game.get_game_state()
+        # The bot opens as X, so it needs room in the search pool
+        pooled = human_symbol == 'O' and uses_search_pool(difficulty, size)
+        if pooled and not BOT_POOL.has_capacity():
+            return busy_response()
+
+        with games.checkout(game_id) as game:
+            game.reset_game(difficulty, human_symbol, size, win_length)
 
-        # If bot is 'X', it should make the first move right away
-        if game.game_active and game.current_player == game.bot_player:
-            bot_result = game.make_bot_move()
             game_state = game.get_game_state()
-            if bot_result['success']:
-                game_state['bot_move'] = bot_result.get('position')
+            reset_version = game.version
+            board = Board(game.board.x, game.board.o, game.board.geometry)
+
+            # If bot is 'X', it should make the first move right away
+            if not pooled and game.game_active and game.current_player == game.bot_player:
+                game_state = opening_reply(game, game_id)
+
+        if pooled:
+            # As in make_move, the pool searches with the game let go
+            search = pooled_search(board, 'X')
+            with games.checkout(game_id) as game:
+                if game.version == reset_version:
+                    game_state = opening_reply(game, game_id, search)
+                else:
+                    game_state = game.get_game_state()
 
         return jsonify({
             'success': True,
+            'game_id': game_id,
             'game_state': game_state
         })
 
+    except GameConflict:
+        raise
     except Exception as e:
-        logging.error(f"Error in /reset_game endpoint: {e}", exc_info=True)
+        logging.error(f"Error in /reset_game endpoint: {e}", exc_info=True,
+                      extra={'route': 'reset_game', 'game_id': game_id})
         return jsonify({
             'success': False,
             'message': f'Error: {str(e)}'
         })
 
 
-@app.route('/get_game_state', methods=['GET'])
-def get_game_state():
-    """Get current game state"""
-    return jsonify(game.get_game_state())
-
-
-@app.route('/health', methods=['GET'])
-def health_check():
-    """Health check endpoint"""
-    return jsonify({
-        'status': 'healthy',
-        'game_active': game.game_active,
-        'current_player': game.current_player
-    })
-
-
-if __name__ == '__main__':
-    # Configure basic logging to write to a file
-    logging.basicConfig(
-        filename='log.txt',
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s'
-    )
-
-    # Create templates folder if it doesn't exist
-    if not os.path.exists('templates'):
-        os.makedirs('templates')
-
-    # Create the HTML template
-    html_content = '''<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>TikTacToe vs Bot</title>
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-
-        body {
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            display: flex;
-            justify-content: center;
-            align-items: center;
-            color: white;
-            padding: 20px;
-        }
-
-        .game-container {
-            text-align: center;
-            background: rgba(255, 255, 255, 0.1);
-            backdrop-filter: blur(10px);
-            border-radius: 20px;
-            padding: 40px;
-            box-shadow: 0 8px 32px rgba(0, 0, 0, 0.3);
-            border: 1px solid rgba(255, 255, 255, 0.2);
-            max-width: 500px;
-            width: 100%;
-        }
-
-        h1 {
-            font-size: 2.5em;
-            margin-bottom: 30px;
-            text-shadow: 2px 2px 4px rgba(0, 0, 0, 0.3);
-            background: linear-gradient(45deg, #fff, #f0f0f0);
-            -webkit-background-clip: text;
-            -webkit-text-fill-color: transparent;
-        }
-
-        .controls {
-            display: grid;
-            grid-template-columns: 1fr 1fr;
-            gap: 20px;
-            margin-bottom: 30px;
-        }
-
-        .control-group {
-            text-align: left;
-        }
-
-        .control-group label {
-            display: block;
-            margin-bottom: 8px;
-            font-weight: bold;
-            color: #e0e0e0;
-            font-size: 1.1em;
-        }
-
-        .control-group select {
-            width: 100%;
-            background: rgba(255, 255, 255, 0.2);
-            border: 1px solid rgba(255, 255, 255, 0.3);
-            border-radius: 10px;
-            padding: 12px 15px;
-            color: white;
-            font-size: 1em;
-            cursor: pointer;
-            transition: all 0.3s ease;
-        }
-
-        .control-group select:hover {
-            background: rgba(255, 255, 255, 0.3);
-        }
-
-        .control-group select option {
-            background: #2c3e50;
-            color: white;
-            padding: 10px;
-        }
+@bot.route('/undo', methods=['POST'])
+def undo():
+    """Take back the human's last move and the bot's reply to it"""
+    return history_move('undo')
 
-        .player-info {
-            display: flex;
-            justify-content: space-between;
-            margin-bottom: 20px;
-            padding: 20px;
-            background: rgba(255, 255, 255, 0.1);
-            border-radius: 15px;
-            border: 2px solid transparent;
-            transition: all 0.3s ease;
-        }
 
-        .player-info.current-turn {
-            border-color: rgba(255, 255, 255, 0.5);
-            background: rgba(255, 255, 255, 0.2);
-        }
+@bot.route('/redo', methods=['POST'])
+def redo():
+    """Play the human's move taken back last again, with the bot's reply"""
+    return history_move('redo')
 
-        .player {
-            text-align: center;
-            flex: 1;
-        }
-
-        .player-label {
-            font-size: 1em;
-            opacity: 0.9;
-            margin-bottom: 8px;
-            font-weight: bold;
-        }
-
-        .player-symbol {
-            font-size: 2.5em;
-            font-weight: bold;
-            text-shadow: 2px 2px 4px rgba(0, 0, 0, 0.3);
-        }
-
-        .human { color: #e74c3c; }
-        .bot { color: #3498db; }
-
-        .vs-divider {
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            font-size: 1.5em;
-            font-weight: bold;
-            color: #f39c12;
-            margin: 0 20px;
-        }
-
-        .game-board {
-            display: grid;
-            grid-template-columns: repeat(3, 1fr);
-            gap: 12px;
-            margin: 30px auto;
-            max-width: 320px;
-            padding: 20px;
-            background: rgba(255, 255, 255, 0.05);
-            border-radius: 20px;
-        }
 
-        .cell {
-            width: 90px;
-            height: 90px;
-            background: rgba(255, 255, 255, 0.2);
-            border: 2px solid rgba(255, 255, 255, 0.3);
-            border-radius: 15px;
-            display: flex;
-            justify-content: center;
-            align-items: center;
-            font-size: 2.5em;
-            font-weight: bold;
-            cursor: pointer;
-            transition: all 0.3s ease;
-            backdrop-filter: blur(5px);
-        }
-
-        .cell:hover:not(.disabled) {
-            background: rgba(255, 255, 255, 0.4);
-            transform: scale(1.1);
-            box-shadow: 0 8px 25px rgba(0, 0, 0, 0.3);
-        }
-
-        .cell.disabled {
-            cursor: not-allowed;
-            opacity: 0.7;
-        }
-
-        .cell.thinking {
-            background: rgba(52, 152, 219, 0.4);
-            animation: pulse 1.5s infinite;
-        }
-
-        @keyframes pulse {
-            0%, 100% { opacity: 0.7; transform: scale(1); }
-            50% { opacity: 1; transform: scale(1.05); }
-        }
-
-        .cell.x { color: #e74c3c; text-shadow: 2px 2px 4px rgba(0, 0, 0, 0.5); }
-        .cell.o { color: #3498db; text-shadow: 2px 2px 4px rgba(0, 0, 0, 0.5); }
-
-        .game-status {
-            margin: 25px 0;
-            font-size: 1.4em;
-            font-weight: bold;
-            min-height: 50px;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            padding: 15px;
-            background: rgba(255, 255, 255, 0.1);
-            border-radius: 10px;
-        }
-
-        .win-message {
-            color: #f39c12;
-            text-shadow: 2px 2px 4px rgba(0, 0, 0, 0.5);
-            font-size: 1.2em;
-        }
-
-        .bot-thinking {
-            color: #3498db;
-            font-style: italic;
-            animation: thinking 2s infinite;
-        }
-
-        @keyframes thinking {
-            0%, 100% { opacity: 1; }
-            50% { opacity: 0.7; }
-        }
-
-        .controls-buttons {
-            display: flex;
-            gap: 15px;
-            justify-content: center;
-            flex-wrap: wrap;
-            margin-top: 20px;
-        }
-
-        .button {
-            background: linear-gradient(45deg, #e74c3c, #c0392b);
-            color: white;
-            border: none;
-            padding: 15px 25px;
-            font-size: 1em;
-            font-weight: bold;
-            border-radius: 25px;
-            cursor: pointer;
-            transition: all 0.3s ease;
-            box-shadow: 0 4px 15px rgba(0, 0, 0, 0.2);
-            min-width: 120px;
-        }
-
-        .button:hover {
-            transform: translateY(-3px);
-            box-shadow: 0 8px 25px rgba(0, 0, 0, 0.3);
-        }
-
-        .button:active {
-            transform: translateY(-1px);
-        }
+def history_move(action):
+    """Undo or redo from the game's move history.
 
-        .button.secondary {
-            background: linear-gradient(45deg, #95a5a6, #7f8c8d);
-        }
+    No search runs for either, except for a redo whose bot reply was never
+    kept; TikTacToeBot.redo() makes that one on the spot.
+    """
+    game_id = request_game_id()
+    try:
+        data = request.get_json(silent=True)
+        since = requested_version(data)
+        logging.info(f'Received {action} request', extra={'route': action, 'game_id': game_id})
+
+        with games.checkout(game_id) as game:
+            result = game.undo() if action == 'undo' else game.redo()
+            if not result['success']:
+                return jsonify(result)
+            game_state = state_or_delta(game, since)
+            # A redo can end the game
+            record = game.take_record()
+
+        if record is not None:
+            record_game(record)
+        return jsonify({
+            'success': True,
+            'game_id': game_id,
+            'game_state': game_state
+        })
 
-        .stats {
-            display: flex;
-            justify-content: space-around;
-            margin-top: 20px;
-            padding: 15px;
-            background: rgba(255, 255, 255, 0.1);
-            border-radius: 10px;
-            font-size: 0.9em;
-        }
+    except GameConflict:
+        raise
+    except Exception as e:
+        logging.error(f"Error in /{action} endpoint: {e}", exc_info=True,
+                      extra={'route': action, 'game_id': game_id})
+        return jsonify({
+            'success': False,
+            'message': f'Error: {str(e)}'
+        })
 
-        .stat-item {
-            text-align: center;
-        }
 
-        .stat-value {
-            font-size: 1.5em;
-            font-weight: bold;
-            color: #f39c12;
-        }
+@bot.route('/get_game_state', methods=['GET'])
+def get_game_state():
+    """Get current game state"""
+    game_id = request_game_id()
+    with games.checkout(game_id) as game:
+        etag = state_etag(game)
+        if request.if_none_match.contains(etag):
+            return not_modified(etag)
+        game_state = game.get_game_state()
 
-        .difficulty-indicator {
-            position: fixed;
-            top: 20px;
-            right: 20px;
-            padding: 10px 15px;
-            border-radius: 10px;
-            font-weight: bold;
-            font-size: 0.9em;
-            box-shadow: 0 4px 15px rgba(0, 0, 0, 0.2);
-        }
+    game_state['game_id'] = game_id
+    return with_etag(jsonify(game_state), etag)
 
-        .difficulty-easy { background: #27ae60; color: white; }
-        .difficulty-medium { background: #f39c12; color: white; }
-        .difficulty-hard { background: #e74c3c; color: white; }
 
-        .loading {
-            opacity: 0.7;
-            pointer-events: none;
-        }
+@bot.route('/ready', methods=['GET'])
+def ready_check():
+    """Readiness check: 503 until create_app() has finished"""
+    if not current_app.config.get('READY'):
+        return jsonify({'status': 'starting'}), 503
+    return jsonify({'status': 'ready'})
 
-        @media (max-width: 600px) {
-            .game-container {
-                padding: 20px;
-            }
-            
-            .controls {
-                grid-template-columns: 1fr;
-            }
-            
-            .cell {
-                width: 70px;
-                height: 70px;
-                font-size: 2em;
-            }
-            
-            .game-board {
-                max-width: 250px;
-            }
-        }
-    </style>
-</head>
-<body>
-    <div class="difficulty-indicator" id="difficultyIndicator">Medium</div>
-    
-    <div class="game-container">
-        <h1>🎮 TikTacToe vs Bot</h1>
-        
-        <div class="controls">
-            <div class="control-group">
-                <label for="difficulty">🎯 Difficulty:</label>
-                <select id="difficulty" onchange="changeDifficulty()">
-                    <option value="easy">🟢 Easy - Random</option>
-                    <option value="medium" selected>🟡 Medium - Smart</option>
-                    <option value="hard">🔴 Hard - Unbeatable</option>
-                </select>
-            </div>
-            
-            <div class="control-group">
-                <label for="humanSymbol">🎲 Your Symbol:</label>
-                <select id="humanSymbol" onchange="changeSymbol()">
-                    <option value="X" selected>❌ X (First)</option>
-                    <option value="O">⭕ O (Second)</option>
-                </select>
-            </div>
-        </div>
-        
-        <div class="player-info" id="playerInfo">
-            <div class="player">
-                <div class="player-label">👤 You</div>
-                <div class="player-symbol human" id="humanSymbolDisplay">❌</div>
-            </div>
-            <div class="vs-divider">VS</div>
-            <div class="player">
-                <div class="player-label">🤖 Bot</div>
-                <div class="player-symbol bot" id="botSymbolDisplay">⭕</div>
-            </div>
-        </div>
-
-        <div class="game-board" id="gameBoard">
-            <div class="cell" data-index="0" onclick="makeMove(0)"></div>
-            <div class="cell" data-index="1" onclick="makeMove(1)"></div>
-            <div class="cell" data-index="2" onclick="makeMove(2)"></div>
-            <div class="cell" data-index="3" onclick="makeMove(3)"></div>
-            <div class="cell" data-index="4" onclick="makeMove(4)"></div>
-            <div class="cell" data-index="5" onclick="makeMove(5)"></div>
-            <div class="cell" data-index="6" onclick="makeMove(6)"></div>
-            <div class="cell" data-index="7" onclick="makeMove(7)"></div>
-            <div class="cell" data-index="8" onclick="makeMove(8)"></div>
-        </div>
-
-        <div class="game-status" id="gameStatus">🎯 Your turn! Make your move.</div>
-
-        <div class="controls-buttons">
-            <button class="button" onclick="resetGame()">🔄 New Game</button>
-            <button class="button secondary" onclick="toggleControls()">⚙️ Settings</button>
-        </div>
-    </div>
-
-    <script>
-        let isWaitingForBot = false;
-        let gameStats = { wins: 0, losses: 0, ties: 0 };
-        let controlsVisible = true;
-
-        function makeMove(position) {
-            if (isWaitingForBot) {
-                console.log('Waiting for bot, ignoring move');
-                return;
-            }
-            
-            const gameStatus = document.getElementById('gameStatus');
-            const gameContainer = document.querySelector('.game-container');
-            
-            // Show loading state
-            isWaitingForBot = true;
-            gameContainer.classList.add('loading');
-            
-            fetch('/make_move', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({position: position})
-            })
-            .then(response => response.json())
-            .then(data => {
-                if (data.success) {
-                    updateGameDisplay(data.game_state);
-                    if (data.game_state.bot_move !== undefined) {
-                        highlightLastMove(data.game_state.bot_move);
-                    }
-                } else {
-                    gameStatus.textContent = data.message;
-                }
-            })
-            .catch(error => {
-                console.error('Error:', error);
-                gameStatus.textContent = 'Error making move. Please try again.';
-            })
-            .finally(() => {
-                isWaitingForBot = false;
-                gameContainer.classList.remove('loading');
-            });
-        }
 
-        function resetGame() {
-            const difficulty = document.getElementById('difficulty').value;
-            const humanSymbol = document.getElementById('humanSymbol').value;
-            
-            fetch('/reset_game', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({
-                    difficulty: difficulty,
-                    human_symbol: humanSymbol
-                })
-            })
-            .then(response => response.json())
-            .then(data => {
-                if (data.success) {
-                    updateGameDisplay(data.game_state);
-                    clearHighlights();
-                } else {
-                    console.error('Error resetting game:', data.message);
-                }
-            })
-            .catch(error => {
-                console.error('Error:', error);
-            });
-        }
+@bot.route('/health', methods=['GET'])
+def health_check():
+    """Health check endpoint"""
+    response = {
+        'status': 'healthy',
+        'active_games': len(games)
+    }
+
+    # Report on the caller's game only if it already exists
+    game = games.peek(request_game_id(issue=False))
+    if game is not None:
+        response['game_active'] = game.game_active
+        response['current_player'] = game.current_player
+    return jsonify(response)
+
+
+@bot.route('/analyze', methods=['POST'])
+def analyze():
+    """Evaluate a batch of positions"""
+    data = request.get_json(silent=True)
+    positions = data.get('positions') if isinstance(data, dict) else None
+    if not isinstance(positions, list):
+        return jsonify({
+            'success': False,
+            'message': 'Expected a list of positions'
+        }), 400
+    if len(positions) > ANALYZE_MAX_POSITIONS:
+        return jsonify({
+            'success': False,
+            'message': f'At most {ANALYZE_MAX_POSITIONS} positions per request'
+        }), 413
 
-        function changeDifficulty() {
-            const difficulty = document.getElementById('difficulty').value;
-            const indicator = document.getElementById('difficultyIndicator');
-            
-            // Update indicator
-            indicator.className = `difficulty-indicator difficulty-${difficulty}`;
-            indicator.textContent = difficulty.charAt(0).toUpperCase() + difficulty.slice(1);
-            
-            // Reset game with new difficulty
-            resetGame();
-        }
+    logging.info('Received analyze request',
+                 extra={'route': 'analyze', 'positions': len(positions)})
+    results = analyze_positions(positions)
 
-        function changeSymbol() {
-            resetGame();
-        }
+    # Large batches are streamed as one JSON object per line
+    if len(positions) > ANALYZE_STREAM_THRESHOLD or request.args.get('stream') == '1':
+        return Response(
+            (json.dumps(result) + '\n' for result in results),
+            mimetype='application/x-ndjson'
+        )
 
-        function toggleControls() {
-            const controls = document.querySelector('.controls');
-            controlsVisible = !controlsVisible;
-            controls.style.display = controlsVisible ? 'grid' : 'none';
-            
-            const btn = document.querySelector('.button.secondary');
-            btn.textContent = controlsVisible ? '🔼 Hide Settings' : '⚙️ Settings';
-        }
+    return jsonify({
+        'success': True,
+        'results': list(results)
+    })
 
-        function highlightLastMove(position) {
-            // Remove previous highlights
-            clearHighlights();
-            
-            // Highlight the last move
-            const cell = document.querySelector(`[data-index="${position}"]`);
-            if (cell) {
-                cell.style.background = 'rgba(52, 152, 219, 0.4)';
-                setTimeout(() => {
-                    cell.style.background = '';
-                }, 2000);
-            }
-        }
 
-        function clearHighlights() {
-            const cells = document.querySelectorAll('.cell');
-            cells.forEach(cell => {
-                cell.style.background = '';
-            });
-        }
+@bot.route('/stats', methods=['GET'])
+def position_stats():
+    """Perfect-play outcome and blunder chances for a classic board"""
+    try:
+        board = parse_board(request.args.get('board', '.' * 9))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
 
-        function updateGameDisplay(gameState) {
-            const cells = document.querySelectorAll('.cell');
-            const gameStatus = document.getElementById('gameStatus');
-            const playerInfo = document.getElementById('playerInfo');
-            const humanSymbolDisplay = document.getElementById('humanSymbolDisplay');
-            const botSymbolDisplay = document.getElementById('botSymbolDisplay');
-
-            // Update player symbols
-            humanSymbolDisplay.textContent = gameState.human_player === 'X' ? '❌' : '⭕';
-            botSymbolDisplay.textContent = gameState.bot_player === 'X' ? '❌' : '⭕';
-
-            // Update board
-            cells.forEach((cell, index) => {
-                const symbol = gameState.board[index];
-                if (symbol === 'X') {
-                    cell.textContent = '❌';
-                    cell.className = 'cell x';
-                } else if (symbol === 'O') {
-                    cell.textContent = '⭕';
-                    cell.className = 'cell o';
-                } else {
-                    cell.textContent = '';
-                    cell.className = 'cell';
-                }
-                
-                // Disable cells that are occupied or if game is over
-                if (symbol !== '' || !gameState.game_active) {
-                    cell.classList.add('disabled');
-                } else {
-                    cell.classList.remove('disabled');
-                }
-            });
-
-            // Update game status
-            if (!gameState.game_active) {
-                if (gameState.winner === 'Tie') {
-                    gameStatus.innerHTML = '<span class="win-message">🤝 It\\\'s a Tie!</span>';
-                } else {
-                    const winnerText = gameState.winner === gameState.human_player ? 'You' : 'Bot';
-                    gameStatus.innerHTML = `<span class="win-message">🎉 ${winnerText} Win!</span>`;
-                }
-                playerInfo.classList.remove('current-turn');
-            } else {
-                if (gameState.current_player === gameState.human_player) {
-                    gameStatus.textContent = '🎯 Your turn! Make your move.';
-                    playerInfo.classList.add('current-turn');
-                } else {
-                    gameStatus.innerHTML = '<span class="bot-thinking">🤖 Bot is thinking...</span>';
-                    playerInfo.classList.remove('current-turn');
-                }
-            }
-        }
+    stats = get_stats()
+    if stats is None:
+        return jsonify({
+            'success': False,
+            'message': 'Position statistics are not available'
+        }), 503
+    result = stats.lookup(board)
+    if result is None:
+        return jsonify({
+            'success': False,
+            'message': 'No game can reach this position'
+        }), 400
+
+    response = jsonify({'success': True, 'board': board.to_list(), **result})
+    # The statistics never change while the file stays the same
+    response.headers['Cache-Control'] = 'public, max-age=86400'
+    return response
+
+
+app.register_blueprint(bot)
+serve_metrics(app)
+
+
+def create_app(config=None):
+    """Set the app up for serving and return it.
+
+    WSGI servers load the app through this, e.g.
+    gunicorn -c gunicorn.conf.py 'app_bot:create_app()'
+
+    With a preloading server this runs once, before the workers are forked,
+    so the solved-game tables and board geometries built here are shared by
+    every worker instead of being built again in each, and a missing
+    position statistics file is built once. server.py leaves the tables to
+    the first bot move instead.
+    """
+    if not app.config.get('READY'):
+        app.secret_key = os.environ.get('TIKTACTOE_SECRET_KEY', app.secret_key)
+        if config:
+            app.config.update(config)
+        # Log as JSON lines to log.txt from a background thread
+        setup_logging()
+        trust_proxies(app, PROXY_HOPS)
+        # Solve the classic board and build the bigger boards' masks
+        for size in SUPPORTED_SIZES:
+            get_geometry(size)
+        # The file /stats reads, unless it was built ahead of time
+        build_stats()
+        app.config['READY'] = len(load_tables()['HARD_TABLE']) > 0
+    return app
 
-        // Initial setup
-        document.addEventListener('DOMContentLoaded', () => {
-            // Load initial game state
-            fetch('/get_game_state')
-                .then(response => response.json())
-                .then(data => {
-                    updateGameDisplay(data);
-                    // Set initial state from server
-                    document.getElementById('difficulty').value = data.difficulty;
-                    document.getElementById('humanSymbol').value = data.human_player;
-                    changeDifficulty(); // Update indicator
-                });
-        });
-    </script>
-</body>
-</html>'''
-
-    # Write the HTML template to a file
-    template_path = os.path.join('templates', 'index.html')
-    with open(template_path, 'w', encoding='utf-8') as f:
-        f.write(html_content)
 
+if __name__ == '__main__':
+    create_app()
     logging.info("Server starting up...")
     print("🎮 TikTacToe Bot Server Starting!")
-    print(f"📂 Created/Updated {template_path}")
     print("🌐 Open your browser to: http://localhost:5001")
     print("🛑 Press Ctrl+C to stop the server")
 
+    # Development server only; see gunicorn.conf.py for serving
     app.run(debug=True, host='0.0.0.0', port=5001)
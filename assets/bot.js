@@ -0,0 +1,282 @@
+// API URLs are relative to the page, which may be served under a prefix
+let isWaitingForBot = false;
+let gameStats = { wins: 0, losses: 0, ties: 0 };
+let controlsVisible = true;
+
+// Pause before showing the bot's reply (simulate thinking)
+const BOT_THINK_MS = 300;
+
+function showBotMove(gameState) {
+    // Show the board without the bot's reply, then reveal it
+    const beforeBot = Object.assign({}, gameState, {
+        board: gameState.board.slice(),
+        current_player: gameState.bot_player,
+        game_active: true
+    });
+    beforeBot.board[gameState.bot_move] = '';
+    updateGameDisplay(beforeBot);
+
+    return new Promise(resolve => setTimeout(resolve, BOT_THINK_MS))
+        .then(() => {
+            updateGameDisplay(gameState);
+            highlightLastMove(gameState.bot_move);
+        });
+}
+
+function waitForBotMove(gameState) {
+    // Server-side pacing: poll until the bot's reply is revealed
+    updateGameDisplay(gameState);
+
+    return new Promise(resolve => setTimeout(resolve, gameState.retry_after_ms))
+        .then(() => fetch('get_game_state'))
+        .then(response => response.json())
+        .then(data => {
+            if (data.bot_pending) {
+                return waitForBotMove(data);
+            }
+            updateGameDisplay(data);
+            const botMove = data.board.findIndex(
+                (cell, index) => cell !== gameState.board[index]);
+            if (botMove !== -1) {
+                highlightLastMove(botMove);
+            }
+        });
+}
+
+function makeMove(position) {
+    if (isWaitingForBot) {
+        console.log('Waiting for bot, ignoring move');
+        return;
+    }
+    
+    const gameStatus = document.getElementById('gameStatus');
+    const gameContainer = document.querySelector('.game-container');
+    
+    // Show loading state
+    isWaitingForBot = true;
+    gameContainer.classList.add('loading');
+    
+    fetch('make_move', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({position: position})
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            if (data.game_state.bot_pending) {
+                return waitForBotMove(data.game_state);
+            }
+            if (data.game_state.bot_move !== undefined) {
+                return showBotMove(data.game_state);
+            }
+            updateGameDisplay(data.game_state);
+        } else {
+            gameStatus.textContent = data.message;
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        gameStatus.textContent = 'Error making move. Please try again.';
+    })
+    .finally(() => {
+        isWaitingForBot = false;
+        gameContainer.classList.remove('loading');
+    });
+}
+
+function resetGame() {
+    const difficulty = document.getElementById('difficulty').value;
+    const humanSymbol = document.getElementById('humanSymbol').value;
+    const size = parseInt(document.getElementById('boardSize').value, 10);
+    
+    fetch('reset_game', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            difficulty: difficulty,
+            human_symbol: humanSymbol,
+            size: size
+        })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            updateGameDisplay(data.game_state);
+            clearHighlights();
+            // Learned levels without a checkpoint on the server play medium
+            document.getElementById('difficulty').value = data.game_state.difficulty;
+        } else {
+            console.error('Error resetting game:', data.message);
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+    });
+}
+
+function historyMove(action) {
+    // Undo takes back your last move and the bot's reply; redo plays them again
+    if (isWaitingForBot) {
+        return;
+    }
+    fetch(action, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({})
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            updateGameDisplay(data.game_state);
+            clearHighlights();
+        } else {
+            document.getElementById('gameStatus').textContent = data.message;
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+    });
+}
+
+function changeDifficulty() {
+    const difficulty = document.getElementById('difficulty').value;
+    const indicator = document.getElementById('difficultyIndicator');
+    
+    // Update indicator
+    indicator.className = `difficulty-indicator difficulty-${difficulty}`;
+    indicator.textContent = difficulty.charAt(0).toUpperCase() + difficulty.slice(1);
+    
+    // Reset game with new difficulty
+    resetGame();
+}
+
+function changeSymbol() {
+    resetGame();
+}
+
+function toggleControls() {
+    const controls = document.querySelector('.controls');
+    controlsVisible = !controlsVisible;
+    controls.style.display = controlsVisible ? 'grid' : 'none';
+    
+    const btn = document.querySelector('.button.secondary');
+    btn.textContent = controlsVisible ? '🔼 Hide Settings' : '⚙️ Settings';
+}
+
+function highlightLastMove(position) {
+    // Remove previous highlights
+    clearHighlights();
+    
+    // Highlight the last move
+    const cell = document.querySelector(`[data-index="${position}"]`);
+    if (cell) {
+        cell.style.background = 'rgba(52, 152, 219, 0.4)';
+        setTimeout(() => {
+            cell.style.background = '';
+        }, 2000);
+    }
+}
+
+function clearHighlights() {
+    const cells = document.querySelectorAll('.cell');
+    cells.forEach(cell => {
+        cell.style.background = '';
+    });
+}
+
+function ensureBoard(size) {
+    // Rebuild the grid when the board size changes
+    const board = document.getElementById('gameBoard');
+    if (board.children.length === size * size) {
+        return;
+    }
+    board.innerHTML = '';
+    board.dataset.size = size;
+    for (let i = 0; i < size * size; i++) {
+        const cell = document.createElement('div');
+        cell.className = 'cell';
+        cell.dataset.index = i;
+        cell.onclick = () => makeMove(i);
+        board.appendChild(cell);
+    }
+}
+
+function updateGameDisplay(gameState) {
+    ensureBoard(gameState.size || 3);
+    const cells = document.querySelectorAll('.cell');
+    const gameStatus = document.getElementById('gameStatus');
+    const playerInfo = document.getElementById('playerInfo');
+    const humanSymbolDisplay = document.getElementById('humanSymbolDisplay');
+    const botSymbolDisplay = document.getElementById('botSymbolDisplay');
+
+    // Undo and redo are only offered when there is something to take back
+    document.getElementById('undoButton').disabled = !gameState.can_undo;
+    document.getElementById('redoButton').disabled = !gameState.can_redo;
+
+    // Update player symbols
+    humanSymbolDisplay.textContent = gameState.human_player === 'X' ? '❌' : '⭕';
+    botSymbolDisplay.textContent = gameState.bot_player === 'X' ? '❌' : '⭕';
+
+    // Update board
+    cells.forEach((cell, index) => {
+        const symbol = gameState.board[index];
+        if (symbol === 'X') {
+            cell.textContent = '❌';
+            cell.className = 'cell x';
+        } else if (symbol === 'O') {
+            cell.textContent = '⭕';
+            cell.className = 'cell o';
+        } else {
+            cell.textContent = '';
+            cell.className = 'cell';
+        }
+        
+        // Disable cells that are occupied or if game is over
+        if (symbol !== '' || !gameState.game_active) {
+            cell.classList.add('disabled');
+        } else {
+            cell.classList.remove('disabled');
+        }
+    });
+
+    // Update game status
+    if (!gameState.game_active) {
+        if (gameState.winner === 'Tie') {
+            gameStatus.innerHTML = '<span class="win-message">🤝 It\'s a Tie!</span>';
+        } else {
+            const winnerText = gameState.winner === gameState.human_player ? 'You' : 'Bot';
+            gameStatus.innerHTML = `<span class="win-message">🎉 ${winnerText} Win!</span>`;
+        }
+        playerInfo.classList.remove('current-turn');
+    } else {
+        if (gameState.current_player === gameState.human_player) {
+            gameStatus.textContent = '🎯 Your turn! Make your move.';
+            playerInfo.classList.add('current-turn');
+        } else {
+            gameStatus.innerHTML = '<span class="bot-thinking">🤖 Bot is thinking...</span>';
+            playerInfo.classList.remove('current-turn');
+        }
+    }
+}
+
+// Initial setup
+document.addEventListener('DOMContentLoaded', () => {
+    // Load initial game state
+    fetch('get_game_state')
+        .then(response => response.json())
+        .then(data => {
+            updateGameDisplay(data);
+            // Set initial state from server
+            document.getElementById('difficulty').value = data.difficulty;
+            document.getElementById('humanSymbol').value = data.human_player;
+            document.getElementById('boardSize').value = data.size;
+            changeDifficulty(); // Update indicator
+        });
+});
@@ -0,0 +1,193 @@
+// Remote play: set once this page has joined a rooms.py room
+const ROOMS_URL = document.querySelector('meta[name="rooms-url"]').content ||
+    `${location.protocol}//${location.hostname}:5002`;
+let room = null;
+
+// API URLs are relative to the page, which may be served under a prefix
+function makeMove(position) {
+    if (room) {
+        roomRequest('move', {position: position});
+        return;
+    }
+    fetch('make_move', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({position: position})
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            updateGameDisplay(data.game_state);
+        }
+    });
+}
+
+function resetGame() {
+    const size = parseInt(document.getElementById('boardSize').value, 10);
+    if (room) {
+        roomRequest('reset', {size: size});
+        return;
+    }
+    fetch('reset_game', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({size: size})
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            updateGameDisplay(data.game_state);
+        }
+    });
+}
+
+function historyMove(action) {
+    // Not offered in rooms; both players would have to agree to take a move back
+    if (room) {
+        return;
+    }
+    fetch(action, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({})
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            updateGameDisplay(data.game_state);
+        }
+    });
+}
+
+function ensureBoard(size) {
+    // Rebuild the grid when the board size changes
+    const board = document.getElementById('gameBoard');
+    if (board.children.length === size * size) {
+        return;
+    }
+    board.innerHTML = '';
+    board.dataset.size = size;
+    for (let i = 0; i < size * size; i++) {
+        const cell = document.createElement('div');
+        cell.className = 'cell';
+        cell.dataset.index = i;
+        cell.onclick = () => makeMove(i);
+        board.appendChild(cell);
+    }
+}
+
+function updateGameDisplay(gameState) {
+    ensureBoard(gameState.size || 3);
+    document.getElementById('boardSize').value = gameState.size || 3;
+    const cells = document.querySelectorAll('.cell');
+    const currentPlayer = document.getElementById('currentPlayer');
+    const gameStatus = document.getElementById('gameStatus');
+
+    // Update board
+    cells.forEach((cell, index) => {
+        cell.textContent = gameState.board[index];
+        cell.className = 'cell';
+        if (gameState.board[index] !== '') {
+            cell.classList.add(gameState.board[index].toLowerCase());
+            cell.classList.add('disabled');
+        }
+    });
+
+    // Room states carry neither flag, so the buttons stay off there
+    document.getElementById('undoButton').disabled = !gameState.can_undo;
+    document.getElementById('redoButton').disabled = !gameState.can_redo;
+
+    // Update current player
+    currentPlayer.textContent = gameState.current_player;
+
+    // Update game status
+    if (!gameState.game_active) {
+        if (gameState.winner === 'Tie') {
+            gameStatus.innerHTML = '<span class="win-message">🤝 It\'s a Tie!</span>';
+        } else {
+            gameStatus.innerHTML = `<span class="win-message">🎉 Player ${gameState.winner} Wins!</span>`;
+        }
+    } else {
+        gameStatus.textContent = `Player ${gameState.current_player}\'s turn`;
+    }
+}
+
+function roomRequest(action, body) {
+    // Moves only go to the server; the new state arrives on the event stream
+    return fetch(`${ROOMS_URL}/rooms/${room.id}/${action}`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({...body, token: room.token})
+    }).then(response => response.json());
+}
+
+function createRoom() {
+    fetch(`${ROOMS_URL}/rooms`, {method: 'POST'})
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                history.replaceState(null, '', `?room=${data.room_id}`);
+                joinRoom(data.room_id);
+            }
+        });
+}
+
+function joinRoom(roomId) {
+    // Keep the seat across reloads of this tab
+    const saved = sessionStorage.getItem(`room-${roomId}`);
+    fetch(`${ROOMS_URL}/rooms/${roomId}/join`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({token: saved})
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (!data.success) {
+            document.getElementById('roomStatus').textContent = 'This room no longer exists.';
+            return;
+        }
+        room = {id: roomId, player: data.player, token: data.token};
+        if (data.token) {
+            sessionStorage.setItem(`room-${roomId}`, data.token);
+        }
+        document.getElementById('onlineButton').style.display = 'none';
+        const events = new EventSource(`${ROOMS_URL}/rooms/${roomId}/events`);
+        events.addEventListener('state', event => {
+            const state = JSON.parse(event.data);
+            updateGameDisplay(state.game_state);
+            showRoomStatus(state);
+        });
+    });
+}
+
+function showRoomStatus(state) {
+    const status = document.getElementById('roomStatus');
+    const link = `${location.origin}${location.pathname}?room=${encodeURIComponent(room.id)}`;
+    let seat = room.player ? `You are playing ${room.player}.` : 'You are watching.';
+    if (!state.players.O) {
+        seat += ' Waiting for a second player.';
+    }
+    status.innerHTML = `${seat} Invite: <a href="${link}">${link}</a>`;
+}
+
+// Load initial game state, or join the room in the link
+const roomParam = new URLSearchParams(location.search).get('room');
+if (roomParam) {
+    joinRoom(roomParam);
+} else {
+    fetch('get_game_state')
+        .then(response => response.json())
+        .then(data => {
+            updateGameDisplay(data);
+        });
+}
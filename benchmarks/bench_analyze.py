@@ -0,0 +1,55 @@
+"""Throughput benchmark for batch position analysis
+
+Evaluates a batch of random reachable positions per difficulty, first by
+calling app_bot.analyze_positions directly and then through the /analyze
+endpoint (Flask test client, streamed response).
+
+    python benchmarks/bench_analyze.py --positions 50000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app_bot  # noqa: E402
+from bot_tables import HARD_TABLE  # noqa: E402
+from engine import Board  # noqa: E402
+
+
+def random_positions(count, difficulty, seed):
+    rng = random.Random(seed)
+    boards = [Board.from_key(key).to_list() for key in HARD_TABLE]
+    return [{'board': rng.choice(boards), 'difficulty': difficulty}
+            for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--positions', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    client = app_bot.app.test_client()
+    for difficulty in ('easy', 'medium', 'hard'):
+        positions = random_positions(args.positions, difficulty, args.seed)
+
+        start = time.perf_counter()
+        results = list(app_bot.analyze_positions(positions))
+        direct = time.perf_counter() - start
+        assert len(results) == len(positions)
+
+        start = time.perf_counter()
+        response = client.post('/analyze?stream=1', json={'positions': positions})
+        lines = response.get_data().count(b'\n')
+        http = time.perf_counter() - start
+        assert lines == len(positions)
+
+        print(f'{difficulty:>6}: {len(positions) / direct:>10,.0f} positions/s direct, '
+              f'{len(positions) / http:>10,.0f} positions/s via /analyze')
+
+
+if __name__ == '__main__':
+    main()
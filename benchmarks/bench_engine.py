@@ -0,0 +1,105 @@
+"""Microbenchmark: list-of-strings board vs the bitboard engine
+
+Times the per-move work both apps do (place a mark, check for a winner,
+check for a tie) and the bot's move generation, on the old list board and on
+engine.Board.
+
+    python benchmarks/bench_engine.py
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import Board, CELL_MASKS, has_won  # noqa: E402
+
+
+def legacy_check_winner(board):
+    """The check_winner the apps used before the engine existed"""
+    winning_combinations = [
+        [0, 1, 2], [3, 4, 5], [6, 7, 8],  # rows
+        [0, 3, 6], [1, 4, 7], [2, 5, 8],  # columns
+        [0, 4, 8], [2, 4, 6]              # diagonals
+    ]
+
+    for combo in winning_combinations:
+        if (board[combo[0]] == board[combo[1]] == board[combo[2]]
+                and board[combo[0]] != ''):
+            return True
+    return False
+
+
+def legacy_find_winning_move(board, player):
+    for i in range(9):
+        if board[i] == '':
+            board[i] = player
+            if legacy_check_winner(board):
+                board[i] = ''
+                return i
+            board[i] = ''
+    return None
+
+
+def legacy_game(moves):
+    board = ['' for _ in range(9)]
+    player = 'X'
+    for position in moves:
+        if board[position] != '':
+            continue
+        board[position] = player
+        if legacy_check_winner(board) or '' not in board:
+            break
+        [i for i, cell in enumerate(board) if cell == '']
+        legacy_find_winning_move(board, player)
+        player = 'O' if player == 'X' else 'X'
+
+
+def engine_game(moves):
+    board = Board()
+    player = 'X'
+    for position in moves:
+        if not board.is_empty(position):
+            continue
+        board.place(position, player)
+        mask = board.mask(player)
+        if has_won(mask) or board.is_full():
+            break
+        board.available_moves()
+        for i in board.available_moves():
+            if has_won(mask | CELL_MASKS[i]):
+                break
+        player = 'O' if player == 'X' else 'X'
+
+
+def main():
+    rng = random.Random(0)
+    games = []
+    for _ in range(2000):
+        order = list(range(9))
+        rng.shuffle(order)
+        games.append(order)
+    plies = 0
+    for order in games:
+        board = Board()
+        player = 'X'
+        for position in order:
+            board.place(position, player)
+            plies += 1
+            if board.winner() or board.is_full():
+                break
+            player = 'O' if player == 'X' else 'X'
+
+    results = {}
+    for name, play in (('list board', legacy_game), ('bitboard', engine_game)):
+        elapsed = min(timeit.repeat(lambda: [play(g) for g in games],
+                                    number=1, repeat=5))
+        results[name] = elapsed
+        print(f'{name:>10}: {elapsed / plies * 1e6:7.3f} us/move '
+              f'({plies / elapsed:,.0f} moves/s)')
+    print(f'   speedup: {results["list board"] / results["bitboard"]:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
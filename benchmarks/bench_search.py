@@ -0,0 +1,72 @@
+"""Search cost per hard-mode move: plain minimax vs alpha-beta
+
+Counts nodes and time for the exhaustive search the bot used to run and for
+the current alpha-beta search with center/corner-first ordering and the
+symmetry-aware transposition table, over the positions at each move number.
+
+    python benchmarks/bench_search.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app_bot import TikTacToeBot  # noqa: E402
+from bot_tables import HARD_TABLE, side_to_move  # noqa: E402
+from engine import CELL_MASKS, FULL_MASK, Board, has_won, iter_bits  # noqa: E402
+
+
+def plain_minimax(bot_mask, human_mask, depth, is_maximizing, counter):
+    counter[0] += 1
+    if has_won(bot_mask):
+        return 10 - depth
+    if has_won(human_mask):
+        return depth - 10
+    empty = FULL_MASK & ~(bot_mask | human_mask)
+    if not empty:
+        return 0
+    if is_maximizing:
+        return max(plain_minimax(bot_mask | CELL_MASKS[i], human_mask, depth + 1, False, counter)
+                   for i in iter_bits(empty))
+    return min(plain_minimax(bot_mask, human_mask | CELL_MASKS[i], depth + 1, True, counter)
+               for i in iter_bits(empty))
+
+
+def main():
+    by_moves = {}
+    for key in HARD_TABLE:
+        board = Board.from_key(key)
+        by_moves.setdefault(board.move_count(), []).append(board)
+
+    print('moves  positions   plain nodes   ab nodes   plain ms    ab ms')
+    for moves in sorted(by_moves):
+        boards = by_moves[moves][:50]
+        plain_nodes = ab_nodes = 0
+        plain_time = ab_time = 0.0
+        for board in boards:
+            bot_symbol = side_to_move(board)
+            human_symbol = 'O' if bot_symbol == 'X' else 'X'
+
+            counter = [0]
+            start = time.perf_counter()
+            for i in board.available_moves():
+                plain_minimax(board.mask(bot_symbol) | CELL_MASKS[i],
+                              board.mask(human_symbol), 0, False, counter)
+            plain_time += time.perf_counter() - start
+            plain_nodes += counter[0]
+
+            bot = TikTacToeBot(difficulty='hard', human_symbol=human_symbol)
+            bot.board = board.copy()
+            start = time.perf_counter()
+            bot.minimax_move()
+            ab_time += time.perf_counter() - start
+            ab_nodes += bot.last_search['nodes']
+
+        n = len(boards)
+        print(f'{moves:>5}  {n:>9}  {plain_nodes / n:>12,.0f}  {ab_nodes / n:>9,.0f}'
+              f'  {plain_time / n * 1000:>9.2f}  {ab_time / n * 1000:>7.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""/health latency while hard 5x5 bot moves are being computed
+
+Runs app_bot in-process with several threads playing hard 5x5 games and one
+thread timing /health, as a threaded server worker would. Compares the
+search running on the request threads (--pool-workers 0) with the search
+running in the bot pool.
+
+    python benchmarks/health_under_load.py
+    python benchmarks/health_under_load.py --players 8 --pool-workers 4
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Every player here comes from one client address; measure /health, not the
+# rate limiter (set TIKTACTOE_RATE_LIMIT to try it, refusals are counted)
+os.environ.setdefault('TIKTACTOE_RATE_LIMIT', '0')
+os.environ.setdefault('TIKTACTOE_RATE_LIMIT_KEY', 'game')
+
+import app_bot  # noqa: E402
+from bot_pool import SearchPool  # noqa: E402
+
+
+def play(client, game_id, stop, moves, refused):
+    client.post('/reset_game', json={'game_id': game_id, 'difficulty': 'hard', 'size': 5})
+    while not stop.is_set():
+        state = client.get(f'/get_game_state?game_id={game_id}').get_json()
+        empty = [i for i, cell in enumerate(state['board']) if not cell]
+        if not state['game_active'] or not empty:
+            client.post('/reset_game', json={'game_id': game_id, 'difficulty': 'hard', 'size': 5})
+            continue
+        response = client.post('/make_move', json={'game_id': game_id, 'position': empty[0]})
+        if response.status_code == 200:
+            moves.append(1)
+        elif response.status_code in (429, 503):
+            refused.append(1)
+            time.sleep(response.get_json()['retry_after_ms'] / 1000)
+
+
+def run(players, pool_workers, seconds):
+    app_bot.BOT_POOL = SearchPool(workers=pool_workers, max_pending=4 * max(1, pool_workers),
+                                  deadline=app_bot.BOT_POOL.deadline)
+    client = app_bot.app.test_client()
+    stop = threading.Event()
+    moves = []
+    refused = []
+    threads = [threading.Thread(target=play, args=(app_bot.app.test_client(), f'load-{i}', stop,
+                                                   moves, refused))
+               for i in range(players)]
+    for thread in threads:
+        thread.start()
+
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        client.get('/health')
+        latencies.append((time.perf_counter() - start) * 1000)
+        time.sleep(0.01)
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+    app_bot.BOT_POOL.shutdown()
+
+    latencies.sort()
+    print(f'pool workers {pool_workers}: {len(moves) / seconds:.1f} bot moves/s '
+          f'({len(refused)} refused), '
+          f'/health p50 {statistics.median(latencies):.1f} ms, '
+          f'p99 {latencies[int(len(latencies) * 0.99)]:.1f} ms, '
+          f'max {latencies[-1]:.1f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--players', type=int, default=4)
+    parser.add_argument('--pool-workers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    run(args.players, 0, args.seconds)
+    run(args.players, args.pool_workers, args.seconds)
+
+
+if __name__ == '__main__':
+    main()
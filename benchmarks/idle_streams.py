@@ -0,0 +1,117 @@
+"""Idle event streams: memory and push latency of one rooms.py process
+
+Starts rooms.py in a child process, opens many event streams spread over
+rooms of 50 watchers each, and reports the server's resident memory per
+open stream. It then plays one move in every room and times how long it
+takes until every stream has received the new state.
+
+    python benchmarks/idle_streams.py --streams 10000
+
+Both processes need an open file limit (ulimit -n) above --streams.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rooms  # noqa: E402
+
+PER_ROOM = 50
+
+
+def run_server(port):
+    asyncio.run(rooms.serve('127.0.0.1', port))
+
+
+def resident_memory(pid):
+    with open(f'/proc/{pid}/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+async def call(port, method, path, payload=None):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps(payload).encode() if payload is not None else b''
+    writer.write(f'{method} {path} HTTP/1.1\r\nHost: bench\r\n'
+                 f'Content-Length: {len(body)}\r\n\r\n'.encode() + body)
+    response = await reader.read()
+    writer.close()
+    return json.loads(response.partition(b'\r\n\r\n')[2])
+
+
+async def open_stream(port, room_id):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'GET /rooms/{room_id}/events HTTP/1.1\r\nHost: bench\r\n\r\n'.encode())
+    await reader.readuntil(b'\r\n\r\n')
+    await reader.readuntil(b'\n\n')  # retry
+    await reader.readuntil(b'\n\n')  # current state
+    return reader, writer
+
+
+async def wait_for_version(reader, version):
+    while True:
+        block = await reader.readuntil(b'\n\n')
+        if block.startswith(f'id: {version}\n'.encode()):
+            return
+
+
+async def bench(port, pid, streams):
+    for _ in range(100):
+        try:
+            await call(port, 'GET', '/health')
+            break
+        except OSError:
+            await asyncio.sleep(0.05)
+    baseline = resident_memory(pid)
+
+    room_ids, tokens = [], []
+    for _ in range((streams + PER_ROOM - 1) // PER_ROOM):
+        room_id = (await call(port, 'POST', '/rooms'))['room_id']
+        room_ids.append(room_id)
+        tokens.append((await call(port, 'POST', f'/rooms/{room_id}/join'))['token'])
+
+    start = time.perf_counter()
+    connections = []
+    for i in range(0, streams, 500):
+        connections += await asyncio.gather(*(
+            open_stream(port, room_ids[j // PER_ROOM]) for j in range(i, min(i + 500, streams))))
+    opened = time.perf_counter() - start
+    memory = resident_memory(pid) - baseline
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call(port, 'POST', f'/rooms/{room_id}/move',
+                                {'token': token, 'position': 4})
+                           for room_id, token in zip(room_ids, tokens)))
+    # Version 1 was the join; the move is version 2
+    await asyncio.gather(*(wait_for_version(reader, 2) for reader, _ in connections))
+    pushed = time.perf_counter() - start
+
+    for _, writer in connections:
+        writer.close()
+
+    print(f'{streams:,} streams in {len(room_ids):,} rooms opened in {opened:.2f}s')
+    print(f'server memory: {memory / 2 ** 20:.1f} MiB, '
+          f'{memory / streams / 1024:.1f} KiB per stream')
+    print(f'one move per room pushed to every stream in {pushed * 1000:.0f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--streams', type=int, default=10000)
+    parser.add_argument('--port', type=int, default=5099)
+    args = parser.parse_args()
+
+    server = multiprocessing.Process(target=run_server, args=(args.port,), daemon=True)
+    server.start()
+    try:
+        asyncio.run(bench(args.port, server.pid, args.streams))
+    finally:
+        server.terminate()
+
+
+if __name__ == '__main__':
+    main()
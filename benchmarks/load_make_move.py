@@ -0,0 +1,145 @@
+"""Load test: /make_move throughput of a single worker
+
+Plays many concurrent games against app_bot through the Flask test client on
+one thread, which stands in for one worker thread. Throughput is measured as
+moves per second of time spent inside requests, i.e. the rate one worker can
+sustain when it is never idle. Games whose bot reply is still held back by
+pacing are skipped until it is ready, just as a worker would serve other
+clients in the meantime.
+
+    python benchmarks/load_make_move.py
+    python benchmarks/load_make_move.py --pacing-ms 300
+    python benchmarks/load_make_move.py --legacy-sleep 0.3   # old behaviour
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Every game here comes from one client address; measure the moves, not the
+# rate limiter (set TIKTACTOE_RATE_LIMIT to try it, refusals are counted)
+os.environ.setdefault('TIKTACTOE_RATE_LIMIT', '0')
+os.environ.setdefault('TIKTACTOE_RATE_LIMIT_KEY', 'game')
+
+import app_bot  # noqa: E402
+
+
+def install_legacy_sleep(seconds):
+    """Recreate the old time.sleep before every bot reply"""
+    make_bot_move = app_bot.TikTacToeBot.make_bot_move
+
+    def sleepy_make_bot_move(self, position=None):
+        time.sleep(seconds)
+        return make_bot_move(self, position)
+
+    app_bot.TikTacToeBot.make_bot_move = sleepy_make_bot_move
+
+
+def run(moves, games, difficulty, seed):
+    rng = random.Random(seed)
+    client = app_bot.app.test_client()
+    game_ids = [f'load-{i}' for i in range(games)]
+    boards = {}
+    ready_at = dict.fromkeys(game_ids, 0.0)
+
+    refused = 0
+
+    def timed(method, path, **kwargs):
+        """The reply's JSON, or None if it was refused (429 or 503), and its time"""
+        nonlocal refused
+        start = time.perf_counter()
+        response = getattr(client, method)(path, **kwargs)
+        elapsed = time.perf_counter() - start
+        data = response.get_json()
+        if response.status_code in (429, 503):
+            refused += 1
+            # Come back to this game once the server says to retry
+            ready_at[kwargs['json']['game_id']] = time.time() + data['retry_after_ms'] / 1000
+            return None, elapsed
+        return data, elapsed
+
+    busy = 0.0
+    for game_id in game_ids:
+        data, elapsed = timed('post', '/reset_game', json={
+            'game_id': game_id, 'difficulty': difficulty, 'human_symbol': 'X'})
+        boards[game_id] = data['game_state']['board'] if data else None
+        busy += elapsed
+
+    done = 0
+    errors = 0
+    while done < moves:
+        now = time.time()
+        game_id = rng.choice(game_ids)
+        if ready_at[game_id] > now:
+            continue
+
+        board = boards[game_id]
+        if board is None:
+            data, elapsed = timed('get', f'/get_game_state?game_id={game_id}')
+            busy += elapsed
+            if data.get('bot_pending'):
+                ready_at[game_id] = now + data['retry_after_ms'] / 1000
+                continue
+            board = boards[game_id] = data['board']
+
+        empty = [i for i, cell in enumerate(board) if cell == '']
+        if not empty:
+            data, elapsed = timed('post', '/reset_game', json={
+                'game_id': game_id, 'difficulty': difficulty})
+            busy += elapsed
+            if data is not None:
+                boards[game_id] = data['game_state']['board']
+            continue
+
+        data, elapsed = timed('post', '/make_move', json={
+            'game_id': game_id, 'position': rng.choice(empty)})
+        busy += elapsed
+        if data is None:
+            continue
+        done += 1
+        if not data['success']:
+            errors += 1
+            boards[game_id] = None
+            continue
+
+        state = data['game_state']
+        if state.get('bot_pending'):
+            ready_at[game_id] = time.time() + state['retry_after_ms'] / 1000
+            boards[game_id] = None
+        elif state['game_active']:
+            boards[game_id] = state['board']
+        else:
+            boards[game_id] = ['X'] * 9  # finished, reset on next visit
+
+    return done, errors, refused, busy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--moves', type=int, default=2000)
+    parser.add_argument('--games', type=int, default=200)
+    parser.add_argument('--difficulty', default='hard',
+                        choices=['easy', 'medium', 'hard'])
+    parser.add_argument('--pacing-ms', type=int, default=0,
+                        help='enable server-side pacing of bot replies')
+    parser.add_argument('--legacy-sleep', type=float, default=0,
+                        help='sleep this long before every bot reply')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    app_bot.BOT_PACING_MS = args.pacing_ms
+    if args.legacy_sleep:
+        install_legacy_sleep(args.legacy_sleep)
+        args.moves = min(args.moves, 20)
+
+    done, errors, refused, busy = run(args.moves, args.games, args.difficulty, args.seed)
+    print(f'{done} moves ({errors} rejected, {refused} more refused with 429/503) '
+          f'in {busy:.3f}s of worker time')
+    print(f'{done / busy:,.0f} moves/s per worker, '
+          f'{busy / done * 1000:.2f} ms per move')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,319 @@
+"""Replay real traffic from log.txt and game records against either app
+
+Sessions, one per game a client played, are read from:
+
+- app_bot.py logs: the JSON lines written by log_pipeline.py, and the plain
+  text lines of older logs ("... - INFO - Received move request:
+  {'position': 0}" and the access lines of GET /get_game_state). Requests
+  are grouped by game id; old lines carry none, so there each reset starts
+  a new session.
+- game record stores (records.py): each finished game becomes a reset and
+  the human's moves, spread evenly over the time the game took.
+
+Every session is replayed by its own client with its own game id. It starts
+at its original offset from the first session, and keeps the gaps between
+its requests, both divided by --speedup (0 sends as fast as replies come
+back). At most --concurrency sessions run at once. --repeat N replays N
+copies, shifted so they spread over the original time window. A recorded
+move whose cell the bot has since taken is played on the first free cell.
+
+Requests go to a running server over HTTP, or to the app in this process
+through the Flask test client on --concurrency threads:
+
+    python benchmarks/replay.py log.txt --app app_bot --speedup 50
+    python benchmarks/replay.py log.txt --records game_records.bin \\
+        --url http://localhost:5001 --repeat 20 --concurrency 200
+
+Throughput, p50/p95/p99 latency, HTTP errors (status 400 and up, or no
+response) and refused requests (200 with success false) are reported per
+route. Run a server under test with TIKTACTOE_RATE_LIMIT_KEY=game, or every
+session is limited as one client.
+"""
+import argparse
+import ast
+import asyncio
+import importlib
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from records import iter_records  # noqa: E402
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S,%f'
+OLD_LINE = re.compile(r'^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d,\d{3}) - \w+ - (.*)$')
+OLD_RECEIVED = re.compile(r'^Received (reset_game|move) request: (\{.*\})$')
+OLD_ACCESS = re.compile(r'"GET (/get_game_state)\S* HTTP/[\d.]+" \d+')
+
+
+def _timestamp(text):
+    return datetime.strptime(text, TIME_FORMAT).timestamp()
+
+
+def log_events(path):
+    """Yield (time, game_id, route, body) for every request found in a log"""
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith('{'):
+                try:
+                    entry = json.loads(line)
+                    when = _timestamp(entry['time'])
+                except (ValueError, KeyError):
+                    continue
+                message = entry.get('message')
+                if message == 'Received move request':
+                    yield when, entry.get('game_id'), 'make_move', {
+                        'position': entry.get('position')}
+                elif message == 'Received reset_game request':
+                    yield when, entry.get('game_id'), 'reset_game', {
+                        key: entry[key] for key in ('difficulty', 'human_symbol', 'size')
+                        if entry.get(key) is not None}
+                continue
+
+            match = OLD_LINE.match(line)
+            if match is None:
+                continue
+            when, message = _timestamp(match.group(1)), match.group(2)
+            received = OLD_RECEIVED.match(message)
+            if received is not None:
+                try:
+                    body = ast.literal_eval(received.group(2))
+                except (ValueError, SyntaxError):
+                    continue
+                route = 'make_move' if received.group(1) == 'move' else 'reset_game'
+                yield when, None, route, body
+            elif OLD_ACCESS.search(message):
+                yield when, None, 'get_game_state', None
+
+
+def log_sessions(path):
+    """Sessions of (time, route, body) from a log, one per game played"""
+    sessions = []
+    current = {}
+    for when, game_id, route, body in log_events(path):
+        session = current.get(game_id)
+        if session is None or route == 'reset_game':
+            session = current[game_id] = []
+            sessions.append(session)
+        session.append((when, route, body))
+    return sessions
+
+
+def record_sessions(path, mode):
+    """Sessions from a game record store, for games of the given mode"""
+    sessions = []
+    for record in iter_records(path):
+        if record['mode'] != mode:
+            continue
+        reset = {'size': record['size'], 'win_length': record['win_length']}
+        moves = list(enumerate(record['moves']))
+        if mode == 'bot':
+            reset['difficulty'] = record['difficulty']
+            reset['human_symbol'] = record['human_player']
+            # X moves first, so the human's moves are every other one
+            first = 0 if record['human_player'] == 'X' else 1
+            moves = [(i, move) for i, move in moves if i % 2 == first]
+        start = record['started_at']
+        step = (record['finished_at'] - start) / (len(record['moves']) + 1)
+        session = [(start, 'reset_game', reset)]
+        session += [(start + (i + 1) * step, 'make_move', {'position': move})
+                    for i, move in moves]
+        sessions.append(session)
+    return sessions
+
+
+class HttpTarget:
+    """Requests to a running server, one connection each"""
+
+    def __init__(self, url):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 80
+
+    async def request(self, method, path, body=None):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        payload = json.dumps(body).encode() if body is not None else b''
+        writer.write(f'{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n'
+                     f'Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n'
+                     f'Connection: close\r\n\r\n'.encode() + payload)
+        response = await reader.read()
+        writer.close()
+        head, _, data = response.partition(b'\r\n\r\n')
+        status_line = head.split(b'\r\n', 1)[0].split()
+        status = int(status_line[1]) if len(status_line) > 1 else 0
+        try:
+            return status, json.loads(data)
+        except ValueError:
+            return status, None
+
+
+class AppTarget:
+    """Requests to an app in this process, on a pool of threads"""
+
+    def __init__(self, module, threads):
+        # Keep the replay out of the real log and record store, and limit
+        # per game id, as every session shares one client address here
+        os.environ.setdefault('TIKTACTOE_LOG_PATH', os.devnull)
+        os.environ.setdefault('TIKTACTOE_RECORDS_PATH', '')
+        os.environ.setdefault('TIKTACTOE_RATE_LIMIT_KEY', 'game')
+        self.app = importlib.import_module(module).create_app()
+        self.executor = ThreadPoolExecutor(threads)
+
+    async def request(self, method, path, body=None):
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, self._request, method, path, body)
+
+    def _request(self, method, path, body):
+        response = self.app.test_client().open(path, method=method, json=body)
+        return response.status_code, response.get_json(silent=True)
+
+
+class Stats:
+    """Latencies and outcomes per route"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.outcomes = defaultdict(Counter)
+
+    def add(self, route, status, data, elapsed):
+        self.latencies[route].append(elapsed)
+        if status == 0 or status >= 400:
+            outcome = 'error'
+        elif isinstance(data, dict) and data.get('success') is False:
+            outcome = 'refused'
+        else:
+            outcome = 'ok'
+        self.outcomes[route][outcome] += 1
+
+    def report(self, seconds):
+        """Per-route summary, as printed and as written with --output"""
+        summary = {}
+        for route in sorted(self.latencies):
+            values = sorted(self.latencies[route])
+            count = len(values)
+            outcomes = self.outcomes[route]
+
+            def percentile(q):
+                return round(values[min(count - 1, int(count * q))] * 1000, 2)
+
+            summary[route] = {
+                'requests': count,
+                'per_second': round(count / seconds, 1),
+                'p50_ms': percentile(0.5),
+                'p95_ms': percentile(0.95),
+                'p99_ms': percentile(0.99),
+                'error_rate': round(outcomes['error'] / count, 4),
+                'refused_rate': round(outcomes['refused'] / count, 4)
+            }
+        return summary
+
+
+async def play(index, session, offset, target, stats, speedup, limit, started):
+    """Replay one session with its own game id"""
+    loop = asyncio.get_running_loop()
+    if speedup:
+        await asyncio.sleep(max(0.0, started + offset / speedup - loop.time()))
+    async with limit:
+        game_id = f'replay-{index}'
+        first = session[0][0]
+        begin = loop.time()
+        board = None
+        for when, route, body in session:
+            if speedup:
+                await asyncio.sleep(max(0.0, begin + (when - first) / speedup - loop.time()))
+            if route == 'get_game_state':
+                method, path, body = 'GET', f'/get_game_state?game_id={game_id}', None
+            else:
+                method, path, body = 'POST', f'/{route}', dict(body, game_id=game_id)
+            if route == 'make_move' and board and isinstance(body.get('position'), int) \
+                    and 0 <= body['position'] < len(board) and board[body['position']]:
+                free = [i for i, cell in enumerate(board) if not cell]
+                if free:
+                    body['position'] = free[0]
+
+            start = time.perf_counter()
+            try:
+                status, data = await target.request(method, path, body)
+            except (OSError, asyncio.IncompleteReadError):
+                status, data = 0, None
+            stats.add(route, status, data, time.perf_counter() - start)
+            if isinstance(data, dict):
+                board = (data.get('game_state') or data).get('board', board)
+
+
+async def replay(sessions, target, speedup, concurrency, repeat):
+    stats = Stats()
+    earliest = min(session[0][0] for session in sessions)
+    span = max(session[-1][0] for session in sessions) - earliest
+    limit = asyncio.Semaphore(concurrency)
+    started = asyncio.get_running_loop().time()
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        play(copy * len(sessions) + i, session,
+             session[0][0] - earliest + copy * span / repeat,
+             target, stats, speedup, limit, started)
+        for copy in range(repeat) for i, session in enumerate(sessions)))
+    return stats, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('logs', nargs='*', help='app_bot.py log files')
+    parser.add_argument('--records', action='append', default=[],
+                        help='game record store (may be repeated)')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--url', help='base URL of a running server')
+    target.add_argument('--app', choices=('app', 'app_bot'), help='app to run in process')
+    parser.add_argument('--mode', choices=('human', 'bot'),
+                        help='which records to replay (default: bot, or from --app)')
+    parser.add_argument('--speedup', type=float, default=10)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--output', help='write the report as JSON to this file')
+    args = parser.parse_args()
+
+    mode = args.mode or ('human' if args.app == 'app' else 'bot')
+    sessions = []
+    if mode == 'bot':
+        # The logs are written by app_bot.py only
+        for path in args.logs:
+            sessions += log_sessions(path)
+    for path in args.records:
+        sessions += record_sessions(path, mode)
+    sessions = [session for session in sessions if session]
+    if not sessions:
+        parser.error('no sessions found')
+
+    if args.url:
+        target = HttpTarget(args.url)
+    else:
+        target = AppTarget(args.app, args.concurrency)
+    requests = sum(len(session) for session in sessions) * args.repeat
+    print(f'{len(sessions) * args.repeat} sessions, {requests} requests, '
+          f'speedup {args.speedup or "max"}, concurrency {args.concurrency}')
+
+    stats, seconds = asyncio.run(replay(sessions, target, args.speedup,
+                                        args.concurrency, args.repeat))
+    summary = stats.report(seconds)
+    print(f'{"route":<16}{"requests":>9}{"req/s":>9}{"p50 ms":>9}{"p95 ms":>9}'
+          f'{"p99 ms":>9}{"errors":>9}{"refused":>9}')
+    for route, row in summary.items():
+        print(f'{route:<16}{row["requests"]:>9}{row["per_second"]:>9}{row["p50_ms"]:>9}'
+              f'{row["p95_ms"]:>9}{row["p99_ms"]:>9}{row["error_rate"]:>9.2%}'
+              f'{row["refused_rate"]:>9.2%}')
+    print(f'{requests} requests in {seconds:.2f}s, {requests / seconds:.1f} req/s')
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'seconds': seconds, 'routes': summary}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
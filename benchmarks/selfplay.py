@@ -0,0 +1,211 @@
+"""Self-play harness: bot strength and speed across difficulties
+
+Plays TikTacToeBot policies against each other in-process, spread over a
+process pool, and reports:
+
+- a win/draw/loss matrix for every pairing (row policy plays X, column O)
+- overall moves per second
+- p50/p99 move latency per difficulty
+
+Results are written as JSON so runs can be compared over time; with
+--baseline the run fails (exit status 1) if the results regressed.
+
+    python benchmarks/selfplay.py --games 100000
+    python benchmarks/selfplay.py --games 1000000 --workers 8 --output results.json
+    python benchmarks/selfplay.py --baseline results.json
+"""
+import argparse
+import bisect
+import json
+import os
+import platform
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app_bot import TikTacToeBot  # noqa: E402
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+
+# Latency histogram buckets: upper bounds in microseconds, 10% apart, from
+# 0.1us to about 10s. Counts merge across workers by simple addition.
+BUCKETS = []
+_bound = 0.1
+while _bound < 1e7:
+    BUCKETS.append(_bound)
+    _bound *= 1.1
+BUCKETS = tuple(BUCKETS)
+
+
+def play_games(task):
+    """Play one batch of games for one pairing, in a worker process"""
+    x_policy, o_policy, games, seed, size = task
+    random.seed(seed)
+    policies = {'X': x_policy, 'O': o_policy}
+    results = {'X': 0, 'O': 0, 'Tie': 0}
+    latency = {x_policy: [0] * (len(BUCKETS) + 1), o_policy: [0] * (len(BUCKETS) + 1)}
+    moves = 0
+
+    game = TikTacToeBot(size=size)
+    perf_counter = time.perf_counter
+    for _ in range(games):
+        game.reset_game(size=size)
+        while game.game_active:
+            player = game.current_player
+            game.bot_player = player
+            game.human_player = 'O' if player == 'X' else 'X'
+            game.difficulty = policies[player]
+
+            start = perf_counter()
+            game.make_bot_move()
+            elapsed_us = (perf_counter() - start) * 1e6
+
+            latency[policies[player]][bisect.bisect_left(BUCKETS, elapsed_us)] += 1
+            moves += 1
+        results[game.winner] += 1
+
+    return x_policy, o_policy, results, latency, moves
+
+
+def percentile(counts, fraction):
+    """Upper bound of the bucket holding the given fraction of samples"""
+    total = sum(counts)
+    if not total:
+        return None
+    target = fraction * total
+    seen = 0
+    for i, count in enumerate(counts):
+        seen += count
+        if seen >= target:
+            return BUCKETS[i] if i < len(BUCKETS) else float('inf')
+    return float('inf')
+
+
+def run(games, workers, size, seed, chunk):
+    tasks = []
+    for x_policy in DIFFICULTIES:
+        for o_policy in DIFFICULTIES:
+            remaining = games
+            while remaining > 0:
+                batch = min(chunk, remaining)
+                tasks.append((x_policy, o_policy, batch, seed + len(tasks), size))
+                remaining -= batch
+
+    matrix = {x: {o: {'X': 0, 'O': 0, 'Tie': 0} for o in DIFFICULTIES} for x in DIFFICULTIES}
+    latency = {d: [0] * (len(BUCKETS) + 1) for d in DIFFICULTIES}
+    total_moves = 0
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for x_policy, o_policy, results, task_latency, moves in pool.map(play_games, tasks):
+            for outcome, count in results.items():
+                matrix[x_policy][o_policy][outcome] += count
+            for difficulty, counts in task_latency.items():
+                latency[difficulty] = [a + b for a, b in zip(latency[difficulty], counts)]
+            total_moves += moves
+    elapsed = time.perf_counter() - start
+
+    return {
+        'config': {
+            'games_per_pairing': games,
+            'workers': workers,
+            'size': size,
+            'seed': seed,
+            'python': platform.python_version(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z')
+        },
+        'elapsed_s': round(elapsed, 3),
+        'moves': total_moves,
+        'moves_per_second': round(total_moves / elapsed, 1),
+        'matrix': matrix,
+        'latency_us': {
+            d: {'p50': percentile(latency[d], 0.5), 'p99': percentile(latency[d], 0.99)}
+            for d in DIFFICULTIES
+        }
+    }
+
+
+def print_report(results):
+    print(f"{results['moves']:,} moves in {results['elapsed_s']}s "
+          f"= {results['moves_per_second']:,.0f} moves/s")
+    print()
+    print('Win/draw/loss for X (rows) against O (columns), in %:')
+    print(' ' * 8 + ''.join(f'{o:>20}' for o in DIFFICULTIES))
+    for x in DIFFICULTIES:
+        cells = []
+        for o in DIFFICULTIES:
+            counts = results['matrix'][x][o]
+            total = sum(counts.values()) or 1
+            cells.append(f"{100 * counts['X'] / total:5.1f}/"
+                         f"{100 * counts['Tie'] / total:5.1f}/"
+                         f"{100 * counts['O'] / total:5.1f}")
+        print(f'{x:>8}' + ''.join(f'{c:>20}' for c in cells))
+    print()
+    print('Move latency (us):')
+    for d, stats in results['latency_us'].items():
+        print(f"{d:>8}  p50 {stats['p50']:>10.2f}  p99 {stats['p99']:>10.2f}")
+
+
+def compare(results, baseline, latency_tolerance, rate_tolerance):
+    """List the ways results regressed against a baseline run"""
+    problems = []
+    for d, stats in results['latency_us'].items():
+        old = baseline['latency_us'].get(d, {}).get('p99')
+        if old and stats['p99'] > old * (1 + latency_tolerance):
+            problems.append(f'{d} p99 latency {stats["p99"]:.2f}us vs {old:.2f}us')
+
+    for x in DIFFICULTIES:
+        for o in DIFFICULTIES:
+            new = results['matrix'][x][o]
+            old = baseline['matrix'].get(x, {}).get(o)
+            if not old:
+                continue
+            for outcome in ('X', 'O', 'Tie'):
+                new_rate = new[outcome] / (sum(new.values()) or 1)
+                old_rate = old[outcome] / (sum(old.values()) or 1)
+                if abs(new_rate - old_rate) > rate_tolerance:
+                    problems.append(f'{x} vs {o}: {outcome} rate {new_rate:.3f} vs {old_rate:.3f}')
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--games', type=int, default=10000,
+                        help='games per pairing (9 pairings)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--size', type=int, default=3, choices=[3, 4, 5])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk', type=int, default=5000,
+                        help='games per task sent to a worker')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--baseline', help='fail if results regressed against this JSON file')
+    parser.add_argument('--latency-tolerance', type=float, default=0.5,
+                        help='allowed relative p99 latency increase')
+    parser.add_argument('--rate-tolerance', type=float, default=0.02,
+                        help='allowed absolute change in any outcome rate')
+    args = parser.parse_args()
+
+    results = run(args.games, args.workers, args.size, args.seed, args.chunk)
+    print_report(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        problems = compare(results, baseline, args.latency_tolerance, args.rate_tolerance)
+        if problems:
+            print()
+            print('Regressions against baseline:')
+            for problem in problems:
+                print(f'  {problem}')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Startup time and memory: the two game servers against the combined one
+
+Starts each setup in a fresh Python process: imports it, runs create_app()
+and loads its game pages, as a worker does before taking traffic. Reports
+the time that took and the process's resident memory afterwards. The
+separate app.py and app_bot.py processes are added up and compared with one
+server.py process, before and after its first bot move (which builds the
+bot's tables).
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Keeps the logs of the measured processes out of the working tree
+SCRATCH = tempfile.mkdtemp()
+
+SETUPS = {
+    'app.py': ('import app', 'app.create_app()', ['/']),
+    'app_bot.py': ('import app_bot', 'app_bot.create_app()', ['/']),
+    'server.py': ('import server', 'server.create_app()', ['/human/', '/bot/']),
+    'server.py, after a bot move': ('import server', 'server.create_app()',
+                                    ['/human/', '/bot/', 'move']),
+}
+
+CHILD = '''
+import json, time
+start = time.perf_counter()
+{imports}
+client = {create}.test_client()
+for url in {urls!r}:
+    if url == 'move':
+        client.post('/bot/reset_game', json={{'game_id': 'startup', 'difficulty': 'hard'}})
+        client.post('/bot/make_move', json={{'game_id': 'startup', 'position': 4}})
+    else:
+        assert client.get(url).status_code == 200
+seconds = time.perf_counter() - start
+from metrics import resident_memory
+print(json.dumps({{'seconds': seconds, 'rss': resident_memory()}}))
+'''
+
+
+def measure(imports, create, urls):
+    code = CHILD.format(imports=imports, create=create, urls=urls)
+    env = dict(os.environ, TIKTACTOE_RECORDS_PATH='', TIKTACTOE_BOT_POOL_WORKERS='0',
+               TIKTACTOE_LOG_PATH=os.path.join(SCRATCH, 'log.txt'))
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='processes started per setup')
+    args = parser.parse_args()
+
+    results = {}
+    for name, (imports, create, urls) in SETUPS.items():
+        runs = [measure(imports, create, urls) for _ in range(args.runs)]
+        results[name] = (statistics.median(run['seconds'] for run in runs),
+                         statistics.median(run['rss'] for run in runs))
+
+    results['app.py + app_bot.py'] = tuple(
+        a + b for a, b in zip(results['app.py'], results['app_bot.py']))
+    print(f'{"setup":<30} {"ready (ms)":>11} {"RSS (MB)":>9}')
+    for name, (seconds, rss) in results.items():
+        print(f'{name:<30} {seconds * 1000:>11.0f} {rss / 2 ** 20:>9.1f}')
+
+    two_seconds, two_rss = results['app.py + app_bot.py']
+    for name in ('server.py', 'server.py, after a bot move'):
+        seconds, rss = results[name]
+        print(f'{name} saves {(two_seconds - seconds) * 1000:.0f} ms of startup and '
+              f'{(two_rss - rss) / 2 ** 20:.1f} MB against two processes')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""Process pool for the hard bot's search on 4x4 and 5x5 boards
+
+On the classic board the hard bot looks its move up in the solved table,
+which takes microseconds. On the bigger boards it searches for up to
+TIKTACTOE_SEARCH_BUDGET_MS. Run on a request thread, that search holds the
+GIL, and every other request in the worker waits behind it, even /health.
+
+So those searches are sent to a small process pool instead. The request
+thread only waits for the result, which lets the GIL go. Three limits keep
+the pool from becoming a queue nobody comes back from:
+
+- deadline: a move that takes longer than this is given up on. The caller
+  then falls back to a cheaper policy instead of failing the request.
+- max_pending: searches queued or running at once. Beyond that, search()
+  refuses at once, and the routes check has_capacity() first so they can
+  answer "busy, retry" before touching the game.
+- a search that was given up on keeps its place until it finishes (the
+  search ends on its own budget), so the pending count stays honest.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from engine import Board, get_geometry
+from search import iterative_deepening
+
+
+def run_search(x, o, size, win_length, player, time_budget, max_depth):
+    """Search one position; runs in a pool process"""
+    board = Board(x, o, get_geometry(size, win_length))
+    return iterative_deepening(board, player, time_budget, max_depth)
+
+
+def _context():
+    # Forking a threaded server process is unsafe; a fork server is
+    # started once and forks clean workers from there
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+class SearchPool:
+    """Bounded pool of search processes, created on first use"""
+
+    def __init__(self, workers=2, max_pending=8, deadline=0.5):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.deadline = deadline
+        self.pending = 0
+        # Outcome -> count: completed, deadline, rejected, error
+        self.outcomes = {'completed': 0, 'deadline': 0, 'rejected': 0, 'error': 0}
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.workers > 0
+
+    def has_capacity(self):
+        return self.pending < self.max_pending
+
+    def busy(self):
+        """Pool processes currently searching"""
+        return min(self.pending, self.workers)
+
+    def queued(self):
+        """Searches waiting for a free process"""
+        return max(0, self.pending - self.workers)
+
+    def search(self, board, player, time_budget, max_depth=None):
+        """Search a position in the pool.
+
+        Returns the iterative_deepening result, or None if the pool is full,
+        the deadline passed or the pool failed; the caller then falls back.
+        """
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.outcomes['rejected'] += 1
+                return None
+            self.pending += 1
+            executor = self._get_executor()
+
+        geometry = board.geometry
+        try:
+            future = executor.submit(run_search, board.x, board.o, geometry.size,
+                                     geometry.win_length, player, time_budget, max_depth)
+        except (BrokenProcessPool, RuntimeError):
+            self._finished('error', broken=True)
+            return None
+        future.add_done_callback(self._on_done)
+
+        try:
+            try:
+                return future.result(timeout=self.deadline)
+            except TimeoutError:
+                # _on_done takes the same lock, so a search finishing just
+                # now is counted as completed or as missed, never both
+                with self._lock:
+                    missed = not future.done()
+                    if missed:
+                        future.abandoned = True
+                        self.outcomes['deadline'] += 1
+                if not missed:
+                    return future.result()
+                # Not started yet: drop it. Running: it stops on its own budget.
+                future.cancel()
+                return None
+        except Exception as e:
+            # Counted by _on_done; a broken pool is started afresh next time
+            logging.error(f"Bot search failed in the pool: {e!r}")
+            if isinstance(e, BrokenProcessPool):
+                with self._lock:
+                    if self._executor is executor:
+                        self._executor = None
+            return None
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _get_executor(self):
+        # Created lazily, and again in a forked server worker, which
+        # cannot use its parent's pool
+        if self._executor is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=_context())
+        return self._executor
+
+    def _on_done(self, future):
+        outcome = None
+        if not future.cancelled() and not getattr(future, 'abandoned', False):
+            outcome = 'error' if future.exception() is not None else 'completed'
+        self._finished(outcome)
+
+    def _finished(self, outcome, broken=False):
+        with self._lock:
+            self.pending -= 1
+            if outcome is not None:
+                self.outcomes[outcome] += 1
+            if broken:
+                self._executor = None
+
@@ -0,0 +1,260 @@
+"""Precomputed move tables for TikTacToeBot
+
+The hard bot plays perfect tic-tac-toe, and the game is small enough to solve
+completely: there are only a few thousand reachable positions. Instead of
+running minimax on every bot turn, every reachable position is solved once
+when this module is imported and the hard bot just looks its move up.
+
+The easy and medium policies are compiled the same way. Every difficulty
+gets a dense array with one entry per board, indexed by the board read as a
+base-3 number (see ternary_index), so a bot turn on the classic board costs
+one index computation and one array read. Only the random pick among the
+candidates is left for move time, drawn exactly as the policies draw it.
+
+Nothing is solved on import: the first caller that needs a table pays for
+building them (see load()), so a process that never plays the bot never
+does. HARD_TABLE, POSITION_SCORES, EASY_TABLE, MEDIUM_TABLE and HARD_MOVES
+can still be imported by name; that builds them on the spot.
+"""
+import random
+import threading
+from array import array
+
+from engine import CELL_MASKS, FULL_MASK, STANDARD, has_won, iter_bits
+
+
+def _shift(score):
+    """Move a minimax score one ply further from the root"""
+    if score > 0:
+        return score - 1
+    if score < 0:
+        return score + 1
+    return 0
+
+
+def solve():
+    """Solve every reachable position.
+
+    Returns two dicts keyed by packed board key (see ``engine.Board.key``):
+
+    - the move table, mapping each non-terminal board to ``(move, score)``,
+      exactly what ``TikTacToeBot.minimax_move`` would pick for the side to
+      move and the depth-aware score it would give that move;
+    - the score of every reachable board other than the empty one, from the
+      point of view of the player who made the last move.
+    """
+    # Score of a position from the point of view of the player who just
+    # moved, as minimax(0, False) would compute it with that player as bot.
+    scores = {}
+    table = {}
+
+    def key(mover, other, mover_is_x):
+        return mover | (other << 9) if mover_is_x else other | (mover << 9)
+
+    def score_after_move(mover, other, mover_is_x):
+        k = key(mover, other, mover_is_x)
+        if k in scores:
+            return scores[k]
+
+        if has_won(mover):
+            score = 10
+        elif mover | other == FULL_MASK:
+            score = 0
+        else:
+            # The opponent picks the reply that is worst for the mover
+            score = -best_reply(other, mover, not mover_is_x)[1]
+
+        scores[k] = score
+        return score
+
+    def best_reply(player, other, player_is_x):
+        k = key(player, other, player_is_x)
+        if k in table:
+            move, score = table[k]
+            return move, _shift(score)
+
+        best_move = None
+        best_score = float('-inf')
+        for i in iter_bits(FULL_MASK & ~(player | other)):
+            score = score_after_move(player | CELL_MASKS[i], other, player_is_x)
+            # Strictly greater keeps the lowest index on ties, like minimax_move
+            if score > best_score:
+                best_score = score
+                best_move = i
+
+        table[k] = (best_move, best_score)
+        return best_move, _shift(best_score)
+
+    def visit(player, other, player_is_x):
+        if key(player, other, player_is_x) in table:
+            return
+        if has_won(other) or player | other == FULL_MASK:
+            return
+        best_reply(player, other, player_is_x)
+        for i in iter_bits(FULL_MASK & ~(player | other)):
+            visit(other, player | CELL_MASKS[i], not player_is_x)
+
+    visit(0, 0, True)
+    return table, scores
+
+
+def side_to_move(board):
+    """X moves first, so the side to move follows from the move count"""
+    return 'X' if board.move_count() % 2 == 0 else 'O'
+
+
+def lookup_hard_move(board, player=None):
+    """Return (move, score) for the side to move, or None if unreachable"""
+    if player is not None and player != side_to_move(board):
+        return None
+    return (_tables or load())['HARD_TABLE'].get(board.key())
+
+
+def lookup_move_score(board, move):
+    """Minimax score of a move for the side to move, or None if unreachable"""
+    child = board.copy()
+    child.place(move, side_to_move(board))
+    return (_tables or load())['POSITION_SCORES'].get(child.key())
+
+
+NO_MOVE = 255
+# Set on a medium entry whose move is drawn at random from its cells
+RANDOM_PICK = 1 << 9
+
+# A mask's cells read as a base-3 number with every digit 1; an O mask is
+# worth twice that, so X and O together give each cell a digit of 0, 1 or 2
+TERNARY = tuple(sum(3 ** i for i in iter_bits(mask)) for mask in range(FULL_MASK + 1))
+# A mask's cells in index order, ready for random.choice
+MASK_MOVES = tuple(tuple(iter_bits(mask)) for mask in range(FULL_MASK + 1))
+
+
+def ternary_index(board):
+    """Index of a classic board in the compiled tables"""
+    return TERNARY[board.x] + 2 * TERNARY[board.o]
+
+
+def _winning_cells(mask, empty):
+    """Empty cells that would complete one of the mask's lines"""
+    wins = 0
+    for line in STANDARD.line_masks:
+        rest = line & ~mask
+        if rest & empty and not rest & (rest - 1):
+            wins |= rest
+    return wins
+
+
+def iter_submasks(mask):
+    """Every mask whose cells are all in ``mask``, the empty one included"""
+    sub = mask
+    while True:
+        yield sub
+        if not sub:
+            return
+        sub = (sub - 1) & mask
+
+
+def compile_tables(hard_table):
+    """Compile every difficulty into arrays of 3**9 entries.
+
+    For each board where the side to move follows from the counts:
+
+    - easy: the "smart" move, winning or else blocking, lowest cell first,
+      or NO_MOVE; any other move is a random empty cell;
+    - medium: the mask of candidate cells, with RANDOM_PICK set when the
+      policy draws among them (corners, or any cell) rather than taking the
+      only one (win, block or center);
+    - hard: the solved move from ``hard_table`` (see solve), or NO_MOVE for
+      unreachable boards.
+    """
+    easy = bytearray([NO_MOVE]) * 3 ** 9
+    medium = array('H', [0]) * 3 ** 9
+    hard = bytearray([NO_MOVE]) * 3 ** 9
+    for key, (move, _) in hard_table.items():
+        hard[TERNARY[key & FULL_MASK] + 2 * TERNARY[key >> 9]] = move
+
+    for x in range(FULL_MASK + 1):
+        for o in iter_submasks(FULL_MASK & ~x):
+            x_count, o_count = len(MASK_MOVES[x]), len(MASK_MOVES[o])
+            if x_count == o_count:
+                me, them = x, o
+            elif x_count == o_count + 1:
+                me, them = o, x
+            else:
+                continue
+            index = TERNARY[x] + 2 * TERNARY[o]
+            empty = FULL_MASK & ~(x | o)
+
+            # Win if possible, else block, lowest cell first
+            forced = _winning_cells(me, empty) or _winning_cells(them, empty)
+            if forced:
+                forced &= -forced
+                easy[index] = forced.bit_length() - 1
+                medium[index] = forced
+            elif empty & STANDARD.center_mask:
+                medium[index] = empty & STANDARD.center_mask
+            elif empty & STANDARD.corners_mask:
+                medium[index] = empty & STANDARD.corners_mask | RANDOM_PICK
+            elif empty:
+                medium[index] = empty | RANDOM_PICK
+    return easy, medium, hard
+
+
+_tables = None
+_tables_lock = threading.Lock()
+
+
+def load():
+    """Solve the game and compile every table, once per process.
+
+    Returns a dict of the module's table names to the tables. Preloading
+    servers call it before forking, so the workers share them.
+    """
+    global _tables
+    if _tables is None:
+        with _tables_lock:
+            if _tables is None:
+                table, scores = solve()
+                easy, medium, hard = compile_tables(table)
+                _tables = {'HARD_TABLE': table, 'POSITION_SCORES': scores,
+                           'EASY_TABLE': easy, 'MEDIUM_TABLE': medium, 'HARD_MOVES': hard}
+    return _tables
+
+
+def __getattr__(name):
+    """Build the tables the first time one is asked for by name"""
+    if name in ('HARD_TABLE', 'POSITION_SCORES', 'EASY_TABLE', 'MEDIUM_TABLE', 'HARD_MOVES'):
+        return load()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def compiled_move(board, player, difficulty):
+    """The bot's move on the classic board, from the compiled tables.
+
+    Returns None when ``player`` is not the side to move (the tables only
+    hold the mover's view) or there is no move, so callers fall back to
+    working it out.
+    """
+    x, o = board.x, board.o
+    if player != ('X' if len(MASK_MOVES[x]) == len(MASK_MOVES[o]) else 'O'):
+        return None
+    index = TERNARY[x] + 2 * TERNARY[o]
+    tables = _tables or load()
+
+    if difficulty == 'easy':
+        moves = MASK_MOVES[FULL_MASK & ~(x | o)]
+        if not moves:
+            return None
+        # 30% chance to make a smart move, as get_easy_move
+        move = tables['EASY_TABLE'][index]
+        if random.random() < 0.3 and move != NO_MOVE:
+            return move
+        return random.choice(moves)
+
+    if difficulty == 'medium':
+        entry = tables['MEDIUM_TABLE'][index]
+        if entry & RANDOM_PICK:
+            return random.choice(MASK_MOVES[entry & FULL_MASK])
+        return MASK_MOVES[entry][0] if entry else None
+
+    move = tables['HARD_MOVES'][index]
+    return None if move == NO_MOVE else move
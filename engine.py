@@ -0,0 +1,247 @@
+"""Bitboard game engine shared by app.py and app_bot.py
+
+Each player's marks are kept as an integer mask, bit ``i`` standing for board
+position ``i``, numbered left to right, top to bottom. On the classic board:
+
+    0 | 1 | 2
+    ---------
+    3 | 4 | 5
+    ---------
+    6 | 7 | 8
+
+Wins are found by testing a mask against precomputed line masks and moves are
+generated from the empty-cell mask with bit operations. Besides the classic
+3x3 board, square boards up to 5x5 with a configurable number in a row are
+supported; the masks for each size are built once by ``get_geometry``.
+"""
+import math
+
+WINNING_COMBINATIONS = (
+    (0, 1, 2), (3, 4, 5), (6, 7, 8),  # rows
+    (0, 3, 6), (1, 4, 7), (2, 5, 8),  # columns
+    (0, 4, 8), (2, 4, 6)              # diagonals
+)
+
+SUPPORTED_SIZES = (3, 4, 5)
+
+
+def default_win_length(size):
+    """Three in a row on the classic board, four on the bigger ones"""
+    return 3 if size == 3 else 4
+
+
+class Geometry:
+    """Precomputed masks for one board size and win length"""
+
+    __slots__ = ('size', 'win_length', 'cells', 'full_mask', 'cell_masks',
+                 'line_masks', 'lines_through', 'neighbour_masks',
+                 'center_mask', 'corners_mask', 'move_order')
+
+    def __init__(self, size, win_length):
+        self.size = size
+        self.win_length = win_length
+        self.cells = size * size
+        self.full_mask = (1 << self.cells) - 1
+        self.cell_masks = tuple(1 << i for i in range(self.cells))
+
+        # Rows, then columns, then both diagonal directions
+        lines = []
+        for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            for r in range(size):
+                for c in range(size):
+                    end_r = r + dr * (win_length - 1)
+                    end_c = c + dc * (win_length - 1)
+                    if 0 <= end_r < size and 0 <= end_c < size:
+                        lines.append(sum(1 << ((r + dr * k) * size + c + dc * k)
+                                         for k in range(win_length)))
+        self.line_masks = tuple(lines)
+        self.lines_through = tuple(
+            tuple(line for line in lines if line & bit) for bit in self.cell_masks
+        )
+
+        self.neighbour_masks = tuple(
+            sum(1 << (nr * size + nc)
+                for nr in range(r - 1, r + 2) for nc in range(c - 1, c + 2)
+                if 0 <= nr < size and 0 <= nc < size and (nr, nc) != (r, c))
+            for r in range(size) for c in range(size)
+        )
+
+        middle = (size - 1) / 2
+        centers = [r * size + c for r in range(size) for c in range(size)
+                   if abs(r - middle) < 1 and abs(c - middle) < 1]
+        corners = sorted({0, size - 1, size * (size - 1), size * size - 1})
+        self.center_mask = sum(1 << i for i in centers)
+        self.corners_mask = sum(1 << i for i in corners)
+
+        # Center, then corners, then everything else from the middle outwards
+        def priority(i):
+            r, c = divmod(i, size)
+            group = 0 if i in centers else 1 if i in corners else 2
+            return group, (r - middle) ** 2 + (c - middle) ** 2, i
+        self.move_order = tuple(sorted(range(self.cells), key=priority))
+
+    def has_won(self, mask):
+        """Check whether a player's mask covers any winning line"""
+        for line in self.line_masks:
+            if mask & line == line:
+                return True
+        return False
+
+    def wins_through(self, mask, position):
+        """Check for a win using only the lines through the last move"""
+        for line in self.lines_through[position]:
+            if mask & line == line:
+                return True
+        return False
+
+
+_GEOMETRIES = {}
+
+
+def get_geometry(size=3, win_length=None):
+    """Get the shared Geometry for a board size and win length"""
+    if win_length is None:
+        win_length = default_win_length(size)
+    key = (size, win_length)
+    geometry = _GEOMETRIES.get(key)
+    if geometry is None:
+        if size not in SUPPORTED_SIZES or not 3 <= win_length <= size:
+            raise ValueError(f'Unsupported board: {size}x{size}, {win_length} in a row')
+        geometry = _GEOMETRIES[key] = Geometry(size, win_length)
+    return geometry
+
+
+def parse_board_settings(data):
+    """Read size and win_length from a request body.
+
+    Invalid values fall back to the defaults rather than failing the request.
+    """
+    size = data.get('size', 3)
+    if size not in SUPPORTED_SIZES:
+        size = 3
+    win_length = data.get('win_length', default_win_length(size))
+    if not isinstance(win_length, int) or not 3 <= win_length <= size:
+        win_length = default_win_length(size)
+    return size, win_length
+
+
+# The classic board, used everywhere unless a game asks for another size
+STANDARD = get_geometry(3, 3)
+LINE_MASKS = STANDARD.line_masks
+CELL_MASKS = STANDARD.cell_masks
+FULL_MASK = STANDARD.full_mask
+
+
+def has_won(mask):
+    """Check whether a player's mask covers any winning line on a 3x3 board"""
+    for line in LINE_MASKS:
+        if mask & line == line:
+            return True
+    return False
+
+
+def iter_bits(mask):
+    """Yield the positions of the set bits in a mask, lowest first"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class Board:
+    """Tic-tac-toe board stored as one mask per player"""
+
+    __slots__ = ('x', 'o', 'geometry')
+
+    def __init__(self, x=0, o=0, geometry=STANDARD):
+        self.x = x
+        self.o = o
+        self.geometry = geometry
+
+    @classmethod
+    def empty(cls, size=3, win_length=None):
+        return cls(geometry=get_geometry(size, win_length))
+
+    @classmethod
+    def from_list(cls, cells, win_length=None):
+        """Build a board from the list of cell strings used in the JSON API"""
+        board = cls(geometry=get_geometry(math.isqrt(len(cells)), win_length))
+        for i, cell in enumerate(cells):
+            if cell:
+                board.place(i, cell)
+        return board
+
+    @classmethod
+    def from_key(cls, key, geometry=STANDARD):
+        """Rebuild a board from the packed int returned by key()"""
+        return cls(key & geometry.full_mask, key >> geometry.cells, geometry)
+
+    def copy(self):
+        return Board(self.x, self.o, self.geometry)
+
+    def key(self):
+        """Pack both masks into one int, usable as a dict key"""
+        return self.x | (self.o << self.geometry.cells)
+
+    def mask(self, symbol):
+        """Get the mask holding the marks of 'X' or 'O'"""
+        return self.x if symbol == 'X' else self.o
+
+    def occupied(self):
+        return self.x | self.o
+
+    def empty_mask(self):
+        return self.geometry.full_mask & ~(self.x | self.o)
+
+    def is_empty(self, position):
+        return not (self.x | self.o) & self.geometry.cell_masks[position]
+
+    def is_full(self):
+        return (self.x | self.o) == self.geometry.full_mask
+
+    def place(self, position, symbol):
+        if symbol == 'X':
+            self.x |= self.geometry.cell_masks[position]
+        else:
+            self.o |= self.geometry.cell_masks[position]
+
+    def remove(self, position):
+        self.x &= ~self.geometry.cell_masks[position]
+        self.o &= ~self.geometry.cell_masks[position]
+
+    def cell(self, position):
+        """Get the symbol at a position ('X', 'O' or '')"""
+        bit = self.geometry.cell_masks[position]
+        if self.x & bit:
+            return 'X'
+        if self.o & bit:
+            return 'O'
+        return ''
+
+    def available_moves(self):
+        return list(iter_bits(self.empty_mask()))
+
+    def move_count(self):
+        return bin(self.x | self.o).count('1')
+
+    def winner(self):
+        """Return the winning symbol, or None"""
+        if self.geometry.has_won(self.x):
+            return 'X'
+        if self.geometry.has_won(self.o):
+            return 'O'
+        return None
+
+    def to_list(self):
+        """Get the board as a list of cell strings for the JSON API"""
+        return [self.cell(i) for i in range(self.geometry.cells)]
+
+    def __eq__(self, other):
+        return (isinstance(other, Board) and self.geometry is other.geometry
+                and self.x == other.x and self.o == other.o)
+
+    def __hash__(self):
+        return self.key()
+
+    def __repr__(self):
+        return f'Board({self.to_list()!r})'
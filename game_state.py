@@ -0,0 +1,83 @@
+"""Versioned game state: ETags for /get_game_state and deltas for moves
+
+Every game carries a ``version`` that goes up by one with each move
+(redone moves included), each undo and each reset. So the moves made since
+a version the client already has are simply the last few entries of
+``game.moves``, unless a reset or undo came in between; the game's
+``rewind_version`` is the version of the latest one.
+
+- /get_game_state sends an ETag built from the version. A poll whose
+  If-None-Match still matches gets an empty 304 without the state being
+  built at all.
+- A move request may send ``since``, the version the client last saw. If
+  the moves since then can be listed, the reply carries only those cells
+  and the status fields instead of the whole board.
+
+A game's get_status() returns its visible version; under bot pacing that
+is one behind ``game.version`` until the bot's move is revealed.
+"""
+from flask import Response
+
+
+def visible_moves(game, version):
+    """The moves the client may see, given the visible version"""
+    moves = game.moves
+    return moves[:len(moves) - (game.version - version)]
+
+
+def state_etag(game):
+    """ETag for a game's visible state.
+
+    It includes the start time as well as the version, because a game that
+    was evicted and started again begins at version 0 once more.
+    """
+    return f'{game.get_status()["version"]}-{int(game.started_at * 1000):x}'
+
+
+def with_etag(response, etag):
+    response.set_etag(etag)
+    # Browsers may keep the state, but must ask whether it is still current
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def not_modified(etag):
+    return with_etag(Response(status=304), etag)
+
+
+def requested_version(data):
+    """The ``since`` version in a request body, or None"""
+    since = data.get('since') if isinstance(data, dict) else None
+    if isinstance(since, int) and not isinstance(since, bool):
+        return since
+    return None
+
+
+def state_delta(game, since):
+    """What changed since version ``since``, or None if that can't be told.
+
+    ``changes`` lists ``[position, symbol]`` for each cell filled since then.
+    """
+    if since < game.rewind_version:
+        return None  # A reset or undo came between, so cells were cleared
+    status = game.get_status()
+    moves = visible_moves(game, status['version'])
+    first = len(moves) - (status['version'] - since)
+    if not 0 <= first <= len(moves):
+        return None  # From the future
+    board = game.board
+    return {
+        'delta': True,
+        'since': since,
+        'changes': [[position, board.cell(position)] for position in moves[first:]],
+        **status
+    }
+
+
+def state_or_delta(game, since):
+    """The delta since ``since`` if there is one, else the full state"""
+    if since is not None:
+        delta = state_delta(game, since)
+        if delta is not None:
+            return delta
+    return game.get_game_state()
@@ -0,0 +1,118 @@
+"""Registry of live games shared by app.py and app_bot.py
+
+Every client gets its own game, found by a game id. The id comes from the
+request (``game_id`` in the JSON body or query string, or an ``X-Game-Id``
+header) or, for browsers, from the signed Flask session cookie.
+
+The registry is bounded: games idle for longer than the TTL are dropped, and
+once ``max_games`` is reached the least recently used game is evicted.
+"""
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from flask import jsonify, request, session
+
+GAME_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+class InvalidGameId(ValueError):
+    """Raised when a client sends a malformed game id"""
+
+
+def new_game_id():
+    return secrets.token_urlsafe(12)
+
+
+def request_game_id(issue=True):
+    """Get the game id for the current request.
+
+    An explicit id in the request wins over the session cookie. If neither is
+    present a new id is stored in the session, unless ``issue`` is False, in
+    which case None is returned.
+    """
+    data = request.get_json(silent=True)
+    game_id = data.get('game_id') if isinstance(data, dict) else None
+    if game_id is None:
+        game_id = request.args.get('game_id') or request.headers.get('X-Game-Id')
+
+    if game_id is None:
+        game_id = session.get('game_id')
+        if game_id is None:
+            if not issue:
+                return None
+            game_id = new_game_id()
+            session['game_id'] = game_id
+
+    if not isinstance(game_id, str) or not GAME_ID_PATTERN.match(game_id):
+        raise InvalidGameId(game_id)
+    return game_id
+
+
+def invalid_game_id_response(error):
+    """Flask error handler for InvalidGameId"""
+    return jsonify({
+        'success': False,
+        'message': 'Invalid game id'
+    }), 400
+
+
+class GameStore:
+    """Bounded LRU/TTL registry of game objects keyed by game id"""
+
+    def __init__(self, factory, max_games=10000, ttl=1800, lock_stripes=64):
+        self.factory = factory
+        self.max_games = max_games
+        self.ttl = ttl
+        self.evicted = 0
+        # game_id -> (game, last_used), least recently used first
+        self._games = OrderedDict()
+        self._lock = threading.Lock()
+        # Requests for the same game are serialized on one of a fixed set of
+        # locks, so the number of locks does not grow with the number of games
+        self._stripes = [threading.Lock() for _ in range(lock_stripes)]
+
+    def __len__(self):
+        return len(self._games)
+
+    def __contains__(self, game_id):
+        return game_id in self._games
+
+    @contextmanager
+    def checkout(self, game_id):
+        """Hold a game for the duration of a request, creating it if needed"""
+        with self._stripes[hash(game_id) % len(self._stripes)]:
+            yield self._touch(game_id)
+
+    def peek(self, game_id):
+        """Get a game without creating it or refreshing its last use"""
+        entry = self._games.get(game_id)
+        return entry[0] if entry is not None else None
+
+    def evict_expired(self):
+        with self._lock:
+            self._evict(time.monotonic())
+
+    def _touch(self, game_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._games.pop(game_id, None)
+            game = entry[0] if entry is not None else self.factory()
+            self._games[game_id] = (game, now)
+            self._evict(now)
+        return game
+
+    def _evict(self, now):
+        # Entries are kept in last-use order, so both the LRU victim and any
+        # expired games are always at the front
+        games = self._games
+        cutoff = now - self.ttl
+        while games:
+            _, last_used = next(iter(games.values()))
+            if len(games) <= self.max_games and last_used >= cutoff:
+                break
+            games.popitem(last=False)
+            self.evicted += 1
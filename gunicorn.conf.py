@@ -0,0 +1,38 @@
+"""Gunicorn settings for serving either app, or both in one
+
+    gunicorn -c gunicorn.conf.py 'app:create_app()'
+    gunicorn -c gunicorn.conf.py 'app_bot:create_app()'
+    gunicorn -c gunicorn.conf.py 'server:create_app()'
+
+The bind address and the worker and thread counts come from the environment.
+The app is loaded once in the master process before the workers are forked,
+so the bot's solved-game table is built once and its memory is shared by all
+workers. Load balancers should poll /ready; /health only says the process is up.
+"""
+import gc
+import os
+
+bind = os.environ.get('TIKTACTOE_BIND', '0.0.0.0:8000')
+# Moves are CPU-bound, so one worker per core; threads cover waiting on clients
+workers = int(os.environ.get('TIKTACTOE_WORKERS', os.cpu_count() or 1))
+threads = int(os.environ.get('TIKTACTOE_THREADS', 4))
+worker_class = 'gthread'
+timeout = int(os.environ.get('TIKTACTOE_WORKER_TIMEOUT', 30))
+preload_app = True
+
+
+def on_starting(server):
+    # Metric snapshots left by the workers of an earlier run would be counted
+    # again by this one
+    directory = os.environ.get('TIKTACTOE_METRICS_DIR')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if name.endswith(('.json', '.tmp')):
+                os.remove(os.path.join(directory, name))
+
+
+def when_ready(server):
+    # Keep the garbage collector away from everything loaded before the fork,
+    # so workers do not copy the shared pages just by scanning them
+    gc.freeze()
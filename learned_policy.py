@@ -0,0 +1,105 @@
+"""Difficulties learned by self-play, between the easy bot and perfect play
+
+self_play.py trains a Q table for the classic board against the existing
+bot policies. Whenever the greedy policy first plays the perfect-play move
+in at least LEVELS[i] percent of the reachable positions, that policy is
+saved as a checkpoint: a fixed header and one move byte per board, indexed
+by the board read as a base-3 number, as in bot_tables. Each checkpoint is
+served as the difficulty "learned-<level>".
+
+Serving reads the checkpoint into memory once and looks the move up, so a
+learned move costs the same as an easy or medium one. Checkpoints live in
+TIKTACTOE_LEARNED_DIR; a level without one is simply not offered.
+"""
+import os
+import struct
+import threading
+
+from bot_tables import NO_MOVE, ternary_index
+
+CHECKPOINT_MAGIC = b'TTTL'
+CHECKPOINT_VERSION = 1
+# magic, version, level, share of positions played perfectly, games trained
+HEADER = struct.Struct('<4sBB2xfI')
+POSITIONS = 3 ** 9
+
+# Percent of reachable positions in which each level plays perfectly. The
+# easy bot manages about 69 and the medium bot about 95.
+# records.py and state_store.py store difficulties by index: add new levels
+# at the end, or bump their format versions.
+LEVELS = (75, 85, 90, 95, 98)
+DIFFICULTIES = tuple(f'learned-{level}' for level in LEVELS)
+
+
+def checkpoint_path(directory, level):
+    return os.path.join(directory, f'learned-{level}.bin')
+
+
+def write_checkpoint(path, level, accuracy, games, moves):
+    """Save a policy, replacing any earlier checkpoint in one step"""
+    if len(moves) != POSITIONS:
+        raise ValueError(f'A policy needs {POSITIONS} moves, got {len(moves)}')
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION, level, accuracy, games))
+        f.write(bytes(moves))
+    os.replace(tmp_path, path)
+
+
+def read_checkpoint(path):
+    """Load a checkpoint as (details, moves)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, version, level, accuracy, games = HEADER.unpack_from(data)
+    if magic != CHECKPOINT_MAGIC or version != CHECKPOINT_VERSION:
+        raise ValueError(f'{path} is not a version {CHECKPOINT_VERSION} checkpoint')
+    moves = data[HEADER.size:]
+    if len(moves) != POSITIONS:
+        raise ValueError(f'{path} is truncated')
+    return {'level': level, 'accuracy': accuracy, 'games': games}, moves
+
+
+class LearnedPolicies:
+    """The checkpoints found in a directory, each loaded on first use"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        # Difficulty -> moves, or None when there is no usable checkpoint
+        self._moves = {}
+        self._lock = threading.Lock()
+
+    def _load(self, difficulty):
+        if difficulty not in self._moves:
+            with self._lock:
+                if difficulty not in self._moves:
+                    level = LEVELS[DIFFICULTIES.index(difficulty)]
+                    try:
+                        _, moves = read_checkpoint(checkpoint_path(self.directory, level))
+                    except (OSError, ValueError):
+                        moves = None
+                    self._moves[difficulty] = moves
+        return self._moves[difficulty]
+
+    def available(self, difficulty):
+        return difficulty in DIFFICULTIES and self._load(difficulty) is not None
+
+    def move(self, board, player, difficulty):
+        """The learned move on the classic board, or None.
+
+        None when there is no checkpoint, ``player`` is not the side to
+        move, or the policy has no move for the board.
+        """
+        moves = self._load(difficulty) if difficulty in DIFFICULTIES else None
+        if moves is None:
+            return None
+        if player != ('X' if board.move_count() % 2 == 0 else 'O'):
+            return None
+        move = moves[ternary_index(board)]
+        if move == NO_MOVE or not board.is_empty(move):
+            return None
+        return move
+
+
+# The checkpoints shipped next to this module, whatever the working directory
+LEARNED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'learned')
+LEARNED = LearnedPolicies(os.environ.get('TIKTACTOE_LEARNED_DIR', LEARNED_DIR))
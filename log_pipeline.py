@@ -0,0 +1,243 @@
+"""Non-blocking structured logging for app_bot.py
+
+Request threads only put log records on a bounded in-memory queue; a
+background listener thread formats them as JSON lines and writes them to a
+size-rotated file. If the disk is slow the queue absorbs it, and if the queue
+fills up records are dropped (and counted) rather than making a request wait.
+
+Only the process that called setup_logging writes the file. Processes forked
+from it, such as the workers of a preloading server, send their records to
+it as datagrams over a socket pair instead, from their own background
+thread. Rotating the file from several processes at once would lose lines.
+A datagram that does not fit in the socket's buffer is dropped, like a
+record that does not fit in the queue.
+
+Structured fields are passed with ``extra``, for example::
+
+    logging.info('Bot move', extra={'route': 'make_move', 'game_id': game_id,
+                                    'difficulty': 'hard', 'search_ms': 0.4})
+
+Per-route controls, both optional, come from the environment:
+
+    TIKTACTOE_LOG_SAMPLE="make_move=0.1,get_game_state=0"
+        keep this fraction of a route's records below WARNING
+    TIKTACTOE_LOG_ROUTE_LEVELS="reset_game=WARNING"
+        drop a route's records below this level
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import socket
+import threading
+
+# Attributes every LogRecord has; anything else came in through ``extra``
+_STANDARD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {
+    'message', 'asctime', 'taskName'
+}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with any ``extra`` fields included"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Per-route sampling and minimum levels, keyed on a record's ``route``"""
+
+    def __init__(self, sample_rates=None, route_levels=None):
+        super().__init__()
+        self.sample_rates = sample_rates or {}
+        self.route_levels = route_levels or {}
+
+    def filter(self, record):
+        route = getattr(record, 'route', None)
+        if route is None:
+            return True
+        if record.levelno < self.route_levels.get(route, logging.NOTSET):
+            return False
+        # Warnings and errors are always kept
+        rate = self.sample_rates.get(route, 1.0)
+        if record.levelno < logging.WARNING and rate < 1.0:
+            return random.random() < rate
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Render the message and traceback here, but leave the structured
+        # fields alone so the listener can write them out as JSON
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class ForwardingHandler(logging.Handler):
+    """Sends records as JSON datagrams to the process that writes the file"""
+
+    def __init__(self, sock):
+        super().__init__()
+        self.sock = sock
+        self.dropped = 0
+
+    def emit(self, record):
+        try:
+            self.sock.send(json.dumps(vars(record), default=str).encode('utf-8'))
+        except OSError:  # Buffer full, or the record is too big
+            self.dropped += 1
+
+
+def _receive(sock, log_queue):
+    """Put the records sent by forked processes on the writer's queue"""
+    while True:
+        data = sock.recv(1 << 18)
+        if not data:
+            return
+        try:
+            log_queue.put_nowait(logging.makeLogRecord(json.loads(data)))
+        except (ValueError, queue.Full):
+            pass
+
+
+class BackgroundListener(logging.handlers.QueueListener):
+    """QueueListener that can be stopped more than once"""
+
+    def start(self):
+        self._pid = os.getpid()
+        super().start()
+
+    def enqueue_sentinel(self):
+        # Wait for room: the listener is draining the queue
+        self.queue.put(self._sentinel)
+
+    def stop(self):
+        # A forked child has no listener thread to wait for
+        if self._thread is not None and self._pid == os.getpid():
+            super().stop()
+
+
+def _parse_mapping(value, convert):
+    mapping = {}
+    for item in filter(None, (part.strip() for part in value.split(','))):
+        route, _, setting = item.partition('=')
+        mapping[route.strip()] = convert(setting.strip())
+    return mapping
+
+
+def _level(name):
+    return logging.getLevelName(name.upper()) if not name.isdigit() else int(name)
+
+
+# The last setup_logging call's filter, queue size and listener, and the
+# socket pair forked processes send their records over
+_settings = None
+_listener = None
+_sockets = None
+
+
+def setup_logging(path=None, level=None, max_bytes=None, backup_count=None,
+                  queue_size=10000):
+    """Route all logging through a background JSON writer.
+
+    Returns the QueueListener, which is also stopped (flushing the queue)
+    when the process exits.
+    """
+    path = path or os.environ.get('TIKTACTOE_LOG_PATH', 'log.txt')
+    level = level or _level(os.environ.get('TIKTACTOE_LOG_LEVEL', 'INFO'))
+    if max_bytes is None:
+        max_bytes = int(os.environ.get('TIKTACTOE_LOG_MAX_BYTES', 10 * 1024 * 1024))
+    if backup_count is None:
+        backup_count = int(os.environ.get('TIKTACTOE_LOG_BACKUPS', 5))
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+    file_handler.setFormatter(JsonFormatter())
+
+    sampling = SamplingFilter(
+        _parse_mapping(os.environ.get('TIKTACTOE_LOG_SAMPLE', ''), float),
+        _parse_mapping(os.environ.get('TIKTACTOE_LOG_ROUTE_LEVELS', ''), _level)
+    )
+    log_queue = queue.Queue(queue_size)
+    listener = _install(log_queue, sampling, level, file_handler)
+
+    global _settings, _listener, _sockets
+    if _sockets is not None:
+        # An empty datagram stops the old receiving thread
+        _sockets[1].send(b'')
+        for sock in _sockets:
+            sock.close()
+        _sockets = None
+    if hasattr(os, 'register_at_fork') and hasattr(socket, 'AF_UNIX'):
+        if _settings is None:
+            os.register_at_fork(after_in_child=_forward_after_fork)
+        _sockets = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        _sockets[1].setblocking(False)
+        threading.Thread(target=_receive, args=(_sockets[0], log_queue),
+                         name='log-receiver', daemon=True).start()
+    _settings = (sampling, level, queue_size)
+    _listener = listener
+    return listener
+
+
+def _install(log_queue, sampling, level, handler):
+    """Send the root logger's records through log_queue to handler"""
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(sampling)
+
+    root = logging.getLogger()
+    for old_handler in root.handlers[:]:
+        root.removeHandler(old_handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = BackgroundListener(log_queue, handler)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+def _forward_after_fork():
+    # Threads and the writer's queue do not survive fork, so a forked worker
+    # gets its own queue and thread, which send its records to the writer
+    global _listener
+    if _sockets is None:
+        return
+    for handler in _listener.handlers:
+        handler.close()
+    sampling, level, queue_size = _settings
+    _listener = _install(queue.Queue(queue_size), sampling, level,
+                         ForwardingHandler(_sockets[1]))
@@ -0,0 +1,375 @@
+"""In-process metrics, served in the Prometheus text format at /metrics
+
+Counters and histograms are plain dicts keyed by label values, each guarded by
+its own lock, so recording a request costs a dict update and no I/O. Gauges
+are read when the metrics are scraped.
+
+Every worker process keeps its own numbers. Under a multi-worker server, set
+TIKTACTOE_METRICS_DIR to a directory shared by the workers (and emptied when
+the server starts). Each worker then writes a snapshot of its metrics there
+every few seconds from a background thread. Whichever worker answers
+/metrics adds up the snapshots of all of them. The counters of a worker that
+has exited are still included; its gauges are not.
+"""
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+
+from flask import Response, g, request
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+REQUEST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BOT_MOVE_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+                    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+
+class Histogram:
+    """Bucket counts followed by the sum of the observed values, per label set"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=REQUEST_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {labels: list(series) for labels, series in self._values.items()}
+
+
+class Gauge:
+    """Value read from callbacks at scrape time; callbacks' values add up.
+
+    With kind='counter' it exposes a count kept elsewhere, e.g. a stats
+    attribute, as a counter. With aggregate='max' the largest value is
+    reported instead of the sum, across callbacks and workers alike: for a
+    setting each worker holds, such as a capacity.
+    """
+
+    def __init__(self, name, help_text, labelnames=(), kind='gauge', aggregate='sum'):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.kind = kind
+        self.aggregate = aggregate
+        self._callbacks = []
+
+    def add_callback(self, callback):
+        """callback() returns a dict of label tuple -> value"""
+        self._callbacks.append(callback)
+
+    def snapshot(self):
+        values = {}
+        for callback in self._callbacks:
+            for labels, value in callback().items():
+                if labels in values and self.aggregate == 'max':
+                    values[labels] = max(values[labels], value)
+                else:
+                    values[labels] = values.get(labels, 0) + value
+        return values
+
+
+def _merge(metric, into, series):
+    for labels, value in series.items():
+        labels = tuple(str(label) for label in labels)
+        current = into.get(labels)
+        if current is None:
+            into[labels] = value
+        elif metric.kind == 'histogram':
+            if len(current) == len(value):
+                into[labels] = [a + b for a, b in zip(current, value)]
+        elif metric.kind == 'gauge' and metric.aggregate == 'max':
+            into[labels] = max(current, value)
+        else:
+            into[labels] = current + value
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_text(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Registry:
+    """All metrics of one process, plus the snapshots shared between workers"""
+
+    def __init__(self, directory=None, flush_interval=5.0):
+        self.metrics = {}
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, *args, **kwargs):
+        # Registering the same name again returns the existing metric, so
+        # both apps can be imported into one process
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = self.metrics[name] = cls(name, *args, **kwargs)
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter, name, help_text, labelnames)
+
+    def histogram(self, name, help_text, labelnames=(), buckets=REQUEST_BUCKETS):
+        return self._register(Histogram, name, help_text, labelnames, buckets)
+
+    def gauge(self, name, help_text, labelnames=(), kind='gauge', aggregate='sum'):
+        return self._register(Gauge, name, help_text, labelnames, kind, aggregate)
+
+    def snapshot(self):
+        """This process's values, as {metric name: {label tuple: value}}"""
+        return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+    def collect(self):
+        """This process's values added to those of the other workers"""
+        merged = {name: {} for name in self.metrics}
+        for name, series in self.snapshot().items():
+            _merge(self.metrics[name], merged[name], series)
+        if not self.directory:
+            return merged
+
+        own = f'{os.getpid()}.json'
+        now = time.time()
+        try:
+            files = os.listdir(self.directory)
+        except OSError:
+            return merged
+        for filename in files:
+            if not filename.endswith('.json') or filename == own:
+                continue
+            try:
+                with open(os.path.join(self.directory, filename), encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue  # Being replaced, or not one of ours
+            stale = now - data.get('time', 0) > 3 * self.flush_interval
+            for name, entries in data.get('metrics', {}).items():
+                metric = self.metrics.get(name)
+                if metric is None or (stale and metric.kind == 'gauge'):
+                    continue
+                _merge(metric, merged[name], {tuple(labels): value for labels, value in entries})
+        return merged
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for name, series in self.collect().items():
+            metric = self.metrics[name]
+            lines.append(f'# HELP {name} {metric.help_text}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for labels, value in sorted(series.items()):
+                if metric.kind != 'histogram':
+                    lines.append(f'{name}{_label_text(metric.labelnames, labels)} {value}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (float('inf'),), value):
+                    cumulative += count
+                    le = 'le="+Inf"' if bound == float('inf') else f'le="{bound}"'
+                    lines.append(f'{name}_bucket{_label_text(metric.labelnames, labels, le)} '
+                                 f'{cumulative}')
+                label_text = _label_text(metric.labelnames, labels)
+                lines.append(f'{name}_sum{label_text} {value[-1]}')
+                lines.append(f'{name}_count{label_text} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+    def write_snapshot(self):
+        """Write this process's values where the other workers can read them"""
+        path = os.path.join(self.directory, f'{os.getpid()}.json')
+        data = {
+            'time': time.time(),
+            'metrics': {name: [[list(labels), value] for labels, value in series.items()]
+                        for name, series in self.snapshot().items()}
+        }
+        try:
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(path + '.tmp', path)
+        except OSError:
+            pass
+
+    def ensure_flusher(self):
+        """Start the snapshot thread in this process, if sharing is turned on"""
+        # Checked again in a forked worker, where threads started by the
+        # parent do not exist
+        if not self.directory or (self._thread is not None and self._pid == os.getpid()):
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='metrics-flusher',
+                                                daemon=True)
+                self._thread.start()
+                atexit.register(self.write_snapshot)
+
+    def _run(self):
+        while True:
+            self.write_snapshot()
+            time.sleep(self.flush_interval)
+
+
+def resident_memory():
+    """Resident set size of this process in bytes"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return 0
+    # Peak rather than current, where /proc is not available (kB on Linux)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+REGISTRY = Registry(os.environ.get('TIKTACTOE_METRICS_DIR') or None)
+
+REQUESTS = REGISTRY.counter(
+    'tiktactoe_http_requests_total', 'HTTP requests handled',
+    ('mode', 'route', 'method', 'status'))
+REQUEST_SECONDS = REGISTRY.histogram(
+    'tiktactoe_http_request_duration_seconds', 'Time spent handling HTTP requests',
+    ('mode', 'route'))
+BOT_MOVE_SECONDS = REGISTRY.histogram(
+    'tiktactoe_bot_move_seconds', 'Time the bot spent choosing a move',
+    ('difficulty', 'size'), BOT_MOVE_BUCKETS)
+MOVES = REGISTRY.counter(
+    'tiktactoe_moves_total', 'Moves submitted by players, valid or not',
+    ('mode', 'result'))
+ACTIVE_GAMES = REGISTRY.gauge(
+    'tiktactoe_active_games', 'Games held in memory', ('mode',))
+STATE_CONFLICTS = REGISTRY.gauge(
+    'tiktactoe_state_conflicts_total', 'Requests refused because another changed the game',
+    ('mode',), kind='counter')
+MEMORY = REGISTRY.gauge(
+    'tiktactoe_resident_memory_bytes', 'Resident memory of the worker processes')
+MEMORY.add_callback(lambda: {(): resident_memory()})
+BOT_POOL_PROCESSES = REGISTRY.gauge(
+    'tiktactoe_bot_pool_processes', 'Processes in the bot search pool')
+BOT_POOL_BUSY = REGISTRY.gauge(
+    'tiktactoe_bot_pool_busy', 'Bot search pool processes running a search')
+BOT_POOL_QUEUED = REGISTRY.gauge(
+    'tiktactoe_bot_pool_queued', 'Bot searches waiting for a pool process')
+BOT_POOL_SEARCHES = REGISTRY.gauge(
+    'tiktactoe_bot_pool_searches_total', 'Bot searches sent to the pool, by outcome',
+    ('outcome',), kind='counter')
+TT_ENTRIES = REGISTRY.gauge(
+    'tiktactoe_transposition_entries', 'Entries held in the bot transposition table')
+TT_MAX_ENTRIES = REGISTRY.gauge(
+    'tiktactoe_transposition_max_entries',
+    'Most entries the bot transposition table keeps, in each worker', aggregate='max')
+TT_LOOKUPS = REGISTRY.gauge(
+    'tiktactoe_transposition_lookups_total', 'Bot transposition table lookups, by result',
+    ('result',), kind='counter')
+RATE_LIMITED = REGISTRY.counter(
+    'tiktactoe_rate_limited_total', 'Requests refused by the rate limiter', ('route',))
+SHED_MOVES = REGISTRY.counter(
+    'tiktactoe_shed_moves_total', 'Hard bot moves cut down to a shallow search under load',
+    ('size',))
+OVERLOADED = REGISTRY.gauge(
+    'tiktactoe_overloaded', 'Workers shedding load (1 while over a threshold)')
+
+
+def record_move(mode, valid):
+    MOVES.inc(mode, 'valid' if valid else 'invalid')
+
+
+def metrics_view():
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+
+def install_pool_metrics(pool):
+    """Report a bot_pool.SearchPool's size, load and outcomes"""
+    BOT_POOL_PROCESSES.add_callback(lambda: {(): pool.workers})
+    BOT_POOL_BUSY.add_callback(lambda: {(): pool.busy()})
+    BOT_POOL_QUEUED.add_callback(lambda: {(): pool.queued()})
+    BOT_POOL_SEARCHES.add_callback(
+        lambda: {(outcome,): count for outcome, count in pool.outcomes.items()})
+
+
+def install_metrics(app, games, mode):
+    """Time every request to app, a Flask app or blueprint, and count its games.
+
+    ``mode`` labels this app's series: 'human' or 'bot', as in the records.
+    """
+    ACTIVE_GAMES.add_callback(lambda: {(mode,): len(games)})
+    # Only a shared state_store.SharedGameStore can have conflicts
+    STATE_CONFLICTS.add_callback(lambda: {(mode,): getattr(games, 'conflicts', 0)})
+
+    @app.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        start = g.pop('metrics_start', None)
+        if start is not None:
+            # Unmatched URLs share one label so they cannot blow up the series
+            # A blueprint's endpoints are named e.g. 'bot.make_move'
+            route = (request.endpoint or 'unmatched').rpartition('.')[2]
+            REQUEST_SECONDS.observe(time.perf_counter() - start, mode, route)
+            REQUESTS.inc(mode, route, request.method, str(response.status_code))
+        REGISTRY.ensure_flusher()
+        return response
+
+
+def serve_metrics(app):
+    """Serve the metrics of every mode at /metrics"""
+    app.add_url_rule('/metrics', 'metrics', metrics_view, methods=['GET'])
+
+
+def install_transposition_metrics(table):
+    """Report a transposition.TranspositionTable's size and hit rate"""
+    TT_ENTRIES.add_callback(lambda: {(): len(table)})
+    TT_MAX_ENTRIES.add_callback(lambda: {(): table.max_entries})
+    TT_LOOKUPS.add_callback(lambda: {('hit',): table.hits, ('miss',): table.misses})
+
+
+def install_load_metrics(monitor):
+    """Report whether an admission.LoadMonitor is over its thresholds"""
+    OVERLOADED.add_callback(lambda: {(): int(monitor.overloaded())})
@@ -0,0 +1,303 @@
+"""Statistics for every position on the classic board, served from a file
+
+For each of the 3**9 boards, indexed like the compiled move tables (see
+bot_tables.ternary_index), the artifact holds:
+
+- whether the board can come up in a game, and whether the game is over;
+- the outcome for the side to move under perfect play, and how many moves
+  are left until the end when both sides play perfectly (the winner as
+  quickly, the loser as slowly as they can);
+- how many moves keep a forced win for the side to move;
+- for each difficulty, the chance that its move throws away part of that
+  outcome (a win turned into a draw or loss, or a draw into a loss).
+
+Building it takes NumPy. All boards are decoded at once into a cells array,
+lines are checked against every board in one masked compare, and the
+outcomes are filled in level by level from full boards back to the empty
+one, each level a handful of array operations. The blunder chances come
+from the same compiled policies the bot plays with.
+
+Serving it does not: the file is a fixed header and one fixed-size record
+per board, mapped with mmap and read with struct, so a lookup is an offset
+computation and every worker shares the same pages. A request never builds
+it; create_app() does when it is missing, or it is built ahead of time:
+
+    python position_stats.py build
+"""
+import argparse
+import importlib.util
+import logging
+import mmap
+import os
+import struct
+import subprocess
+import sys
+import threading
+
+from bot_tables import NO_MOVE, load as load_tables, ternary_index
+from engine import FULL_MASK, STANDARD, Board
+
+STATS_MAGIC = b'TTTS'
+STATS_VERSION = 1
+# magic, version, number of records
+HEADER = struct.Struct('<4sB3xI')
+# flags, outcome, moves_left, winning_moves, blunder chance per difficulty
+RECORD = struct.Struct('<BbBB3f')
+
+LEGAL = 1
+GAME_OVER = 2
+
+POSITIONS = 3 ** 9
+DIFFICULTIES = ('easy', 'medium', 'hard')
+OUTCOMES = {1: 'win', 0: 'draw', -1: 'loss'}
+
+
+def has_numpy():
+    return importlib.util.find_spec('numpy') is not None
+
+
+def solve_boards():
+    """Solve all 3**9 boards at once.
+
+    Returns a dict of NumPy arrays indexed by board number: the ``x`` and
+    ``o`` masks, ``legal`` and ``game_over`` flags, and for the side to move
+    the perfect-play ``outcome`` (1, 0 or -1), ``moves_left`` and
+    ``winning_moves``. ``blunders`` has a row of 9 flags per board, set for
+    the empty cells whose move gives part of the outcome away.
+    """
+    # Imported here, so serving the file never loads NumPy into the workers
+    import numpy as np
+
+    powers = 3 ** np.arange(9)
+    codes = np.arange(POSITIONS)
+    cells = codes[:, None] // powers % 3
+    bit_values = 1 << np.arange(9)
+    x = (cells == 1) @ bit_values
+    o = (cells == 2) @ bit_values
+    x_count = (cells == 1).sum(axis=1)
+    o_count = (cells == 2).sum(axis=1)
+    filled = x_count + o_count
+
+    lines = np.array(STANDARD.line_masks)
+    x_won = ((x[:, None] & lines) == lines).any(axis=1)
+    o_won = ((o[:, None] & lines) == lines).any(axis=1)
+
+    # X moves first, and the game stops at the first completed line, so the
+    # player who completed it made the last move
+    legal = (x_count == o_count) | (x_count == o_count + 1)
+    legal &= ~(x_won & o_won)
+    legal &= ~(x_won & (x_count == o_count))
+    legal &= ~(o_won & (x_count != o_count))
+    game_over = legal & (x_won | o_won | (filled == 9))
+
+    # From the point of view of the side to move: it has lost if the last
+    # move completed a line, and the game is drawn on a full board otherwise
+    outcome = np.zeros(POSITIONS, np.int8)
+    outcome[game_over & (x_won | o_won)] = -1
+    moves_left = np.zeros(POSITIONS, np.uint8)
+    winning_moves = np.zeros(POSITIONS, np.uint8)
+    blunders = np.zeros((POSITIONS, 9), bool)
+
+    for level in range(8, -1, -1):
+        index = np.flatnonzero(legal & ~game_over & (filled == level))
+        empty = cells[index] == 0
+        mark = 1 if level % 2 == 0 else 2
+        children = np.where(empty, index[:, None] + mark * powers, 0)
+        # Each move's outcome for the mover is the reverse of the reply's
+        child_outcome = np.where(empty, -outcome[children], -2)
+        child_left = moves_left[children].astype(np.int16) + 1
+        best = child_outcome.max(axis=1)
+        optimal = child_outcome == best[:, None]
+
+        outcome[index] = best
+        # Win as soon as possible; otherwise hold on as long as possible
+        moves_left[index] = np.where(
+            best == 1,
+            np.where(optimal, child_left, 99).min(axis=1),
+            np.where(optimal, child_left, 0).max(axis=1))
+        winning_moves[index] = (child_outcome == 1).sum(axis=1)
+        blunders[index] = empty & ~optimal
+
+    return {
+        'x': x, 'o': o, 'legal': legal, 'game_over': game_over, 'outcome': outcome,
+        'moves_left': moves_left, 'winning_moves': winning_moves, 'blunders': blunders
+    }
+
+
+def compute_stats():
+    """Statistics for all 3**9 boards, as a NumPy record array"""
+    import numpy as np
+
+    def bits(masks):
+        """Rows of 9 booleans, one per cell, for an array of cell masks"""
+        return (masks[:, None] >> np.arange(9)) & 1 == 1
+
+    def choice_blunders(blunders, choices):
+        """Chance that a uniform pick among ``choices`` cells is a blunder"""
+        counts = choices.sum(axis=1)
+        return (blunders & choices).sum(axis=1) / np.maximum(counts, 1)
+
+    solved = solve_boards()
+    tables = load_tables()
+    x, o, legal, game_over = solved['x'], solved['o'], solved['legal'], solved['game_over']
+    blunders = solved['blunders']
+    stats = np.zeros(POSITIONS, np.dtype([
+        ('flags', 'u1'), ('outcome', 'i1'), ('moves_left', 'u1'),
+        ('winning_moves', 'u1'), ('blunder', '<f4', (3,))]))
+    stats['flags'] = legal * LEGAL + game_over * GAME_OVER
+    stats['outcome'] = solved['outcome']
+    stats['moves_left'] = solved['moves_left']
+    stats['winning_moves'] = solved['winning_moves']
+
+    # The compiled policies: easy plays its smart move 30% of the time when
+    # it has one and a random empty cell otherwise, medium picks among its
+    # candidate cells, hard plays its one solved move
+    live = np.flatnonzero(legal & ~game_over)
+    live_blunders = blunders[live]
+    empty = bits(FULL_MASK & ~(x[live] | o[live]))
+    random_blunder = choice_blunders(live_blunders, empty)
+
+    easy = np.frombuffer(tables['EASY_TABLE'], np.uint8)[live]
+    smart = easy != NO_MOVE
+    smart_blunder = live_blunders[np.arange(len(live)), np.where(smart, easy, 0)]
+    stats['blunder'][live, 0] = np.where(
+        smart, 0.3 * smart_blunder + 0.7 * random_blunder, random_blunder)
+
+    medium = np.frombuffer(tables['MEDIUM_TABLE'], np.uint16)[live] & FULL_MASK
+    stats['blunder'][live, 1] = choice_blunders(live_blunders, bits(medium))
+
+    hard = np.frombuffer(tables['HARD_MOVES'], np.uint8)[live]
+    known = hard != NO_MOVE
+    stats['blunder'][live, 2] = np.where(
+        known, live_blunders[np.arange(len(live)), np.where(known, hard, 0)], 0)
+    return stats
+
+
+def write_stats(path, stats=None):
+    """Write the statistics file, replacing any earlier one in one step"""
+    if stats is None:
+        stats = compute_stats()
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(STATS_MAGIC, STATS_VERSION, len(stats)))
+        f.write(stats.tobytes())
+    os.replace(tmp_path, path)
+    return stats
+
+
+class PositionStats:
+    """A statistics file mapped into memory"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = HEADER.unpack_from(self._map)
+        if magic != STATS_MAGIC or version != STATS_VERSION:
+            raise ValueError(f'{path} is not a version {STATS_VERSION} statistics file')
+        if count != POSITIONS or len(self._map) != HEADER.size + count * RECORD.size:
+            raise ValueError(f'{path} is truncated')
+
+    def lookup(self, board):
+        """Statistics for a classic board, or None if no game can reach it"""
+        flags, outcome, moves_left, winning_moves, *blunder = RECORD.unpack_from(
+            self._map, HEADER.size + ternary_index(board) * RECORD.size)
+        if not flags & LEGAL:
+            return None
+        result = {
+            'player': 'X' if board.move_count() % 2 == 0 else 'O',
+            'game_over': bool(flags & GAME_OVER),
+            'outcome': OUTCOMES[outcome],
+            'moves_left': moves_left
+        }
+        if not result['game_over']:
+            result['winning_moves'] = winning_moves
+            result['blunder_rate'] = {
+                difficulty: round(rate, 4) for difficulty, rate in zip(DIFFICULTIES, blunder)
+            }
+        return result
+
+
+def parse_board(text):
+    """A classic board from 9 characters, row by row: X, O, or . for empty.
+
+    Raises ValueError with a message suitable for the client.
+    """
+    if not isinstance(text, str) or len(text) != 9:
+        raise ValueError('Board must be 9 characters, row by row')
+    cells = []
+    for char in text.upper():
+        if char not in 'XO.-_':
+            raise ValueError("Cells must be 'X', 'O' or '.'")
+        cells.append(char if char in 'XO' else '')
+    return Board.from_list(cells)
+
+
+_stats = None
+_stats_lock = threading.Lock()
+
+
+def stats_path():
+    """The file named by TIKTACTOE_STATS_PATH, next to this module by default"""
+    return os.environ.get('TIKTACTOE_STATS_PATH', os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'position_stats.bin'))
+
+
+def build_stats():
+    """Build the statistics file if it does not exist yet.
+
+    Called from create_app(), so a preloading server builds it once before
+    the workers are forked. The build runs in a child process, which keeps
+    NumPy out of the server and its workers. Returns False when there is
+    still no file afterwards.
+    """
+    path = stats_path()
+    if not os.path.exists(path):
+        if not has_numpy():
+            logging.error(f'No position statistics at {path}, and NumPy is not '
+                          'installed to build them; /stats will answer 503')
+            return False
+        build = subprocess.run([sys.executable, os.path.abspath(__file__), 'build',
+                                '--output', path], capture_output=True, text=True)
+        if build.returncode != 0:
+            logging.error(f'Building position statistics at {path} failed: {build.stderr}')
+            return False
+    return True
+
+
+def get_stats():
+    """This process's statistics, mapped on first use.
+
+    Returns None, without building anything, while the file does not
+    exist; see build_stats() and ``python position_stats.py build``.
+    """
+    global _stats
+    if _stats is None:
+        with _stats_lock:
+            path = stats_path()
+            if _stats is None and os.path.exists(path):
+                _stats = PositionStats(path)
+    return _stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Position statistics tools')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build_parser = commands.add_parser('build', help='compute the statistics file')
+    build_parser.add_argument('--output', default=stats_path())
+    args = parser.parse_args()
+
+    stats = write_stats(args.output)
+    legal = stats['flags'] & LEGAL == LEGAL
+    over = stats['flags'] & GAME_OVER == GAME_OVER
+    print(f'{legal.sum()} reachable positions, {over.sum()} of them finished, '
+          f'written to {args.output}')
+    for level, name in ((1, 'win'), (0, 'draw'), (-1, 'loss')):
+        count = (legal & ~over & (stats['outcome'] == level)).sum()
+        print(f'  {count} positions are a {name} for the side to move')
+    for column, difficulty in enumerate(DIFFICULTIES):
+        rate = stats['blunder'][legal & ~over, column].mean()
+        print(f'  {difficulty}: mean blunder chance {rate:.3f}')
+
+
+if __name__ == '__main__':
+    main()
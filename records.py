@@ -0,0 +1,217 @@
+"""Append-only store of finished games
+
+Every finished game from both apps is appended to a binary file as one
+fixed-size header followed by its moves, one byte per move:
+
+    version, mode, size, win_length, difficulty, human_player, winner,
+    started_at, finished_at, move_count, moves...
+
+Records are handed to a background thread and written in batches, so a
+request never waits on the disk. Several processes may append to the same
+file: each batch goes out in a single O_APPEND write.
+
+To dump a store without loading it into memory:
+
+    python records.py export game_records.bin --format csv > games.csv
+    python records.py export game_records.bin --format jsonl > games.jsonl
+"""
+import argparse
+import atexit
+import csv
+import json
+import logging
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+
+from learned_policy import DIFFICULTIES as LEARNED_DIFFICULTIES
+
+RECORD_VERSION = 1
+HEADER = struct.Struct('<BBBBBBBddB')
+
+MODES = ('human', 'bot')
+# Stored by index. Index 0 is "no difficulty" (human vs. human); new
+# difficulties go at the end, after the learned ones
+DIFFICULTIES = ('', 'easy', 'medium', 'hard') + LEARNED_DIFFICULTIES
+PLAYERS = ('', 'X', 'O')
+WINNERS = ('', 'X', 'O', 'Tie')
+
+CSV_FIELDS = ('mode', 'size', 'win_length', 'difficulty', 'human_player',
+              'winner', 'started_at', 'finished_at', 'moves')
+
+
+def encode_record(record):
+    """Pack a record dict (as returned by get_record()) into bytes"""
+    moves = bytes(record['moves'])
+    return HEADER.pack(
+        RECORD_VERSION,
+        MODES.index(record['mode']),
+        record['size'],
+        record['win_length'],
+        DIFFICULTIES.index(record.get('difficulty') or ''),
+        PLAYERS.index(record.get('human_player') or ''),
+        WINNERS.index(record['winner']),
+        record['started_at'],
+        record['finished_at'],
+        len(moves)
+    ) + moves
+
+
+def iter_records(path, chunk_size=1 << 20):
+    """Yield the records in a store one by one, oldest first"""
+    with open(path, 'rb', buffering=chunk_size) as f:
+        while True:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                return
+            (version, mode, size, win_length, difficulty, human_player,
+             winner, started_at, finished_at, move_count) = HEADER.unpack(header)
+            if version != RECORD_VERSION:
+                raise ValueError(f'Unknown record version {version} in {path}')
+            moves = f.read(move_count)
+            if len(moves) < move_count:
+                return  # Truncated last record from an interrupted write
+            yield {
+                'mode': MODES[mode],
+                'size': size,
+                'win_length': win_length,
+                'difficulty': DIFFICULTIES[difficulty] or None,
+                'human_player': PLAYERS[human_player] or None,
+                'winner': WINNERS[winner],
+                'started_at': started_at,
+                'finished_at': finished_at,
+                'moves': list(moves)
+            }
+
+
+class RecordWriter:
+    """Buffers records and appends them to a file from a background thread"""
+
+    def __init__(self, path, batch_size=512, flush_interval=1.0, max_pending=100000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.written = 0
+        self._queue = queue.Queue(max_pending)
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def submit(self, record):
+        """Queue a record for writing; never blocks the caller"""
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(encode_record(record))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """Write out everything queued so far and stop the thread"""
+        if self._thread is not None and self._pid == os.getpid():
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _ensure_thread(self):
+        # Started lazily, and again in a forked worker, where threads
+        # started by the parent do not exist
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='record-writer',
+                                                daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            stopping = False
+            while not stopping:
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    try:
+                        item = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stopping = True
+                        break
+                    batch.append(item)
+                if batch:
+                    self._write(fd, b''.join(batch))
+                    self.written += len(batch)
+        finally:
+            os.close(fd)
+
+    def _write(self, fd, data):
+        try:
+            while data:
+                data = data[os.write(fd, data):]
+        except OSError as e:
+            logging.error(f"Could not write game records to {self.path}: {e}")
+
+
+_writer = None
+
+
+def get_writer():
+    """Get this process's writer, or None if recording is turned off"""
+    global _writer
+    if _writer is None:
+        path = os.environ.get('TIKTACTOE_RECORDS_PATH', 'game_records.bin')
+        if not path:
+            return None
+        _writer = RecordWriter(path)
+        atexit.register(_writer.close)
+    return _writer
+
+
+def record_game(record):
+    """Store a finished game's get_record(), if recording is turned on.
+
+    Routes take the record inside games.checkout() and store it once the
+    block has exited, so a move refused with 409 leaves no record behind.
+    """
+    writer = get_writer()
+    if writer is not None:
+        writer.submit(record)
+
+
+def export(path, fmt, out):
+    """Stream a store to CSV or JSON lines"""
+    if fmt == 'csv':
+        writer = csv.writer(out)
+        writer.writerow(CSV_FIELDS)
+        for record in iter_records(path):
+            record['moves'] = ' '.join(str(move) for move in record['moves'])
+            writer.writerow([record[field] for field in CSV_FIELDS])
+    else:
+        for record in iter_records(path):
+            out.write(json.dumps(record) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Game record store tools')
+    commands = parser.add_subparsers(dest='command', required=True)
+    export_parser = commands.add_parser('export', help='dump records as CSV or JSON lines')
+    export_parser.add_argument('path')
+    export_parser.add_argument('--format', choices=['csv', 'jsonl'], default='jsonl')
+    export_parser.add_argument('--output', help='file to write (default: stdout)')
+    args = parser.parse_args()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8', newline='') as out:
+            export(args.path, args.format, out)
+    else:
+        export(args.path, args.format, sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
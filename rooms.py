@@ -0,0 +1,324 @@
+"""Remote two-player rooms, pushed to both players over Server-Sent Events
+
+A small asyncio HTTP server, run next to app.py:
+
+    python rooms.py --port 5002
+
+Each room holds one TikTacToe game and the same rules apply as in app.py;
+the only difference is who may move. The first two players to join take X
+and O and get a token, which must come with every move. Anyone else who
+joins watches. Every change is pushed to every open event stream in the
+room, so nobody polls.
+
+    POST /rooms                     create a room: {"room_id"}
+    POST /rooms/<id>/join           take a seat: {"player", "token"}, or
+                                    {"player": null} once both are taken.
+                                    Send {"token"} to get your seat back.
+    POST /rooms/<id>/move           {"token", "position"}
+    POST /rooms/<id>/reset          {"token", "size", "win_length"}
+    GET  /rooms/<id>                the room's current state
+    GET  /rooms/<id>/events         text/event-stream of "state" events
+
+Each open stream costs one coroutine and its socket buffers, and nothing
+runs for an idle stream except a shared keep-alive comment every 15
+seconds. That lets one process hold tens of thousands of them, as long as
+the open file limit (ulimit -n) allows.
+"""
+import argparse
+import asyncio
+import json
+import os
+import secrets
+import time
+
+from app import TikTacToe
+from engine import parse_board_settings
+from game_store import GAME_ID_PATTERN, new_game_id
+
+MAX_ROOMS = int(os.environ.get('TIKTACTOE_MAX_ROOMS', 100000))
+ROOM_TTL = int(os.environ.get('TIKTACTOE_ROOM_TTL', 1800))
+ALLOWED_ORIGIN = os.environ.get('TIKTACTOE_ROOMS_ORIGIN', '*')
+
+KEEPALIVE_INTERVAL = 15
+REQUEST_TIMEOUT = 10
+MAX_BODY = 4096
+MAX_WATCHERS = 64
+# A stream whose client stops reading is dropped once this much is queued
+MAX_STREAM_BUFFER = 64 * 1024
+
+REASONS = {200: 'OK', 204: 'No Content', 400: 'Bad Request', 403: 'Forbidden',
+           404: 'Not Found', 405: 'Method Not Allowed', 409: 'Conflict',
+           413: 'Payload Too Large', 503: 'Service Unavailable'}
+
+
+class Room:
+    """One game, its two seats and the event streams watching it"""
+
+    __slots__ = ('room_id', 'game', 'tokens', 'streams', 'version', 'last_active')
+
+    def __init__(self, room_id):
+        self.room_id = room_id
+        self.game = TikTacToe()
+        self.tokens = {'X': None, 'O': None}
+        self.streams = set()
+        self.version = 0
+        self.last_active = time.monotonic()
+
+    def player_for(self, token):
+        """The symbol whose seat this token holds, or None"""
+        if token:
+            for player, seat_token in self.tokens.items():
+                if seat_token is not None and secrets.compare_digest(seat_token, token):
+                    return player
+        return None
+
+    def join(self, token=None):
+        """Take a free seat, or get back the one a token holds.
+
+        Returns (player, token, seated), where seated says whether a new seat
+        was taken; player is None when both seats are taken.
+        """
+        player = self.player_for(token)
+        if player is not None:
+            return player, token, False
+        for player, seat_token in self.tokens.items():
+            if seat_token is None:
+                self.tokens[player] = secrets.token_urlsafe(16)
+                return player, self.tokens[player], True
+        return None, None, False
+
+    def get_state(self):
+        return {
+            'room_id': self.room_id,
+            'version': self.version,
+            'players': {player: token is not None for player, token in self.tokens.items()},
+            'watchers': len(self.streams),
+            'game_state': self.game.get_game_state()
+        }
+
+    def event(self):
+        """The room's state as one Server-Sent Event"""
+        data = json.dumps(self.get_state())
+        return f'id: {self.version}\nevent: state\ndata: {data}\n\n'.encode()
+
+    def changed(self):
+        """Bump the version and push the new state to every stream"""
+        self.version += 1
+        self.last_active = time.monotonic()
+        event = self.event()
+        for writer in list(self.streams):
+            _push(self, writer, event)
+
+
+def _push(room, writer, data):
+    # Writing only fills the socket's buffer; a stream that lets it grow
+    # past the limit has stopped reading and is dropped
+    if writer.is_closing() or writer.transport.get_write_buffer_size() > MAX_STREAM_BUFFER:
+        room.streams.discard(writer)
+        writer.close()
+    else:
+        writer.write(data)
+
+
+def _response(status, payload=None, headers=()):
+    body = json.dumps(payload).encode() if payload is not None else b''
+    lines = [f'HTTP/1.1 {status} {REASONS[status]}',
+             'Content-Type: application/json',
+             f'Content-Length: {len(body)}',
+             f'Access-Control-Allow-Origin: {ALLOWED_ORIGIN}',
+             'Connection: close']
+    lines.extend(headers)
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode() + body
+
+
+class RoomServer:
+    """The rooms of one process and the HTTP handling around them"""
+
+    def __init__(self, max_rooms=MAX_ROOMS, ttl=ROOM_TTL):
+        self.max_rooms = max_rooms
+        self.ttl = ttl
+        self.rooms = {}
+
+    def connections(self):
+        return sum(len(room.streams) for room in self.rooms.values())
+
+    async def handle(self, reader, writer):
+        """Serve one connection: one request, or one event stream"""
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), REQUEST_TIMEOUT)
+            request_line, *header_lines = head.decode('latin-1').split('\r\n')
+            method, target, _ = request_line.split(' ', 2)
+            headers = {}
+            for line in header_lines:
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get('content-length') or 0)
+            if length > MAX_BODY:
+                writer.write(_response(413, {'success': False, 'message': 'Body too large'}))
+                writer.close()
+                return
+            body = await asyncio.wait_for(reader.readexactly(length), REQUEST_TIMEOUT)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                asyncio.TimeoutError, ConnectionError, ValueError):
+            writer.close()
+            return
+
+        parts = target.partition('?')[0].strip('/').split('/')
+        if method == 'GET' and len(parts) == 3 and parts[0] == 'rooms' and parts[2] == 'events':
+            await self.stream(parts[1], reader, writer)
+            return
+
+        if method == 'OPTIONS':
+            response = _response(204, headers=(
+                'Access-Control-Allow-Methods: GET, POST, OPTIONS',
+                'Access-Control-Allow-Headers: Content-Type',
+                'Access-Control-Max-Age: 86400'))
+        else:
+            status, payload = self.dispatch(method, parts, body)
+            response = _response(status, payload)
+        writer.write(response)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+    def dispatch(self, method, parts, body):
+        """Route a plain request; returns (status, payload)"""
+        if parts == ['health'] and method == 'GET':
+            return 200, {'status': 'healthy', 'rooms': len(self.rooms),
+                         'connections': self.connections()}
+        if parts == ['rooms'] and method == 'POST':
+            return self.create_room()
+        if not 2 <= len(parts) <= 3 or parts[0] != 'rooms':
+            return 404, {'success': False, 'message': 'Not found'}
+
+        room = self.rooms.get(parts[1])
+        if room is None:
+            return 404, {'success': False, 'message': 'No such room'}
+        action = parts[2] if len(parts) == 3 else None
+        if action is None and method == 'GET':
+            return 200, room.get_state()
+        if method != 'POST' or action not in ('join', 'move', 'reset'):
+            return 405, {'success': False, 'message': 'Method not allowed'}
+
+        try:
+            data = json.loads(body or b'{}')
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            return 400, {'success': False, 'message': 'Expected a JSON object'}
+
+        if action == 'join':
+            player, token, seated = room.join(data.get('token'))
+            if seated:
+                room.changed()
+            return 200, {'success': True, 'player': player, 'token': token,
+                         'room': room.get_state()}
+
+        player = room.player_for(data.get('token'))
+        if player is None:
+            return 403, {'success': False, 'message': 'Not a player in this room'}
+
+        if action == 'reset':
+            room.game.reset_game(*parse_board_settings(data))
+            room.changed()
+            return 200, {'success': True, 'room': room.get_state()}
+
+        game = room.game
+        if player != game.current_player:
+            return 409, {'success': False, 'message': 'Not your turn'}
+        try:
+            position = int(data.get('position'))
+        except (TypeError, ValueError):
+            return 400, {'success': False, 'message': 'Invalid position'}
+        if not game.make_move(position):
+            return 409, {'success': False, 'message': 'Invalid move'}
+        room.changed()
+        return 200, {'success': True, 'room': room.get_state()}
+
+    def create_room(self):
+        if len(self.rooms) >= self.max_rooms:
+            self.evict_expired()
+            if len(self.rooms) >= self.max_rooms:
+                return 503, {'success': False, 'message': 'Too many rooms'}
+        room_id = new_game_id()
+        self.rooms[room_id] = Room(room_id)
+        return 200, {'success': True, 'room_id': room_id}
+
+    async def stream(self, room_id, reader, writer):
+        """Hold an event stream open until the client goes away"""
+        room = self.rooms.get(room_id) if GAME_ID_PATTERN.match(room_id) else None
+        if room is None:
+            writer.write(_response(404, {'success': False, 'message': 'No such room'}))
+            writer.close()
+            return
+        if len(room.streams) >= MAX_WATCHERS:
+            writer.write(_response(503, {'success': False, 'message': 'Room is full'}))
+            writer.close()
+            return
+
+        writer.write((
+            'HTTP/1.1 200 OK\r\n'
+            'Content-Type: text/event-stream\r\n'
+            'Cache-Control: no-cache\r\n'
+            f'Access-Control-Allow-Origin: {ALLOWED_ORIGIN}\r\n'
+            '\r\n'
+            'retry: 2000\n\n'
+        ).encode() + room.event())
+        room.streams.add(writer)
+        try:
+            # Clients send nothing more; this returns when they disconnect
+            while await reader.read(1024):
+                pass
+        except ConnectionError:
+            pass
+        finally:
+            room.streams.discard(writer)
+            writer.close()
+
+    def evict_expired(self):
+        """Drop rooms nobody has touched or watched for longer than the TTL"""
+        cutoff = time.monotonic() - self.ttl
+        for room_id, room in list(self.rooms.items()):
+            if room.last_active < cutoff and not room.streams:
+                del self.rooms[room_id]
+
+    async def keepalive(self):
+        """Keep idle streams from being cut by proxies; one task for all"""
+        while True:
+            await asyncio.sleep(KEEPALIVE_INTERVAL)
+            for room in list(self.rooms.values()):
+                for writer in list(room.streams):
+                    _push(room, writer, b': keep-alive\n\n')
+            self.evict_expired()
+
+
+async def serve(host='0.0.0.0', port=5002, ready=None):
+    """Run a RoomServer until cancelled. ``ready`` gets the bound server."""
+    rooms = RoomServer()
+    server = await asyncio.start_server(rooms.handle, host, port, backlog=4096)
+    keepalive = asyncio.create_task(rooms.keepalive())
+    if ready is not None:
+        ready(server, rooms)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        keepalive.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Remote two-player rooms')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5002)
+    args = parser.parse_args()
+    print(f"🌐 Rooms server listening on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""Depth- and time-limited search for boards too big to solve outright
+
+On the classic board the hard bot looks its moves up in the solved-game table.
+On 4x4 and 5x5 boards the game tree is far too large for that, so the hard bot
+runs an iterative deepening alpha-beta search instead: it searches one ply
+deeper at a time, scores the positions where it stops with a heuristic, and
+plays the best move of the deepest search that finished within its time
+budget.
+"""
+import time
+
+from engine import iter_bits
+
+# Scores at or beyond this are forced wins or losses; sooner is better
+WIN_SCORE = 1000000
+FORCED = WIN_SCORE - 1000
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time budget runs out"""
+
+
+def _popcount(mask):
+    return bin(mask).count('1')
+
+
+class DeepeningSearch:
+    """One iterative deepening search from one position"""
+
+    def __init__(self, geometry, time_budget, max_depth=None):
+        self.geometry = geometry
+        self.time_budget = time_budget
+        self.max_depth = max_depth
+        self.deadline = None
+        self.nodes = 0
+        # Best move found at each position by the previous iteration, tried
+        # first by the next one
+        self.best_moves = {}
+        # An open line holding n marks is worth 10**n, well below a win
+        self.weights = tuple(0 if n == 0 else 10 ** n
+                             for n in range(geometry.win_length))
+
+    def evaluate(self, me, opp):
+        """Heuristic score from the side to move's point of view"""
+        weights = self.weights
+        score = 0
+        for line in self.geometry.line_masks:
+            mine = me & line
+            theirs = opp & line
+            if mine and not theirs:
+                score += weights[_popcount(mine)]
+            elif theirs and not mine:
+                score -= weights[_popcount(theirs)]
+        return score
+
+    def candidate_moves(self, me, opp, empty):
+        """Empty cells next to a mark, best guesses first"""
+        geometry = self.geometry
+        occupied = me | opp
+        if occupied:
+            near = 0
+            for i in iter_bits(occupied):
+                near |= geometry.neighbour_masks[i]
+            if empty & near:
+                empty &= near
+
+        moves = [i for i in geometry.move_order if empty & geometry.cell_masks[i]]
+        best = self.best_moves.get((me, opp))
+        if best is not None and best in moves:
+            moves.remove(best)
+            moves.insert(0, best)
+        return moves
+
+    def negamax(self, me, opp, last_move, depth, ply, alpha, beta):
+        """Score for the side to move; opp has just played last_move"""
+        self.nodes += 1
+        if self.nodes & 1023 == 0 and self.deadline is not None \
+                and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+
+        if self.geometry.wins_through(opp, last_move):
+            return -(WIN_SCORE - ply)
+
+        empty = self.geometry.full_mask & ~(me | opp)
+        if not empty:
+            return 0
+        if depth == 0:
+            return self.evaluate(me, opp)
+
+        best_score = float('-inf')
+        best_move = None
+        for move in self.candidate_moves(me, opp, empty):
+            score = -self.negamax(opp, me | self.geometry.cell_masks[move], move,
+                                  depth - 1, ply + 1, -beta, -alpha)
+            if score > best_score:
+                best_score = score
+                best_move = move
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+
+        self.best_moves[(me, opp)] = best_move
+        return best_score
+
+    def search_root(self, me, opp, depth):
+        """Search every move to the given depth; returns (move, score)"""
+        empty = self.geometry.full_mask & ~(me | opp)
+        best_score = float('-inf')
+        best_move = None
+        alpha = float('-inf')
+        for move in self.candidate_moves(me, opp, empty):
+            score = -self.negamax(opp, me | self.geometry.cell_masks[move], move,
+                                  depth - 1, 1, float('-inf'), -alpha)
+            if score > best_score:
+                best_score = score
+                best_move = move
+            alpha = max(alpha, score)
+
+        self.best_moves[(me, opp)] = best_move
+        return best_move, best_score
+
+    def run(self, me, opp):
+        """Deepen until the budget runs out or the result is forced"""
+        start = time.perf_counter()
+        remaining = _popcount(self.geometry.full_mask & ~(me | opp))
+        max_depth = min(self.max_depth or remaining, remaining)
+
+        best_move, best_score, completed = None, 0, 0
+        for depth in range(1, max_depth + 1):
+            # The first iteration always finishes, so there is always a move
+            self.deadline = start + self.time_budget if depth > 1 else None
+            try:
+                best_move, best_score = self.search_root(me, opp, depth)
+            except SearchTimeout:
+                break
+            completed = depth
+            if abs(best_score) >= FORCED:
+                break
+
+        return {
+            'move': best_move,
+            'score': best_score,
+            'depth': completed,
+            'nodes': self.nodes,
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 3)
+        }
+
+
+def iterative_deepening(board, player, time_budget, max_depth=None):
+    """Find a move for player on board within time_budget seconds.
+
+    Returns a dict with the chosen ``move``, its ``score`` (heuristic, or
+    beyond ``FORCED`` for a forced result), the ``depth`` of the deepest
+    finished iteration, and the ``nodes`` and ``elapsed_ms`` spent.
+    """
+    opponent = 'O' if player == 'X' else 'X'
+    search = DeepeningSearch(board.geometry, time_budget, max_depth)
+    return search.run(board.mask(player), board.mask(opponent))
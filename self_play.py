@@ -0,0 +1,275 @@
+"""Train the learned difficulties by batched self-play against the bots
+
+Thousands of games run side by side as NumPy arrays: one X mask and one O
+mask per game. Each ply, every game still going makes its move at once.
+The learner picks epsilon-greedily from its Q table; its opponents, drawn
+per game from the easy, medium and hard bots, play from the same compiled
+tables the server uses (bot_tables), so the learner meets exactly the
+policies it has to rank against.
+
+The learner plays X in half the games and O in the other half. After each
+of its moves it learns from what came back: the reward when the game ended
+(1 for a win, -1 for a loss, 0 for a draw), or else the discounted best
+value of the position it now has to move from. Updates that land on the
+same entry within a batch are averaged.
+
+After every batch the greedy policy is scored on every reachable position
+with position_stats.solve_boards(): the share of positions where it plays
+a move that keeps the perfect-play outcome. The first time that share
+reaches a level in learned_policy.LEVELS, the greedy policy is saved as
+that level's checkpoint. The Q table itself is saved at the end, so a run
+can be resumed with --resume.
+
+    python self_play.py --output learned --games 4096 --batches 3000
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from bot_tables import EASY_TABLE, HARD_MOVES, MEDIUM_TABLE, NO_MOVE, TERNARY
+from engine import FULL_MASK, STANDARD
+from learned_policy import (LEARNED_DIR, LEVELS, POSITIONS, checkpoint_path,
+                            read_checkpoint, write_checkpoint)
+from position_stats import solve_boards
+
+OPPONENTS = ('easy', 'medium', 'hard')
+
+TERNARY_INDEX = np.array(TERNARY)
+LINES = np.array(STANDARD.line_masks)
+CELLS = np.arange(9)
+EASY_MOVES = np.frombuffer(EASY_TABLE, np.uint8).astype(np.int64)
+MEDIUM_CELLS = np.frombuffer(MEDIUM_TABLE, np.uint16).astype(np.int64) & FULL_MASK
+HARD_MOVES_ARRAY = np.frombuffer(HARD_MOVES, np.uint8).astype(np.int64)
+
+
+def board_index(x, o):
+    return TERNARY_INDEX[x] + 2 * TERNARY_INDEX[o]
+
+
+def cell_flags(masks):
+    """Rows of 9 booleans, one per cell, for an array of cell masks"""
+    return (masks[:, None] >> CELLS) & 1 == 1
+
+
+def has_line(masks):
+    return ((masks[:, None] & LINES) == LINES).any(axis=1)
+
+
+def random_cells(rng, masks):
+    """A uniformly random cell of each mask"""
+    keys = rng.random((len(masks), 9))
+    keys[~cell_flags(masks)] = -1
+    return keys.argmax(axis=1)
+
+
+def greedy_moves(q, index, empty):
+    """The learner's best empty cell for each board, lowest cell on ties"""
+    values = np.where(cell_flags(empty), q[index], -np.inf)
+    return values.argmax(axis=1), values.max(axis=1)
+
+
+def opponent_moves(rng, kinds, index, empty):
+    """Moves of the bot policies, as compiled_move draws them"""
+    moves = random_cells(rng, empty)
+
+    # Easy: its smart move 30% of the time, when it has one
+    smart = EASY_MOVES[index]
+    use_smart = (kinds == 0) & (smart != NO_MOVE) & (rng.random(len(kinds)) < 0.3)
+    moves[use_smart] = smart[use_smart]
+
+    medium = kinds == 1
+    moves[medium] = random_cells(rng, MEDIUM_CELLS[index[medium]])
+
+    hard = kinds == 2
+    moves[hard] = HARD_MOVES_ARRAY[index[hard]]
+    return moves
+
+
+def update(q, index, moves, targets, alpha):
+    """Move Q towards the targets, averaging repeats of an entry"""
+    if not len(index):
+        return
+    entries, inverse = np.unique(index * 9 + moves, return_inverse=True)
+    errors = targets - q.reshape(-1)[index * 9 + moves]
+    step = np.bincount(inverse, errors) / np.bincount(inverse)
+    q.reshape(-1)[entries] += alpha * step
+
+
+def play_batch(q, rng, games, opponents, epsilon, alpha, gamma):
+    """Play and learn from one batch of games; returns (wins, draws, losses)"""
+    x = np.zeros(games, np.int64)
+    o = np.zeros(games, np.int64)
+    learner_x = np.arange(games) % 2 == 0
+    kinds = rng.choice(opponents, games)
+    active = np.ones(games, bool)
+    last_index = np.full(games, -1)
+    last_move = np.full(games, -1)
+    results = np.zeros(3, np.int64)
+
+    for ply in range(9):
+        x_to_move = ply % 2 == 0
+        index = board_index(x, o)
+        empty = FULL_MASK & ~(x | o)
+        moves = np.zeros(games, np.int64)
+
+        learner = np.flatnonzero(active & (learner_x == x_to_move))
+        if len(learner):
+            chosen, best = greedy_moves(q, index[learner], empty[learner])
+            seen = last_index[learner] >= 0
+            update(q, last_index[learner[seen]], last_move[learner[seen]],
+                   gamma * best[seen], alpha)
+            explore = rng.random(len(learner)) < epsilon
+            chosen[explore] = random_cells(rng, empty[learner[explore]])
+            moves[learner] = chosen
+            last_index[learner] = index[learner]
+            last_move[learner] = chosen
+
+        bots = np.flatnonzero(active & (learner_x != x_to_move))
+        moves[bots] = opponent_moves(rng, kinds[bots], index[bots], empty[bots])
+
+        placed = np.where(active, 1 << moves, 0)
+        if x_to_move:
+            x |= placed
+        else:
+            o |= placed
+
+        won = active & has_line(x if x_to_move else o)
+        ended = won | (active & ((x | o) == FULL_MASK))
+        learner_won = won & (learner_x == x_to_move)
+        learner_lost = won & ~learner_won
+        reward = learner_won.astype(float) - learner_lost
+        done = np.flatnonzero(ended)
+        update(q, last_index[done], last_move[done], reward[done], alpha)
+        results += [learner_won.sum(), (ended & ~won).sum(), learner_lost.sum()]
+        active &= ~ended
+    return results
+
+
+def greedy_policy(q, solved):
+    """The greedy move for every live board, and the share that keeps its outcome"""
+    live = np.flatnonzero(solved['legal'] & ~solved['game_over'])
+    empty = FULL_MASK & ~(solved['x'][live] | solved['o'][live])
+    chosen, _ = greedy_moves(q, live, empty)
+    moves = np.full(POSITIONS, NO_MOVE, np.uint8)
+    moves[live] = chosen
+    accuracy = 1 - solved['blunders'][live, chosen].mean()
+    return moves, accuracy
+
+
+def evaluate_policy(moves, rng, games, kind):
+    """Results of a saved policy, played greedily, against one bot.
+
+    Returns the share of games won, drawn and lost, half of them as X.
+    """
+    moves = moves.astype(np.int64)
+    x = np.zeros(games, np.int64)
+    o = np.zeros(games, np.int64)
+    learner_x = np.arange(games) % 2 == 0
+    kinds = np.full(games, kind)
+    active = np.ones(games, bool)
+    results = np.zeros(3)
+    for ply in range(9):
+        x_to_move = ply % 2 == 0
+        index = board_index(x, o)
+        learner = active & (learner_x == x_to_move)
+        bots = np.flatnonzero(active & ~learner)
+        chosen = moves[index]
+        chosen[bots] = opponent_moves(rng, kinds[bots], index[bots],
+                                      FULL_MASK & ~(x[bots] | o[bots]))
+        placed = np.where(active, 1 << chosen, 0)
+        if x_to_move:
+            x |= placed
+        else:
+            o |= placed
+        won = active & has_line(x if x_to_move else o)
+        ended = won | (active & ((x | o) == FULL_MASK))
+        results += [(won & learner).sum(), (ended & ~won).sum(), (won & ~learner).sum()]
+        active &= ~ended
+    return results / games
+
+
+def train(output, games=4096, batches=3000, opponents=OPPONENTS, levels=LEVELS,
+          alpha=0.3, gamma=0.9, epsilon=0.2, seed=0, resume=None, report=None):
+    """Train until every level has a checkpoint or the batches run out.
+
+    Returns {level: (accuracy, games played)} for the checkpoints written.
+    """
+    os.makedirs(output, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    q = np.load(resume) if resume else np.zeros((POSITIONS, 9))
+    solved = solve_boards()
+    kinds = np.array([OPPONENTS.index(name) for name in opponents])
+    pending = sorted(levels)
+    saved = {}
+    results = np.zeros(3, np.int64)
+
+    for batch in range(1, batches + 1):
+        results += play_batch(q, rng, games, kinds, epsilon, alpha, gamma)
+        moves, accuracy = greedy_policy(q, solved)
+        while pending and accuracy * 100 >= pending[0]:
+            level = pending.pop(0)
+            write_checkpoint(checkpoint_path(output, level), level, accuracy,
+                             batch * games, moves)
+            saved[level] = (accuracy, batch * games)
+        if report and (batch % 100 == 0 or not pending):
+            report(batch, accuracy, results)
+            results[:] = 0
+        if not pending:
+            break
+
+    np.save(os.path.join(output, 'q_table.npy'), q)
+    return saved
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', default=LEARNED_DIR, help='checkpoint directory')
+    parser.add_argument('--games', type=int, default=4096, help='games per batch')
+    parser.add_argument('--batches', type=int, default=3000)
+    parser.add_argument('--opponents', default=','.join(OPPONENTS),
+                        help='bots to train against, e.g. medium,hard')
+    parser.add_argument('--levels', default=','.join(str(level) for level in LEVELS),
+                        help='percent of positions played perfectly to save at')
+    parser.add_argument('--alpha', type=float, default=0.3)
+    parser.add_argument('--gamma', type=float, default=0.9)
+    parser.add_argument('--epsilon', type=float, default=0.2)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--resume', help='Q table saved by an earlier run')
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.levels.split(',')]
+    if any(level not in LEVELS for level in levels):
+        parser.error(f'levels must be among {", ".join(str(level) for level in LEVELS)}')
+    opponents = args.opponents.split(',')
+    if any(name not in OPPONENTS for name in opponents):
+        parser.error(f'opponents must be among {", ".join(OPPONENTS)}')
+
+    def report(batch, accuracy, results):
+        total = results.sum() or 1
+        print(f'batch {batch:>5}: {accuracy:.2%} of positions played perfectly, '
+              f'won {results[0] / total:.1%} drew {results[1] / total:.1%} '
+              f'lost {results[2] / total:.1%} since last report')
+
+    start = time.perf_counter()
+    saved = train(args.output, args.games, args.batches, opponents, levels, args.alpha,
+                  args.gamma, args.epsilon, args.seed, args.resume, report)
+    seconds = time.perf_counter() - start
+    rng = np.random.default_rng(args.seed)
+    for level, (accuracy, games) in sorted(saved.items()):
+        _, moves = read_checkpoint(checkpoint_path(args.output, level))
+        against = ', '.join(
+            '{} {:.0%}/{:.0%}/{:.0%}'.format(
+                name, *evaluate_policy(np.frombuffer(moves, np.uint8), rng, 10000, kind))
+            for kind, name in enumerate(OPPONENTS))
+        print(f'learned-{level}: {accuracy:.2%} after {games} games; '
+              f'won/drew/lost against {against}')
+    missing = sorted(set(levels) - set(saved))
+    if missing:
+        print(f'not reached: {", ".join(f"learned-{level}" for level in missing)}')
+    print(f'{seconds:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Both games in one process: human vs human under /human, the bot under /bot
+
+app.py and app_bot.py each define their routes on a blueprint and can still
+be run on their own. This app mounts both blueprints, so one server (and one
+set of workers) serves both games:
+
+    gunicorn -c gunicorn.conf.py 'server:create_app()'
+
+Nothing a game needs is built before it is used. The bot's solved tables,
+the bigger boards' masks and each game's page are made on the first request
+that needs them, so a server that only ever sees human games never solves
+the classic board. Set TIKTACTOE_PRELOAD_BOT=1 to build the bot's tables in
+create_app() instead; under a preloading server they are then shared by all
+workers rather than built again in each. The same setting builds a missing
+position statistics file for /bot/stats; without it, build that ahead of
+time with ``python position_stats.py build``.
+"""
+import os
+
+from flask import Flask, jsonify
+
+import app as human_app
+import app_bot
+from admission import trust_proxies
+from bot_tables import load as load_tables
+from engine import SUPPORTED_SIZES, get_geometry
+from log_pipeline import setup_logging
+from metrics import serve_metrics
+from position_stats import build_stats
+from static_assets import install_page
+
+server = Flask(__name__)
+server.secret_key = 'your-secret-key-here-server'
+server.register_blueprint(human_app.human, url_prefix='/human')
+server.register_blueprint(app_bot.bot, url_prefix='/bot')
+# A page linking to both games
+install_page(server, 'index')
+serve_metrics(server)
+
+
+@server.route('/ready', methods=['GET'])
+def ready_check():
+    """Readiness check: 503 until create_app() has finished"""
+    if not server.config.get('READY'):
+        return jsonify({'status': 'starting'}), 503
+    return jsonify({'status': 'ready'})
+
+
+@server.route('/health', methods=['GET'])
+def health_check():
+    return jsonify({
+        'status': 'healthy',
+        'active_games': {
+            'human': len(human_app.games),
+            'bot': len(app_bot.games)
+        }
+    })
+
+
+def create_app(config=None):
+    """Set the server up for serving and return it"""
+    if not server.config.get('READY'):
+        server.secret_key = os.environ.get('TIKTACTOE_SECRET_KEY', server.secret_key)
+        if config:
+            server.config.update(config)
+        # Log as JSON lines to log.txt from a background thread
+        setup_logging()
+        trust_proxies(server, app_bot.PROXY_HOPS)
+        if os.environ.get('TIKTACTOE_PRELOAD_BOT', '0') == '1':
+            for size in SUPPORTED_SIZES:
+                get_geometry(size)
+            load_tables()
+            build_stats()
+        server.config['READY'] = True
+    return server
+
+
+if __name__ == '__main__':
+    print("🎮 TikTacToe Server Starting!")
+    print("🌐 Human vs Human: http://localhost:5000/human/")
+    print("🌐 Human vs Bot:   http://localhost:5000/bot/")
+    print("🛑 Press Ctrl+C to stop the server")
+
+    # Development server only; see gunicorn.conf.py for serving
+    create_app().run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,505 @@
+"""Game state kept in a Redis-compatible server, shared by every worker
+
+By default each worker process holds its own games (game_store.GameStore),
+so a client has to keep talking to the same worker. With TIKTACTOE_REDIS_URL
+set, both apps keep their games in that server instead, and any worker on
+any host can serve any request:
+
+- A game is stored as a few dozen bytes: a fixed header with the board
+  masks and status, the bot's settings, then its moves and the moves
+  undo took back, one byte each.
+- A request reads its game with WATCH and GET in one round trip and, if the
+  game changed, writes it back with MULTI, SET and EXEC in another. If some
+  other request wrote the game in between, EXEC fails and the request gets
+  a 409 instead of overwriting that move.
+- Games read or written by this worker are also kept decoded in a small
+  local cache. A request whose stored bytes still match the cache skips
+  decoding, and /health reads it without asking the server at all.
+
+For development and the tests, a stand-in server speaking the same subset
+of the protocol runs in memory:
+
+    python state_store.py serve --port 6379
+    TIKTACTOE_REDIS_URL=redis://localhost:6379/0 python app.py
+"""
+import argparse
+import asyncio
+import os
+import socket
+import struct
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from flask import jsonify
+
+from engine import Board, get_geometry
+from game_store import GameStore
+from learned_policy import DIFFICULTIES as LEARNED_DIFFICULTIES
+
+STATE_VERSION = 3
+# version, kind, size, win_length, current_player, game_active, winner,
+# recorded, game version, rewind version, started_at, x mask, o mask,
+# move_count, redo_count
+HEADER = struct.Struct('<BBBBBBBBIIdIIBB')
+# difficulty, human_player, last_bot_move (255 for none), bot_ready_at
+BOT_FIELDS = struct.Struct('<BBBd')
+
+KINDS = ('human', 'bot')
+PLAYERS = ('X', 'O')
+WINNERS = ('', 'X', 'O', 'Tie')
+# Stored by index: new difficulties go at the end, after the learned ones
+DIFFICULTIES = ('easy', 'medium', 'hard') + LEARNED_DIFFICULTIES
+NO_MOVE = 255
+
+
+def encode_game(game):
+    """Pack a TikTacToe or TikTacToeBot into bytes"""
+    bot = hasattr(game, 'difficulty')
+    board = game.board
+    data = HEADER.pack(
+        STATE_VERSION,
+        KINDS.index('bot' if bot else 'human'),
+        board.geometry.size,
+        board.geometry.win_length,
+        PLAYERS.index(game.current_player),
+        game.game_active,
+        WINNERS.index(game.winner or ''),
+        game.recorded,
+        game.version,
+        game.rewind_version,
+        game.started_at,
+        board.x,
+        board.o,
+        len(game.moves),
+        len(game.redo_moves)
+    )
+    if bot:
+        data += BOT_FIELDS.pack(
+            DIFFICULTIES.index(game.difficulty),
+            PLAYERS.index(game.human_player),
+            NO_MOVE if game.last_bot_move is None else game.last_bot_move,
+            game.bot_ready_at
+        )
+    return data + bytes(game.moves) + bytes(game.redo_moves)
+
+
+def decode_game(data, factory):
+    """Rebuild a game made by ``factory`` from encode_game() bytes"""
+    (version, kind, size, win_length, current_player, game_active, winner,
+     recorded, game_version, rewind_version, started_at, x, o, move_count,
+     redo_count) = HEADER.unpack_from(data)
+    if version != STATE_VERSION:
+        raise ValueError(f'Unknown game state version {version}')
+    game = factory()
+    if KINDS[kind] != ('bot' if hasattr(game, 'difficulty') else 'human'):
+        raise ValueError(f'Stored game is a {KINDS[kind]} game')
+
+    game.board = Board(x, o, get_geometry(size, win_length))
+    game.current_player = PLAYERS[current_player]
+    game.game_active = bool(game_active)
+    game.winner = WINNERS[winner] or None
+    game.recorded = bool(recorded)
+    game.version = game_version
+    game.rewind_version = rewind_version
+    game.started_at = started_at
+    offset = HEADER.size
+    if KINDS[kind] == 'bot':
+        difficulty, human_player, last_bot_move, bot_ready_at = \
+            BOT_FIELDS.unpack_from(data, offset)
+        offset += BOT_FIELDS.size
+        game.difficulty = DIFFICULTIES[difficulty]
+        game.human_player = PLAYERS[human_player]
+        game.bot_player = PLAYERS[1 - human_player]
+        game.last_bot_move = None if last_bot_move == NO_MOVE else last_bot_move
+        game.bot_ready_at = bot_ready_at
+        game.move_count = move_count
+    game.moves = bytearray(data[offset:offset + move_count])
+    offset += move_count
+    game.redo_moves = bytearray(data[offset:offset + redo_count])
+    return game
+
+
+class RedisError(Exception):
+    """An error reply from the server"""
+
+
+class GameConflict(Exception):
+    """Raised when another request changed the game while this one ran"""
+
+
+def game_conflict_response(error):
+    """Flask error handler for GameConflict"""
+    return jsonify({
+        'success': False,
+        'message': 'The game was changed by another request, reload it and try again'
+    }), 409
+
+
+def _encode_command(command):
+    parts = [b'*%d\r\n' % len(command)]
+    for arg in command:
+        if isinstance(arg, str):
+            arg = arg.encode()
+        elif isinstance(arg, int):
+            arg = str(arg).encode()
+        parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+    return b''.join(parts)
+
+
+class RedisConnection:
+    """One connection; commands are sent in batches and replies read in order"""
+
+    def __init__(self, host, port, db=0, password=None, timeout=2.0):
+        self.sock = socket.create_connection((host, port), timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.file = self.sock.makefile('rb')
+        if password:
+            self.execute('AUTH', password)
+        if db:
+            self.execute('SELECT', db)
+
+    def pipeline(self, commands):
+        """Send all commands at once; returns their replies.
+
+        Raises RedisError for the first error reply, after reading them all.
+        """
+        self.sock.sendall(b''.join(_encode_command(command) for command in commands))
+        replies = [self._read_reply() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    def execute(self, *command):
+        return self.pipeline([command])[0]
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+    def _read_reply(self):
+        line = self.file.readline()
+        if not line.endswith(b'\r\n'):
+            raise ConnectionError('Connection closed by the server')
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest.decode()
+        if kind == b'-':
+            return RedisError(rest.decode())
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            length = int(rest)
+            if length < 0:
+                return None
+            data = self.file.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            count = int(rest)
+            if count < 0:
+                return None
+            return [self._read_reply() for _ in range(count)]
+        raise ConnectionError(f'Unexpected reply {line!r}')
+
+
+class RedisClient:
+    """Pool of connections to the server at a redis:// URL, opened on demand"""
+
+    def __init__(self, url, max_idle=16, timeout=2.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.strip('/') or 0)
+        self.password = parsed.password
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self._idle = []
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        """A connection for the duration of the block; dropped on any error"""
+        with self._lock:
+            if self._pid != os.getpid():
+                # Inherited from the parent of a forked worker; not ours to use
+                self._pid = os.getpid()
+                self._idle = []
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = RedisConnection(self.host, self.port, self.db, self.password, self.timeout)
+        try:
+            yield conn
+        except BaseException:
+            conn.close()
+            raise
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                conn = None
+        if conn is not None:
+            conn.close()
+
+
+class SharedGameStore:
+    """GameStore stand-in whose games live on a Redis-compatible server.
+
+    ``max_games`` bounds the local cache; ``ttl`` is passed to the server,
+    which drops games idle for longer.
+    """
+
+    def __init__(self, factory, client, prefix, max_games=10000, ttl=1800, lock_stripes=64):
+        self.factory = factory
+        self.client = client
+        self.prefix = prefix
+        self.max_games = max_games
+        self.ttl = ttl
+        self.evicted = 0
+        self.conflicts = 0
+        # game_id -> (stored bytes, decoded game), least recently used first
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        # Requests in this process for the same game still wait for each
+        # other, so only requests on other workers can conflict
+        self._stripes = [threading.Lock() for _ in range(lock_stripes)]
+
+    def __len__(self):
+        """Games in this worker's cache"""
+        return len(self._cache)
+
+    def __contains__(self, game_id):
+        return game_id in self._cache
+
+    @contextmanager
+    def checkout(self, game_id):
+        """Hold a game for the duration of a request, creating it if needed.
+
+        Raises GameConflict on leaving the block if another request wrote
+        the game meanwhile; this request's changes are then dropped.
+        """
+        key = f'{self.prefix}:{game_id}'
+        ttl_ms = int(self.ttl * 1000)
+        with self._stripes[hash(game_id) % len(self._stripes)]:
+            # An error inside the block drops the connection, and with it
+            # the WATCH; the game may be half changed, so it is forgotten
+            try:
+                with self.client.connection() as conn:
+                    _, stored = conn.pipeline([('WATCH', key), ('GET', key)])
+                    game = self._cached(game_id, stored)
+                    yield game
+
+                    data = encode_game(game)
+                    if data == stored:
+                        # Nothing changed; only keep the game from expiring
+                        conn.pipeline([('UNWATCH',), ('PEXPIRE', key, ttl_ms)])
+                        written = True
+                    else:
+                        written = conn.pipeline([('MULTI',), ('SET', key, data, 'PX', ttl_ms),
+                                                 ('EXEC',)])[-1] is not None
+            except BaseException:
+                self._forget(game_id)
+                raise
+            if not written:
+                self._forget(game_id)
+                self.conflicts += 1
+                raise GameConflict(game_id)
+            self._remember(game_id, data, game)
+
+    def peek(self, game_id):
+        """This worker's cached copy of a game, without asking the server"""
+        entry = self._cache.get(game_id)
+        return entry[1] if entry is not None else None
+
+    def evict_expired(self):
+        """The server expires games itself; nothing to do here"""
+
+    def _cached(self, game_id, stored):
+        if stored is None:
+            return self.factory()
+        entry = self._cache.get(game_id)
+        if entry is not None and entry[0] == stored:
+            return entry[1]
+        return decode_game(stored, self.factory)
+
+    def _remember(self, game_id, data, game):
+        with self._lock:
+            self._cache.pop(game_id, None)
+            self._cache[game_id] = (data, game)
+            while len(self._cache) > self.max_games:
+                self._cache.popitem(last=False)
+                self.evicted += 1
+
+    def _forget(self, game_id):
+        with self._lock:
+            self._cache.pop(game_id, None)
+
+
+def open_game_store(factory, mode, max_games=10000, ttl=1800):
+    """A SharedGameStore if TIKTACTOE_REDIS_URL is set, else a GameStore"""
+    url = os.environ.get('TIKTACTOE_REDIS_URL')
+    if not url:
+        return GameStore(factory, max_games=max_games, ttl=ttl)
+    return SharedGameStore(factory, RedisClient(url), f'tiktactoe:{mode}',
+                           max_games=max_games, ttl=ttl)
+
+
+class StandIn:
+    """In-memory server for the commands SharedGameStore sends"""
+
+    def __init__(self):
+        # key -> (value, expiry as time.monotonic() or None)
+        self.data = {}
+        # key -> number of writes, which WATCH compares
+        self.writes = {}
+
+    def get(self, key):
+        entry = self.data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+            self.delete(key)
+            return None
+        return entry[0] if entry is not None else None
+
+    def put(self, key, value, expires=None):
+        self.data[key] = (value, expires)
+        self.writes[key] = self.writes.get(key, 0) + 1
+
+    def delete(self, key):
+        if self.data.pop(key, None) is None:
+            return 0
+        self.writes[key] = self.writes.get(key, 0) + 1
+        return 1
+
+    def run(self, name, args, watched):
+        """Apply one command to keys and values as bytes; returns its reply"""
+        if name == 'PING':
+            return 'PONG'
+        if name in ('AUTH', 'SELECT'):
+            return 'OK'
+        if name == 'GET':
+            return self.get(args[0])
+        if name == 'SET':
+            expires = None
+            options = [arg.upper() for arg in args[2:]]
+            if b'PX' in options:
+                expires = time.monotonic() + int(args[3 + options.index(b'PX')]) / 1000
+            elif b'EX' in options:
+                expires = time.monotonic() + int(args[3 + options.index(b'EX')])
+            self.put(args[0], args[1], expires)
+            return 'OK'
+        if name == 'DEL':
+            return sum(self.delete(key) for key in args)
+        if name == 'PEXPIRE':
+            value = self.get(args[0])
+            if value is None:
+                return 0
+            self.data[args[0]] = (value, time.monotonic() + int(args[1]) / 1000)
+            return 1
+        if name == 'WATCH':
+            for key in args:
+                self.get(key)  # Expire it first, as that counts as a write
+                watched[key] = self.writes.get(key, 0)
+            return 'OK'
+        if name == 'UNWATCH':
+            watched.clear()
+            return 'OK'
+        if name == 'DBSIZE':
+            return len(self.data)
+        if name == 'FLUSHDB':
+            for key in list(self.data):
+                self.delete(key)
+            return 'OK'
+        return RedisError(f"ERR unknown command '{name}'")
+
+    async def handle(self, reader, writer):
+        """Serve one client connection until it closes"""
+        watched = {}
+        queued = None
+        try:
+            while True:
+                command = await _read_command(reader)
+                if not command:
+                    break
+                name, args = command[0].decode('latin-1').upper(), command[1:]
+                if name == 'MULTI':
+                    queued = []
+                    reply = 'OK'
+                elif name == 'DISCARD':
+                    queued, reply = None, 'OK'
+                    watched.clear()
+                elif name == 'EXEC':
+                    changed = any(self.writes.get(key, 0) != count
+                                  for key, count in watched.items())
+                    reply = None if changed or queued is None else \
+                        [self.run(queued_name, queued_args, watched)
+                         for queued_name, queued_args in queued]
+                    queued = None
+                    watched.clear()
+                elif queued is not None:
+                    queued.append((name, args))
+                    reply = 'QUEUED'
+                else:
+                    reply = self.run(name, args, watched)
+                writer.write(_encode_reply(reply))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _read_command(reader):
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b'*'):
+        return line.split()  # Inline command, as typed into telnet
+    command = []
+    for _ in range(int(line[1:])):
+        length = int((await reader.readline())[1:])
+        command.append((await reader.readexactly(length + 2))[:-2])
+    return command
+
+
+def _encode_reply(reply):
+    if reply is None:
+        return b'$-1\r\n'
+    if isinstance(reply, RedisError):
+        return f'-{reply}\r\n'.encode()
+    if isinstance(reply, str):
+        return f'+{reply}\r\n'.encode()
+    if isinstance(reply, int):
+        return b':%d\r\n' % reply
+    if isinstance(reply, bytes):
+        return b'$%d\r\n%s\r\n' % (len(reply), reply)
+    return b'*%d\r\n' % len(reply) + b''.join(_encode_reply(item) for item in reply)
+
+
+async def serve(host='127.0.0.1', port=6379, ready=None):
+    """Run a StandIn until cancelled. ``ready`` gets the bound server."""
+    stand_in = StandIn()
+    server = await asyncio.start_server(stand_in.handle, host, port)
+    if ready is not None:
+        ready(server, stand_in)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Game state store tools')
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve_parser = commands.add_parser('serve', help='Run the in-memory stand-in server')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=6379)
+    args = parser.parse_args()
+    print(f"🗄️  State store stand-in listening on redis://{args.host}:{args.port}/0")
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
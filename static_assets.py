@@ -0,0 +1,152 @@
+"""Precomputed, versioned, precompressed game pages and their assets
+
+Each app's page lives in assets/ as an HTML shell plus a stylesheet and a
+script. Everything is read once at startup. Each asset gets a name with a
+hash of its contents in it (bot.css becomes bot.1a2b3c4d.css), and the page
+is rewritten to point at those names. Every file is also compressed once
+with gzip and, if the brotli package is installed, brotli.
+
+Serving a request then costs a dict lookup: the stored body for the
+client's Accept-Encoding, or a 304 when its ETag still matches. Assets are
+cached by browsers for a year, since a change gives them a new name. The
+page itself is revalidated on every load.
+
+A page is built the first time it is asked for, so a server that never
+shows it never compresses it. It points at its assets, and its script at
+the API, by relative URLs, so the same page works mounted at / or under a
+prefix such as /bot/.
+"""
+import gzip
+import hashlib
+import os
+import re
+import threading
+
+from flask import Response, abort, request
+
+try:
+    import brotli
+except ImportError:  # Optional; pages are then served gzipped only
+    brotli = None
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets')
+
+CONTENT_TYPES = {
+    '.html': 'text/html; charset=utf-8',
+    '.css': 'text/css; charset=utf-8',
+    '.js': 'text/javascript; charset=utf-8'
+}
+
+PAGE_CACHE_CONTROL = 'no-cache'
+ASSET_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# References to assets in a page, e.g. href="/assets/bot.css", rewritten
+# to relative URLs
+ASSET_REFERENCE = re.compile(r'/assets/([\w-]+\.(?:css|js))')
+
+
+class StaticFile:
+    """One file's body, its compressed variants and their ETags"""
+
+    __slots__ = ('digest', 'variants', '_choices')
+
+    def __init__(self, body, content_type):
+        self.digest = hashlib.sha256(body).hexdigest()[:16]
+        # Encoding -> (body, etag, headers), most preferred first. A
+        # compressed variant is only kept if it is actually smaller.
+        self.variants = {}
+        if brotli is not None:
+            self._add_variant('br', brotli.compress(body, quality=11), body, content_type)
+        self._add_variant('gzip', gzip.compress(body, 9, mtime=0), body, content_type)
+        self._add_variant('identity', body, body, content_type)
+        # Accept-Encoding header -> chosen variant; browsers send only a few
+        self._choices = {}
+
+    def _add_variant(self, encoding, compressed, body, content_type):
+        if encoding != 'identity' and len(compressed) >= len(body):
+            return
+        etag = self.digest if encoding == 'identity' else f'{self.digest}-{encoding}'
+        headers = [('Content-Type', content_type), ('ETag', f'"{etag}"'),
+                   ('Vary', 'Accept-Encoding')]
+        if encoding != 'identity':
+            headers.append(('Content-Encoding', encoding))
+        self.variants[encoding] = (compressed, etag, headers)
+
+    def choose(self, accept_encoding):
+        """Pick the variant to send for an Accept-Encoding header"""
+        variant = self._choices.get(accept_encoding)
+        if variant is None:
+            accepted = request.accept_encodings
+            for encoding, variant in self.variants.items():
+                if encoding == 'identity' or accepted[encoding]:
+                    break
+            if len(self._choices) < 64:
+                self._choices[accept_encoding] = variant
+        return variant
+
+    def response(self, cache_control):
+        """Response for the current request, or 304 if the client has it"""
+        body, etag, headers = self.choose(request.headers.get('Accept-Encoding', ''))
+        if request.if_none_match.contains(etag):
+            # A 304 repeats the validators but carries no body
+            return Response(status=304, headers=[('ETag', f'"{etag}"'),
+                                                 ('Cache-Control', cache_control),
+                                                 ('Vary', 'Accept-Encoding')])
+        return Response(body, headers=headers + [('Cache-Control', cache_control)])
+
+
+def _read(name):
+    with open(os.path.join(ASSETS_DIR, name), 'rb') as f:
+        return f.read()
+
+
+def _content_type(name):
+    return CONTENT_TYPES[os.path.splitext(name)[1]]
+
+
+def build_page(page):
+    """Load assets/<page>.html and the assets it uses.
+
+    Returns the page as a StaticFile and a dict of versioned asset name ->
+    StaticFile.
+    """
+    assets = {}
+
+    def versioned(match):
+        name = match.group(1)
+        asset = StaticFile(_read(name), _content_type(name))
+        stem, ext = os.path.splitext(name)
+        versioned_name = f'{stem}.{asset.digest[:8]}{ext}'
+        assets[versioned_name] = asset
+        return f'assets/{versioned_name}'
+
+    html = ASSET_REFERENCE.sub(versioned, _read(f'{page}.html').decode('utf-8'))
+    return StaticFile(html.encode('utf-8'), CONTENT_TYPES['.html']), assets
+
+
+def install_page(app, page):
+    """Serve assets/<page>.html at / and its assets under assets/.
+
+    ``app`` may be a Flask app or a blueprint; the routes follow its prefix.
+    """
+    built = []
+    lock = threading.Lock()
+
+    def get_built():
+        if not built:
+            with lock:
+                if not built:
+                    built.append(build_page(page))
+        return built[0]
+
+    def index():
+        return get_built()[0].response(PAGE_CACHE_CONTROL)
+
+    def asset(name):
+        static_file = get_built()[1].get(name)
+        if static_file is None:
+            abort(404)
+        return static_file.response(ASSET_CACHE_CONTROL)
+
+    app.add_url_rule('/', 'index', index, methods=['GET'])
+    app.add_url_rule('/assets/<name>', 'asset', asset, methods=['GET'])
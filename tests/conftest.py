@@ -0,0 +1,44 @@
+import asyncio
+import os
+import tempfile
+import threading
+
+import pytest
+
+# Keep game records and logs written during the tests out of the working tree
+_scratch = tempfile.mkdtemp()
+os.environ.setdefault('TIKTACTOE_RECORDS_PATH', os.path.join(_scratch, 'game_records.bin'))
+os.environ.setdefault('TIKTACTOE_LOG_PATH', os.path.join(_scratch, 'log.txt'))
+os.environ.setdefault('TIKTACTOE_STATS_PATH', os.path.join(_scratch, 'position_stats.bin'))
+# Tests share one client address and must not depend on the host's load
+os.environ.setdefault('TIKTACTOE_RATE_LIMIT', '0')
+os.environ.setdefault('TIKTACTOE_SHED_LOAD', '0')
+os.environ.setdefault('TIKTACTOE_SHED_LATENCY_MS', '0')
+
+
+@pytest.fixture
+def redis_url():
+    """URL of a stand-in server running on a background thread"""
+    from state_store import serve
+
+    started = threading.Event()
+    bound = {}
+
+    def ready(server, stand_in):
+        bound['port'] = server.sockets[0].getsockname()[1]
+        bound['loop'] = asyncio.get_running_loop()
+        bound['task'] = asyncio.current_task()
+        started.set()
+
+    def run():
+        try:
+            asyncio.run(serve('127.0.0.1', 0, ready))
+        except asyncio.CancelledError:
+            pass
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    assert started.wait(5)
+    yield f"redis://127.0.0.1:{bound['port']}/0"
+    bound['loop'].call_soon_threadsafe(bound['task'].cancel)
+    thread.join(5)
@@ -0,0 +1,87 @@
+from flask import Flask, request
+
+import app_bot
+from admission import LocalBuckets, RateLimiter, SharedBuckets, trust_proxies
+from state_store import RedisClient
+
+
+def test_bucket_spends_burst_then_refills(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('admission.time.monotonic', lambda: now[0])
+    buckets = LocalBuckets()
+    assert buckets.take('a', 3, 1, 5) == 0
+    assert buckets.take('a', 3, 1, 5) == 1  # Two left, one short
+    assert buckets.take('b', 5, 1, 5) == 0  # Buckets are per key
+    now[0] += 1
+    assert buckets.take('a', 3, 1, 5) == 0
+
+
+def test_bucket_forgets_least_recently_used_keys():
+    buckets = LocalBuckets(max_keys=2)
+    for key in 'abc':
+        buckets.take(key, 1, 1, 1)
+    assert buckets.take('a', 1, 1, 1) == 0  # Dropped, so full again
+    assert buckets.take('c', 1, 1, 1) > 0
+
+
+def test_shared_buckets_are_one_bucket_for_every_worker(redis_url):
+    # Two workers, each with its own connections to the same server
+    first = RateLimiter(rate=1, burst=5, backend=SharedBuckets(RedisClient(redis_url)))
+    second = RateLimiter(rate=1, burst=5, backend=SharedBuckets(RedisClient(redis_url)))
+    assert first.take('a', 3) == 0
+    assert 0.9 < second.take('a', 3) <= 1  # Two left, one short
+    assert second.take('b', 5) == 0
+
+
+def test_shared_buckets_let_requests_through_without_a_server():
+    limiter = RateLimiter(rate=1, burst=1, backend=SharedBuckets(
+        RedisClient('redis://127.0.0.1:1/0', timeout=0.1)))
+    assert limiter.take('a', 1) == 0
+    assert limiter.take('a', 1) == 0
+
+
+def test_limiter_costs_and_cap():
+    limiter = RateLimiter(rate=1, burst=3, costs={'hard': 5})
+    assert limiter.cost('hard') == 5
+    assert limiter.cost('hard', bot_move=False) == 1
+    # Capped at the burst, so it can be paid at all
+    assert limiter.take('a', 5) == 0
+    assert RateLimiter(rate=0).take('a', 100) == 0
+
+
+def test_routes_answer_429_once_tokens_run_out(monkeypatch):
+    monkeypatch.setattr(app_bot, 'RATE_LIMITER', RateLimiter(rate=0.5, burst=6))
+    client = app_bot.app.test_client()
+    # Bot opens on hard: 5 tokens, leaving 1
+    assert client.post('/reset_game', json={
+        'game_id': 'limited', 'difficulty': 'hard', 'human_symbol': 'O'}).status_code == 200
+    response = client.post('/make_move', json={'game_id': 'limited', 'position': 0})
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '8'
+    assert 7900 < response.get_json()['retry_after_ms'] <= 8000
+    # Nothing was played
+    assert client.get('/get_game_state?game_id=limited').get_json()['move_count'] == 1
+
+
+def test_latency_over_threshold_sheds_big_board_searches(monkeypatch):
+    monitor = app_bot.LOAD
+    monkeypatch.setattr(monitor, 'max_latency', 0.5)
+    monkeypatch.setattr(monitor, 'smoothing', 1)
+    client = app_bot.app.test_client()
+    client.post('/reset_game', json={'game_id': 'shed', 'difficulty': 'hard', 'size': 5})
+
+    monitor.observe(2)
+    state = client.post('/make_move', json={'game_id': 'shed', 'position': 12}
+                        ).get_json()['game_state']
+    assert state['bot_search']['source'] == 'shed'
+    assert state['bot_search']['depth'] <= app_bot.SHED_DEPTH
+    assert not monitor.overloaded()  # The quick reply brought the average down
+
+
+def test_client_address_comes_from_trusted_proxies():
+    app = Flask(__name__)
+    app.add_url_rule('/', 'address', lambda: request.remote_addr)
+    trust_proxies(app, 1)
+    # The client made up the first entry; the proxy added the second
+    response = app.test_client().get('/', headers={'X-Forwarded-For': '6.6.6.6, 10.0.0.7'})
+    assert response.get_data(as_text=True) == '10.0.0.7'
@@ -0,0 +1,162 @@
+import time
+
+import app_bot
+
+
+def new_bot_game(client, game_id, **settings):
+    settings.setdefault('difficulty', 'hard')
+    return client.post('/reset_game', json={'game_id': game_id, **settings}).get_json()
+
+
+def test_make_move_returns_bot_reply_immediately():
+    client = app_bot.app.test_client()
+    new_bot_game(client, 'immediate')
+
+    start = time.perf_counter()
+    data = client.post('/make_move', json={'game_id': 'immediate', 'position': 0}).get_json()
+    assert time.perf_counter() - start < 0.1
+
+    state = data['game_state']
+    assert state['board'][state['bot_move']] == 'O'
+    assert state['current_player'] == 'X'
+
+
+def test_server_side_pacing_holds_back_bot_reply(monkeypatch):
+    monkeypatch.setattr(app_bot, 'BOT_PACING_MS', 50)
+    client = app_bot.app.test_client()
+    new_bot_game(client, 'paced')
+
+    state = client.post('/make_move', json={'game_id': 'paced', 'position': 0}).get_json()['game_state']
+    assert state['bot_pending']
+    assert state['board'].count('O') == 0
+    assert 'bot_move' not in state
+
+    blocked = client.post('/make_move', json={'game_id': 'paced', 'position': 1}).get_json()
+    assert blocked == {'success': False, 'message': 'Bot is thinking'}
+
+    time.sleep(state['retry_after_ms'] / 1000)
+    state = client.get('/get_game_state?game_id=paced').get_json()
+    assert 'bot_pending' not in state
+    assert state['board'].count('O') == 1
+
+
+def test_analyze_batch_matches_hard_table():
+    client = app_bot.app.test_client()
+    positions = [
+        {'board': [''] * 9},
+        {'board': ['X', 'X', '', 'O', 'O', '', '', '', ''], 'difficulty': 'medium'},
+        {'board': ['X', 'X', 'X', 'O', 'O', '', '', '', '']},
+        {'board': ['?'] * 9},
+    ]
+    results = client.post('/analyze', json={'positions': positions}).get_json()['results']
+
+    assert results[0] == {'index': 0, 'move': 0, 'score': 0}
+    assert results[1] == {'index': 1, 'move': 2, 'score': 10}
+    assert results[2] == {'index': 2, 'error': 'Game is already over'}
+    assert 'error' in results[3]
+
+
+def test_analyze_streams_large_batches():
+    client = app_bot.app.test_client()
+    positions = [{'board': [''] * 9, 'difficulty': 'easy'}] * (app_bot.ANALYZE_STREAM_THRESHOLD + 1)
+    response = client.post('/analyze', json={'positions': positions})
+    assert response.mimetype == 'application/x-ndjson'
+    assert len(response.get_data(as_text=True).splitlines()) == len(positions)
+
+    # Only stream=1 asks for a small batch to be streamed
+    small = positions[:2]
+    assert client.post('/analyze?stream=1', json={'positions': small}
+                       ).mimetype == 'application/x-ndjson'
+    for value in ('0', 'false'):
+        response = client.post(f'/analyze?stream={value}', json={'positions': small})
+        assert len(response.get_json()['results']) == 2
+
+
+def test_analyze_does_not_touch_live_games():
+    client = app_bot.app.test_client()
+    new_bot_game(client, 'live')
+    before = client.get('/get_game_state?game_id=live').get_json()
+    list(app_bot.analyze_positions([{'board': ['X'] + [''] * 8}]))
+    assert client.get('/get_game_state?game_id=live').get_json() == before
+
+
+def test_hard_bot_on_bigger_boards_wins_or_blocks(monkeypatch):
+    monkeypatch.setattr(app_bot, 'SEARCH_BUDGET_MS', 50)
+    game = app_bot.TikTacToeBot(difficulty='hard', human_symbol='X', size=5)
+    # Human threatens four in a row on the top row
+    for human, bot in ((0, 12), (1, 18), (2, 24)):
+        game.board.place(human, 'X')
+        game.board.place(bot, 'O')
+    game.current_player = 'O'
+    assert game.choose_move() == 6  # completes the 6-12-18-24 diagonal
+    assert game.last_search['source'] == 'deepening'
+
+    game.board.remove(24)
+    game.board.place(23, 'O')
+    assert game.choose_move() == 3  # blocks the top row
+
+
+def test_reset_game_with_board_size():
+    client = app_bot.app.test_client()
+    data = new_bot_game(client, 'big', size=4, difficulty='easy')
+    state = data['game_state']
+    assert (state['size'], state['win_length'], len(state['board'])) == (4, 4, 16)
+    response = client.post('/make_move', json={'game_id': 'big', 'position': 16}).get_json()
+    assert response == {'success': False, 'message': 'Invalid position'}
+
+
+def test_ready_only_after_create_app(monkeypatch):
+    monkeypatch.setitem(app_bot.app.config, 'READY', False)
+    client = app_bot.app.test_client()
+    assert client.get('/ready').status_code == 503
+
+    assert app_bot.create_app() is app_bot.app
+    response = client.get('/ready')
+    assert response.status_code == 200
+    assert response.get_json() == {'status': 'ready'}
+
+
+def test_undo_and_redo_take_back_the_bot_reply_too():
+    client = app_bot.app.test_client()
+    new_bot_game(client, 'history')
+    played = client.post('/make_move', json={'game_id': 'history', 'position': 0}).get_json()
+    reply = played['game_state']['bot_move']
+
+    undone = client.post('/undo', json={'game_id': 'history'}).get_json()['game_state']
+    assert undone['board'] == [''] * 9
+    assert undone['current_player'] == 'X' and undone['move_count'] == 0
+    assert not undone['can_undo'] and undone['can_redo']
+    assert client.post('/undo', json={'game_id': 'history'}).get_json() == {
+        'success': False, 'message': 'Nothing to undo'}
+
+    redone = client.post('/redo', json={'game_id': 'history'}).get_json()['game_state']
+    assert redone['board'] == played['game_state']['board']
+    assert redone['board'][reply] == 'O' and redone['current_player'] == 'X'
+
+    # A new move drops whatever was left to redo
+    client.post('/undo', json={'game_id': 'history'})
+    client.post('/make_move', json={'game_id': 'history', 'position': 4})
+    assert client.post('/redo', json={'game_id': 'history'}).get_json()['message'] == \
+        'Nothing to redo'
+
+
+
+def test_redo_without_a_kept_reply_makes_a_new_one():
+    game = app_bot.TikTacToeBot(difficulty='medium')
+    # The human move was taken back before the bot replied to it
+    game.make_human_move(0)
+    game.undo()
+    assert game.redo() == {'success': True}
+    assert game.board.to_list().count('O') == 1
+    assert game.current_player == 'X' and game.game_active
+
+def test_undo_keeps_the_bot_opening_move():
+    client = app_bot.app.test_client()
+    opening = new_bot_game(client, 'opening', human_symbol='O')['game_state']
+    assert not client.post('/undo', json={'game_id': 'opening'}).get_json()['success']
+
+    free = opening['board'].index('')
+    client.post('/make_move', json={'game_id': 'opening', 'position': free})
+    state = client.post('/undo', json={'game_id': 'opening'}).get_json()['game_state']
+    assert state['board'] == opening['board']
+    assert state['current_player'] == 'O'
@@ -0,0 +1,96 @@
+import threading
+
+import app_bot
+from bot_pool import SearchPool
+from engine import Board
+
+
+def threatened_board():
+    # X threatens four in a row on the top row of a 5x5 board
+    board = Board.empty(5)
+    for x, o in ((0, 12), (1, 18), (2, 24)):
+        board.place(x, 'X')
+        board.place(o, 'O')
+    return board
+
+
+def test_pool_search_finds_the_block():
+    pool = SearchPool(workers=1, deadline=10)
+    board = threatened_board()
+    board.remove(24)
+    board.place(23, 'O')
+    try:
+        result = pool.search(board, 'O', 0.05)
+    finally:
+        pool.shutdown()
+    assert result['move'] == 3
+    assert pool.outcomes['completed'] == 1
+    assert pool.pending == 0
+
+
+def test_pool_gives_up_at_deadline_and_when_full():
+    pool = SearchPool(workers=1, max_pending=1, deadline=0.001)
+    try:
+        assert pool.search(Board.empty(5), 'X', 0.2) is None
+        assert pool.outcomes['deadline'] == 1
+        # The abandoned search still holds the only slot
+        assert not pool.has_capacity()
+        assert pool.search(Board.empty(5), 'X', 0.2) is None
+        assert pool.outcomes['rejected'] == 1
+    finally:
+        pool.shutdown()
+
+
+def test_make_move_falls_back_or_refuses_when_pool_is_busy(monkeypatch):
+    client = app_bot.app.test_client()
+    client.post('/reset_game', json={'game_id': 'pool', 'difficulty': 'hard', 'size': 4})
+
+    full = SearchPool(workers=1, max_pending=0)
+    monkeypatch.setattr(app_bot, 'BOT_POOL', full)
+    response = client.post('/make_move', json={'game_id': 'pool', 'position': 5})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert response.get_json()['retry_after_ms'] == 500
+    assert client.get('/get_game_state?game_id=pool').get_json()['board'][5] == ''
+
+    # No room once the human move is in: the medium policy answers instead
+    monkeypatch.setattr(full, 'has_capacity', lambda: True)
+    state = client.post('/make_move', json={'game_id': 'pool', 'position': 5}
+                        ).get_json()['game_state']
+    assert state['bot_search']['source'] == 'fallback'
+    assert state['board'].count('O') == 1
+
+
+def test_pool_search_lets_the_game_go(monkeypatch):
+    client = app_bot.app.test_client()
+    client.post('/reset_game', json={'game_id': 'pool-free', 'difficulty': 'hard', 'size': 4})
+    pool = SearchPool(workers=1)
+    undone = []
+
+    def search(board, player, time_budget, max_depth=None):
+        # Another request takes the human move back while the pool searches
+        worker = threading.Thread(target=lambda: undone.append(
+            client.post('/undo', json={'game_id': 'pool-free'}).get_json()))
+        worker.start()
+        worker.join(5)
+        return {'move': 0, 'nodes': 1, 'depth': 1, 'elapsed_ms': 0.1}
+
+    monkeypatch.setattr(pool, 'search', search)
+    monkeypatch.setattr(app_bot, 'BOT_POOL', pool)
+    state = client.post('/make_move', json={'game_id': 'pool-free', 'position': 5}
+                        ).get_json()['game_state']
+    assert undone and undone[0]['success']
+    # The search was for a position that is gone, so it is not played
+    assert 'bot_move' not in state
+    assert state['board'] == [''] * 16
+
+    # Replaying the human move gets a new bot reply, and play goes on
+    redone = client.post('/redo', json={'game_id': 'pool-free'}).get_json()['game_state']
+    assert redone['board'][5] == 'X' and redone['board'].count('O') == 1
+    assert redone['current_player'] == 'X' and redone['game_active']
+    empty = redone['board'].index('')
+    monkeypatch.setattr(pool, 'search', lambda *args, **kwargs: None)
+    played = client.post('/make_move', json={'game_id': 'pool-free', 'position': empty}
+                         ).get_json()
+    assert played['success'] and played['game_state']['board'][empty] == 'X'
+    assert played['game_state']['board'].count('O') == 2
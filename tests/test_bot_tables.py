@@ -0,0 +1,111 @@
+import random
+
+from app_bot import TikTacToeBot
+from bot_tables import (HARD_TABLE, compiled_move, lookup_hard_move, side_to_move,
+                        ternary_index)
+from engine import CELL_MASKS, FULL_MASK, Board, has_won, iter_bits
+from transposition import TRANSPOSITIONS
+
+
+def plain_minimax(bot_mask, human_mask, depth, is_maximizing):
+    """Exhaustive minimax without pruning, as the bot originally searched"""
+    if has_won(bot_mask):
+        return 10 - depth
+    if has_won(human_mask):
+        return depth - 10
+    empty = FULL_MASK & ~(bot_mask | human_mask)
+    if not empty:
+        return 0
+    if is_maximizing:
+        return max(plain_minimax(bot_mask | CELL_MASKS[i], human_mask, depth + 1, False)
+                   for i in iter_bits(empty))
+    return min(plain_minimax(bot_mask, human_mask | CELL_MASKS[i], depth + 1, True)
+               for i in iter_bits(empty))
+
+
+def minimax_reference(board, bot_symbol):
+    """Run the original exhaustive search for the side to move"""
+    human_symbol = 'O' if bot_symbol == 'X' else 'X'
+    best_score = float('-inf')
+    best_move = None
+    for i in board.available_moves():
+        score = plain_minimax(board.mask(bot_symbol) | CELL_MASKS[i],
+                              board.mask(human_symbol), 0, False)
+        if score > best_score:
+            best_score = score
+            best_move = i
+    return best_move, best_score
+
+
+def alphabeta_move(board):
+    bot = TikTacToeBot(difficulty='hard',
+                       human_symbol='O' if side_to_move(board) == 'X' else 'X')
+    bot.board = board.copy()
+    return bot.minimax_move()
+
+
+def test_table_covers_all_reachable_positions():
+    # 5478 legal positions, 958 of which are finished games
+    assert len(HARD_TABLE) == 5478 - 958
+
+
+def test_empty_board_matches_minimax():
+    board = Board()
+    assert lookup_hard_move(board) == minimax_reference(board, 'X')
+
+
+def test_sampled_positions_match_minimax():
+    rng = random.Random(1234)
+    positions = [Board.from_key(k) for k in sorted(HARD_TABLE)]
+    positions = [b for b in positions if b.move_count() >= 2]
+    for board in rng.sample(positions, 300):
+        assert lookup_hard_move(board) == minimax_reference(board, side_to_move(board))
+
+
+def test_hard_bot_uses_table():
+    game = TikTacToeBot(difficulty='hard', human_symbol='O')
+    game.make_bot_move()
+    assert game.board.cell(HARD_TABLE[0][0]) == 'X'
+
+
+def test_alphabeta_picks_the_same_moves():
+    rng = random.Random(99)
+    positions = [Board.from_key(k) for k in sorted(HARD_TABLE)]
+    for board in [Board()] + rng.sample(positions, 300):
+        assert alphabeta_move(board) == HARD_TABLE[board.key()][0]
+
+
+def test_alphabeta_searches_fewer_nodes():
+    # A warm table would answer from earlier searches
+    TRANSPOSITIONS.clear()
+    bot = TikTacToeBot(difficulty='hard', human_symbol='O')
+    bot.minimax_move()
+    # Plain minimax visits 549945 nodes from the empty board
+    assert bot.last_search['source'] == 'search'
+    assert bot.last_search['nodes'] < 549945 // 10
+
+
+def test_ternary_index_reads_the_board_in_base_3():
+    board = Board.from_list(['X', '', 'O', '', '', '', '', '', 'X'])
+    assert ternary_index(board) == 1 + 2 * 3 ** 2 + 3 ** 8
+
+
+def test_compiled_tables_play_like_the_policies():
+    # Same random draws in the same order, so the same moves for every seed
+    for key in sorted(HARD_TABLE):
+        board = Board.from_key(key)
+        player = side_to_move(board)
+        bot = TikTacToeBot(human_symbol='O' if player == 'X' else 'X')
+        bot.board = board
+        assert compiled_move(board, player, 'hard') == HARD_TABLE[key][0]
+        for seed in range(3):
+            random.seed(seed)
+            easy = compiled_move(board, player, 'easy')
+            random.seed(seed)
+            assert easy == bot.get_easy_move()
+            random.seed(seed)
+            medium = compiled_move(board, player, 'medium')
+            random.seed(seed)
+            assert medium == bot.get_medium_move()
+    # The tables only hold the side to move's view
+    assert compiled_move(Board(), 'O', 'medium') is None
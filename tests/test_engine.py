@@ -0,0 +1,61 @@
+import pytest
+
+from app import TikTacToe
+from engine import (LINE_MASKS, Board, get_geometry, has_won, iter_bits,
+                    parse_board_settings)
+
+
+def test_board_round_trips_json_list():
+    cells = ['X', '', 'O', '', 'X', '', '', 'O', '']
+    board = Board.from_list(cells)
+    assert board.to_list() == cells
+    assert Board.from_key(board.key()) == board
+    assert board.available_moves() == [1, 3, 5, 6, 8]
+
+
+def test_win_detection():
+    assert has_won(0b111000000)
+    assert has_won(0b100010001)
+    assert not has_won(0b011000101)
+    assert Board.from_list(['O', 'O', 'O', 'X', 'X', '', '', '', '']).winner() == 'O'
+
+
+def test_iter_bits_lowest_first():
+    assert list(iter_bits(0b100100101)) == [0, 2, 5, 8]
+
+
+def test_game_state_board_shape():
+    game = TikTacToe()
+    for position in (0, 3, 1, 4, 2):
+        assert game.make_move(position)
+    state = game.get_game_state()
+    assert state['board'] == ['X', 'X', 'X', 'O', 'O', '', '', '', '']
+    assert state['winner'] == 'X'
+    assert not state['game_active']
+
+
+def test_geometry_line_tables():
+    assert get_geometry(3).line_masks == LINE_MASKS
+    assert len(get_geometry(4).line_masks) == 10
+    assert len(get_geometry(5).line_masks) == 28
+    assert len(get_geometry(5, 5).line_masks) == 12
+    assert get_geometry(3).move_order == (4, 0, 2, 6, 8, 1, 3, 5, 7)
+
+
+def test_unsupported_geometry():
+    with pytest.raises(ValueError):
+        get_geometry(6)
+    assert parse_board_settings({'size': 7, 'win_length': 9}) == (3, 3)
+    assert parse_board_settings({'size': 5}) == (5, 4)
+
+
+def test_four_in_a_row_on_five_by_five():
+    game = TikTacToe(size=5)
+    # X plays 6, 7, 8, 9 on the second row; O answers on the bottom row
+    for x, o in ((6, 20), (7, 21), (8, 22)):
+        assert game.make_move(x) and game.make_move(o)
+    assert game.make_move(9)
+    state = game.get_game_state()
+    assert (state['size'], state['win_length'], len(state['board'])) == (5, 4, 25)
+    assert state['winner'] == 'X'
+    assert not game.make_move(25)
@@ -0,0 +1,83 @@
+import time
+
+import app
+import app_bot
+
+
+def test_get_game_state_answers_304_until_the_game_changes():
+    client = app.app.test_client()
+    client.post('/reset_game', json={'game_id': 'etag'})
+    first = client.get('/get_game_state?game_id=etag')
+    etag = first.headers['ETag']
+    assert first.headers['Cache-Control'] == 'no-cache'
+
+    same = client.get('/get_game_state?game_id=etag', headers={'If-None-Match': etag})
+    assert same.status_code == 304
+    assert same.get_data() == b''
+
+    client.post('/make_move', json={'game_id': 'etag', 'position': 0})
+    changed = client.get('/get_game_state?game_id=etag', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.get_json()['version'] == first.get_json()['version'] + 1
+
+
+def test_move_reply_carries_only_the_delta():
+    client = app_bot.app.test_client()
+    state = client.post('/reset_game', json={'game_id': 'delta', 'difficulty': 'hard'}
+                        ).get_json()['game_state']
+
+    reply = client.post('/make_move', json={'game_id': 'delta', 'position': 4,
+                                            'since': state['version']}).get_json()['game_state']
+    assert reply['delta'] is True
+    assert 'board' not in reply
+    assert reply['version'] == state['version'] + 2
+    assert reply['changes'] == [[4, 'X'], [reply['bot_move'], 'O']]
+    assert reply['current_player'] == 'X'
+
+    # A version from before the reset can't be caught up with a delta
+    client.post('/reset_game', json={'game_id': 'delta', 'difficulty': 'hard'})
+    full = client.post('/make_move', json={'game_id': 'delta', 'position': 0,
+                                           'since': state['version']}).get_json()['game_state']
+    assert 'delta' not in full
+    assert full['board'][0] == 'X'
+
+
+def test_paced_bot_move_is_left_out_of_delta_and_etag(monkeypatch):
+    monkeypatch.setattr(app_bot, 'BOT_PACING_MS', 50)
+    client = app_bot.app.test_client()
+    state = client.post('/reset_game', json={'game_id': 'paced-delta', 'difficulty': 'easy'}
+                        ).get_json()['game_state']
+
+    reply = client.post('/make_move', json={'game_id': 'paced-delta', 'position': 0,
+                                            'since': state['version']}).get_json()['game_state']
+    assert reply['bot_pending']
+    assert reply['changes'] == [[0, 'X']]
+
+    pending = client.get('/get_game_state?game_id=paced-delta')
+    assert pending.get_json()['version'] == reply['version']
+    time.sleep(reply['retry_after_ms'] / 1000)
+    revealed = client.get('/get_game_state?game_id=paced-delta',
+                          headers={'If-None-Match': pending.headers['ETag']})
+    assert revealed.status_code == 200
+    assert revealed.get_json()['version'] == reply['version'] + 1
+
+
+def test_undo_invalidates_older_deltas():
+    client = app.app.test_client()
+    client.post('/reset_game', json={'game_id': 'rewind'})
+    for position in (0, 4):
+        state = client.post('/make_move', json={'game_id': 'rewind', 'position': position}
+                            ).get_json()['game_state']
+
+    undone = client.post('/undo', json={'game_id': 'rewind', 'since': state['version']}
+                         ).get_json()['game_state']
+    assert 'delta' not in undone
+    assert undone['board'][4] == '' and undone['current_player'] == 'O'
+
+    # The same number of moves again, but not the same cells
+    redone = client.post('/redo', json={'game_id': 'rewind', 'since': undone['version']}
+                         ).get_json()['game_state']
+    assert redone['changes'] == [[4, 'O']]
+    moved = client.post('/make_move', json={'game_id': 'rewind', 'position': 8,
+                                            'since': state['version']}).get_json()['game_state']
+    assert 'delta' not in moved
@@ -0,0 +1,41 @@
+import app as app_module
+from app import TikTacToe
+from game_store import GameStore
+
+
+def test_lru_eviction_bounds_store():
+    store = GameStore(TikTacToe, max_games=2)
+    for game_id in ('a', 'b', 'a', 'c'):
+        with store.checkout(game_id):
+            pass
+    assert len(store) == 2
+    assert 'a' in store and 'c' in store and 'b' not in store
+    assert store.evicted == 1
+
+
+def test_idle_games_expire():
+    store = GameStore(TikTacToe, ttl=-1)
+    with store.checkout('a'):
+        pass
+    store.evict_expired()
+    assert len(store) == 0
+
+
+def test_sessions_get_separate_boards():
+    first = app_module.app.test_client()
+    second = app_module.app.test_client()
+    first.post('/reset_game', json={})
+    second.post('/reset_game', json={})
+
+    response = first.post('/make_move', json={'position': 4})
+    assert response.get_json()['game_state']['board'][4] == 'X'
+    assert second.get('/get_game_state').get_json()['board'][4] == ''
+
+
+def test_explicit_game_id():
+    client = app_module.app.test_client()
+    client.post('/make_move', json={'position': 0, 'game_id': 'shared-game'})
+    state = client.get('/get_game_state?game_id=shared-game').get_json()
+    assert state['board'][0] == 'X'
+    assert state['game_id'] == 'shared-game'
+    assert client.get('/get_game_state?game_id=bad id!').status_code == 400
@@ -0,0 +1,57 @@
+import pytest
+
+import app_bot
+import records
+import state_store
+from engine import Board
+from learned_policy import (DIFFICULTIES, LearnedPolicies, checkpoint_path,
+                            read_checkpoint)
+
+np = pytest.importorskip('numpy')
+self_play = pytest.importorskip('self_play')
+
+
+@pytest.fixture(scope='module')
+def checkpoints(tmp_path_factory):
+    directory = str(tmp_path_factory.mktemp('learned'))
+    saved = self_play.train(directory, games=1024, batches=300, levels=(75,))
+    return directory, saved
+
+
+def test_training_saves_the_first_policy_at_each_level(checkpoints):
+    directory, saved = checkpoints
+    accuracy, games = saved[75]
+    details, moves = read_checkpoint(checkpoint_path(directory, 75))
+    assert details == {'level': 75, 'accuracy': pytest.approx(accuracy), 'games': games}
+    assert 0.75 <= accuracy < 0.9
+
+    # Played greedily, it beats the easy bot far more often than it loses
+    won, drew, lost = self_play.evaluate_policy(
+        np.frombuffer(moves, np.uint8), np.random.default_rng(1), 2000, 0)
+    assert won > 0.6 and lost < 0.15
+
+
+def test_learned_difficulty_plays_from_its_checkpoint(monkeypatch, checkpoints):
+    directory, _ = checkpoints
+    learned = LearnedPolicies(directory)
+    monkeypatch.setattr(app_bot, 'LEARNED', learned)
+    assert learned.available('learned-75') and not learned.available('learned-98')
+
+    client = app_bot.app.test_client()
+    state = client.post('/reset_game', json={
+        'game_id': 'learned', 'difficulty': 'learned-75', 'human_symbol': 'O'
+    }).get_json()['game_state']
+    assert state['difficulty'] == 'learned-75'
+    assert state['bot_move'] == learned.move(Board.empty(), 'X', 'learned-75')
+    assert learned.move(Board.empty(), 'O', 'learned-75') is None
+
+    # A level with no checkpoint is not offered
+    state = client.post('/reset_game', json={
+        'game_id': 'learned', 'difficulty': 'learned-98'
+    }).get_json()['game_state']
+    assert state['difficulty'] == 'medium'
+
+
+def test_stored_difficulty_names_cover_the_learned_levels():
+    assert state_store.DIFFICULTIES[3:] == DIFFICULTIES
+    assert records.DIFFICULTIES[4:] == DIFFICULTIES
@@ -0,0 +1,86 @@
+import json
+import logging
+import os
+import time
+
+import pytest
+
+import log_pipeline
+from log_pipeline import SamplingFilter, setup_logging
+
+
+@pytest.fixture
+def restore_root_logger():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+def test_records_are_written_as_json_lines(tmp_path, restore_root_logger):
+    path = tmp_path / 'log.txt'
+    listener = setup_logging(str(path))
+    logging.info('Bot move', extra={'route': 'make_move', 'game_id': 'abc',
+                                    'difficulty': 'hard', 'search_ms': 0.25})
+    try:
+        raise RuntimeError('boom')
+    except RuntimeError:
+        logging.error('Error in /make_move endpoint', exc_info=True)
+    listener.stop()
+
+    first, second = [json.loads(line) for line in path.read_text().splitlines()]
+    assert first['message'] == 'Bot move'
+    assert first['game_id'] == 'abc' and first['search_ms'] == 0.25
+    assert second['level'] == 'ERROR'
+    assert 'RuntimeError: boom' in second['exception']
+
+
+def test_log_file_rotates(tmp_path, restore_root_logger):
+    path = tmp_path / 'log.txt'
+    listener = setup_logging(str(path), max_bytes=1000, backup_count=2)
+    for i in range(100):
+        logging.info('Received move request', extra={'route': 'make_move', 'position': i})
+    listener.stop()
+    assert (tmp_path / 'log.txt.1').exists()
+    assert not (tmp_path / 'log.txt.3').exists()
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs fork')
+def test_forked_workers_send_records_to_the_writer(tmp_path, restore_root_logger):
+    path = tmp_path / 'log.txt'
+    listener = setup_logging(str(path))
+    pid = os.fork()
+    if pid == 0:
+        logging.info('From the worker', extra={'route': 'make_move'})
+        # Hand the record over before leaving without running atexit
+        log_pipeline._listener.stop()
+        os._exit(0)
+    os.waitpid(pid, 0)
+    logging.info('From the writer')
+    deadline = time.time() + 5
+    while path.read_text().count('\n') < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    listener.stop()
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert {line['message'] for line in lines} == {'From the worker', 'From the writer'}
+    worker = next(line for line in lines if line['message'] == 'From the worker')
+    assert worker['route'] == 'make_move'
+
+
+def test_sampling_and_route_levels():
+    sampling = SamplingFilter({'get_game_state': 0.0}, {'reset_game': logging.WARNING})
+
+    def record(level, route):
+        record = logging.LogRecord('test', level, __file__, 0, 'message', None, None)
+        record.route = route
+        return record
+
+    assert not sampling.filter(record(logging.INFO, 'get_game_state'))
+    assert sampling.filter(record(logging.ERROR, 'get_game_state'))
+    assert not sampling.filter(record(logging.INFO, 'reset_game'))
+    assert sampling.filter(record(logging.INFO, 'make_move'))
@@ -0,0 +1,71 @@
+import json
+import os
+
+import app
+import app_bot
+from metrics import Registry
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    latency = registry.histogram('latency_seconds', 'Latency', ('route',), buckets=(0.1, 1.0))
+    latency.observe(0.05, 'a')
+    latency.observe(0.5, 'a')
+    latency.observe(5, 'a')
+
+    text = registry.render()
+    assert 'latency_seconds_bucket{route="a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="a",le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{route="a",le="+Inf"} 3' in text
+    assert 'latency_seconds_sum{route="a"} 5.55' in text
+    assert 'latency_seconds_count{route="a"} 3' in text
+
+
+def test_collect_adds_up_other_workers(tmp_path):
+    registry = Registry(str(tmp_path))
+    hits = registry.counter('hits_total', 'Hits', ('route',))
+    games = registry.gauge('games', 'Games')
+    games.add_callback(lambda: {(): 2})
+    capacity = registry.gauge('capacity', 'Capacity of each worker', aggregate='max')
+    capacity.add_callback(lambda: {(): 50})
+    hits.inc('a')
+
+    fresh = {'time': 1e12, 'metrics': {'hits_total': [[['a'], 4]], 'games': [[[], 3]],
+                                       'capacity': [[[], 50]]}}
+    stale = {'time': 0, 'metrics': {'hits_total': [[['a'], 10]], 'games': [[[], 100]]}}
+    (tmp_path / '1.json').write_text(json.dumps(fresh))
+    (tmp_path / '2.json').write_text(json.dumps(stale))
+
+    collected = registry.collect()
+    assert collected['hits_total'] == {('a',): 15}
+    assert collected['games'] == {(): 5}
+    # A per-worker setting is reported once, not once per worker
+    assert collected['capacity'] == {(): 50}
+
+    registry.write_snapshot()
+    assert os.path.exists(tmp_path / f'{os.getpid()}.json')
+
+
+def test_metrics_endpoint_counts_routes_and_bot_moves():
+    client = app_bot.app.test_client()
+    client.post('/reset_game', json={'game_id': 'metrics', 'difficulty': 'hard'})
+    client.post('/make_move', json={'game_id': 'metrics', 'position': 4})
+    client.post('/make_move', json={'game_id': 'metrics', 'position': 4})
+
+    response = client.get('/metrics')
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert ('tiktactoe_http_requests_total{mode="bot",route="make_move",'
+            'method="POST",status="200"}') in text
+    assert 'tiktactoe_http_request_duration_seconds_count{mode="bot",route="reset_game"}' in text
+    assert 'tiktactoe_bot_move_seconds_count{difficulty="hard",size="3"}' in text
+    assert 'tiktactoe_moves_total{mode="bot",result="invalid"}' in text
+    assert 'tiktactoe_active_games{mode="bot"}' in text
+    assert 'tiktactoe_resident_memory_bytes ' in text
+    assert 'tiktactoe_transposition_lookups_total{result="hit"}' in text
+    assert 'tiktactoe_transposition_entries ' in text
+
+    human = app.app.test_client()
+    human.post('/make_move', json={'game_id': 'metrics', 'position': 0})
+    text = human.get('/metrics').get_data(as_text=True)
+    assert 'tiktactoe_moves_total{mode="human",result="valid"}' in text
@@ -0,0 +1,77 @@
+import pytest
+
+import app_bot
+import position_stats
+from bot_tables import POSITION_SCORES, TERNARY
+from engine import FULL_MASK, Board
+from position_stats import (GAME_OVER, LEGAL, PositionStats, build_stats, parse_board,
+                            write_stats)
+
+np = pytest.importorskip('numpy')
+
+
+@pytest.fixture(scope='module')
+def stats(tmp_path_factory):
+    path = tmp_path_factory.mktemp('stats') / 'position_stats.bin'
+    return write_stats(str(path)), PositionStats(str(path))
+
+
+def test_enumeration_and_outcomes_match_the_solved_game(stats):
+    array, _ = stats
+    legal = array['flags'] & LEGAL == LEGAL
+    over = array['flags'] & GAME_OVER == GAME_OVER
+    assert legal.sum() == 5478 and over.sum() == 958
+
+    # Scores are from the view of the player who made the last move
+    for key, score in POSITION_SCORES.items():
+        index = TERNARY[key & FULL_MASK] + 2 * TERNARY[key >> 9]
+        assert array['outcome'][index] == (score < 0) - (score > 0)
+
+    # The hard bot plays perfectly, the easy bot often does not
+    live = legal & ~over
+    assert not array['blunder'][live, 2].any()
+    assert array['blunder'][live, 0].mean() > array['blunder'][live, 1].mean() > 0
+
+
+def test_lookup_reads_the_mapped_file(stats):
+    _, mapped = stats
+    empty = mapped.lookup(Board.empty())
+    assert (empty['player'], empty['outcome'], empty['moves_left']) == ('X', 'draw', 9)
+    assert empty['winning_moves'] == 0
+
+    # O must answer X's opposite corners on an edge; the medium bot always
+    # takes a corner there
+    corners = mapped.lookup(parse_board('X...O...X'))
+    assert corners['outcome'] == 'draw'
+    assert corners['blunder_rate'] == {'easy': 0.3333, 'medium': 1.0, 'hard': 0.0}
+
+    won = mapped.lookup(parse_board('XXXOO....'))
+    assert won['game_over'] and won['outcome'] == 'loss' and won['player'] == 'O'
+    assert mapped.lookup(parse_board('XXXXOO...')) is None
+
+
+def test_stats_endpoint():
+    assert build_stats()
+    client = app_bot.app.test_client()
+    # X in a corner, O on an edge next to it: X can force a win
+    data = client.get('/stats?board=XO.......').get_json()
+    assert data['success'] and data['player'] == 'X'
+    assert data['outcome'] == 'win' and data['winning_moves'] > 0
+    assert data['blunder_rate']['hard'] == 0
+    assert data['board'] == ['X', 'O'] + [''] * 7
+
+    assert client.get('/stats?board=XX').status_code == 400
+    assert client.get('/stats?board=OO.......').status_code == 400
+
+
+def test_stats_endpoint_never_builds_the_file(monkeypatch, tmp_path):
+    path = tmp_path / 'missing.bin'
+    monkeypatch.setenv('TIKTACTOE_STATS_PATH', str(path))
+    monkeypatch.setattr(position_stats, '_stats', None)
+    client = app_bot.app.test_client()
+    assert client.get('/stats').status_code == 503
+    assert not path.exists()
+
+    # Until create_app() or the build command has made it
+    assert build_stats()
+    assert client.get('/stats').get_json()['outcome'] == 'draw'
@@ -0,0 +1,66 @@
+import io
+import json
+
+import app as app_module
+from app import TikTacToe
+from records import RecordWriter, export, iter_records
+
+
+def finished_game():
+    game = TikTacToe()
+    for position in (0, 3, 1, 4, 2):
+        game.make_move(position)
+    return game
+
+
+def test_records_round_trip(tmp_path):
+    path = tmp_path / 'games.bin'
+    writer = RecordWriter(str(path), batch_size=2, flush_interval=0.01)
+    for _ in range(5):
+        writer.submit(finished_game().get_record())
+    writer.close()
+
+    records = list(iter_records(path))
+    assert len(records) == 5
+    assert records[0]['moves'] == [0, 3, 1, 4, 2]
+    assert records[0]['winner'] == 'X'
+    assert records[0]['mode'] == 'human'
+    assert records[0]['difficulty'] is None
+
+
+def test_export_streams_csv_and_jsonl(tmp_path):
+    path = tmp_path / 'games.bin'
+    writer = RecordWriter(str(path))
+    writer.submit(finished_game().get_record())
+    writer.close()
+
+    out = io.StringIO()
+    export(path, 'csv', out)
+    header, row = out.getvalue().splitlines()
+    assert header.startswith('mode,size,win_length')
+    assert row.endswith(',0 3 1 4 2')
+
+    out = io.StringIO()
+    export(path, 'jsonl', out)
+    assert json.loads(out.getvalue())['winner'] == 'X'
+
+
+def test_a_finished_game_is_recorded_once(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(app_module, 'record_game', recorded.append)
+    client = app_module.app.test_client()
+    for position in (0, 3, 1, 4, 2):
+        client.post('/make_move', json={'game_id': 'once', 'position': position})
+    assert len(recorded) == 1
+
+    # Taking the winning move back and playing it again, by /redo or anew
+    for route in ('/undo', '/redo', '/undo'):
+        client.post(route, json={'game_id': 'once'})
+    client.post('/make_move', json={'game_id': 'once', 'position': 2})
+    assert len(recorded) == 1
+
+    # A reset starts a game of its own
+    client.post('/reset_game', json={'game_id': 'once'})
+    for position in (0, 3, 1, 4, 2):
+        client.post('/make_move', json={'game_id': 'once', 'position': position})
+    assert len(recorded) == 2 and recorded[1]['moves'] == bytes([0, 3, 1, 4, 2])
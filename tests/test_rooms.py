@@ -0,0 +1,65 @@
+import asyncio
+import json
+
+import rooms
+
+
+async def call(port, method, path, payload=None):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps(payload).encode() if payload is not None else b''
+    writer.write(f'{method} {path} HTTP/1.1\r\nHost: test\r\n'
+                 f'Content-Length: {len(body)}\r\n\r\n'.encode() + body)
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(body) if body else None
+
+
+async def next_event(reader):
+    while True:
+        block = await asyncio.wait_for(reader.readuntil(b'\n\n'), 5)
+        if block.startswith(b'id:'):
+            return json.loads(block.split(b'data: ', 1)[1])
+
+
+async def play():
+    started = asyncio.get_running_loop().create_future()
+    task = asyncio.create_task(rooms.serve('127.0.0.1', 0, lambda server, room_server:
+                                           started.set_result(server)))
+    server = await started
+    port = server.sockets[0].getsockname()[1]
+    try:
+        _, created = await call(port, 'POST', '/rooms')
+        room = f"/rooms/{created['room_id']}"
+
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(f'GET {room}/events HTTP/1.1\r\nHost: test\r\n\r\n'.encode())
+        head = await reader.readuntil(b'\r\n\r\n')
+        assert b'text/event-stream' in head
+        assert (await next_event(reader))['version'] == 0
+
+        _, x = await call(port, 'POST', f'{room}/join')
+        _, o = await call(port, 'POST', f'{room}/join')
+        _, watcher = await call(port, 'POST', f'{room}/join')
+        assert (x['player'], o['player'], watcher['player']) == ('X', 'O', None)
+        _, again = await call(port, 'POST', f'{room}/join', {'token': o['token']})
+        assert again['player'] == 'O'
+
+        status, _ = await call(port, 'POST', f'{room}/move', {'token': o['token'], 'position': 0})
+        assert status == 409
+        status, _ = await call(port, 'POST', f'{room}/move', {'token': 'nope', 'position': 0})
+        assert status == 403
+        status, moved = await call(port, 'POST', f'{room}/move', {'token': x['token'], 'position': 4})
+        assert status == 200
+
+        events = [await next_event(reader) for _ in range(3)]
+        assert events[-1] == moved['room']
+        assert events[-1]['game_state']['board'][4] == 'X'
+        assert events[-1]['game_state']['current_player'] == 'O'
+        writer.close()
+    finally:
+        task.cancel()
+
+
+def test_moves_are_pushed_to_event_streams():
+    asyncio.run(play())
@@ -0,0 +1,53 @@
+import re
+
+import bot_tables
+import server
+
+
+def test_both_games_are_served_under_their_prefixes():
+    client = server.create_app().test_client()
+    assert client.get('/ready').get_json() == {'status': 'ready'}
+    assert client.get('/').status_code == 200
+
+    human = client.post('/human/reset_game', json={'game_id': 'server-human'}).get_json()
+    assert human['game_state']['current_player'] == 'X'
+    move = client.post('/human/make_move', json={'game_id': 'server-human', 'position': 4})
+    assert move.get_json()['game_state']['board'][4] == 'X'
+
+    client.post('/bot/reset_game', json={'game_id': 'server-bot', 'difficulty': 'hard'})
+    reply = client.post('/bot/make_move', json={'game_id': 'server-bot', 'position': 4})
+    assert reply.get_json()['game_state']['board'].count('O') == 1
+
+    # The same id names a different game in each mode
+    state = client.get('/human/get_game_state?game_id=server-bot').get_json()
+    assert state['board'] == [''] * 9
+    assert client.get('/make_move').status_code == 404
+
+
+def test_pages_load_their_assets_under_the_prefix():
+    client = server.create_app().test_client()
+    html = client.get('/bot/').get_data(as_text=True)
+    names = re.findall(r'"assets/(bot\.[0-9a-f]{8}\.(?:css|js))', html)
+    assert len(names) == 2
+    for name in names:
+        assert client.get(f'/bot/assets/{name}').status_code == 200
+    assert client.get(f'/human/assets/{names[0]}').status_code == 404
+
+
+def test_bot_tables_wait_for_the_first_bot_move(monkeypatch):
+    monkeypatch.setattr(bot_tables, '_tables', None)
+    client = server.create_app().test_client()
+    client.get('/bot/')
+    client.post('/human/make_move', json={'game_id': 'lazy-human', 'position': 0})
+    client.post('/bot/reset_game', json={'game_id': 'lazy-bot', 'difficulty': 'hard'})
+    assert bot_tables._tables is None
+
+    client.post('/bot/make_move', json={'game_id': 'lazy-bot', 'position': 0})
+    assert bot_tables._tables is not None
+
+
+def test_metrics_keep_route_labels_without_the_blueprint():
+    client = server.create_app().test_client()
+    client.post('/human/make_move', json={'game_id': 'server-metrics', 'position': 0})
+    text = client.get('/metrics').get_data(as_text=True)
+    assert 'mode="human",route="make_move",method="POST",status="200"' in text
@@ -0,0 +1,99 @@
+import pytest
+
+import app as app_module
+from app import TikTacToe
+from app_bot import TikTacToeBot
+from learned_policy import DIFFICULTIES as LEARNED_DIFFICULTIES
+from state_store import (GameConflict, RedisClient, SharedGameStore, decode_game,
+                         encode_game)
+
+
+def test_games_round_trip_through_bytes():
+    game = TikTacToe(size=4)
+    for position in (5, 0, 10):
+        game.make_move(position)
+    game.undo()
+    data = encode_game(game)
+    assert len(data) == 37
+    copy = decode_game(data, TikTacToe)
+    assert copy.get_game_state() == game.get_game_state()
+    assert copy.moves == game.moves and copy.redo_moves == bytearray([10])
+    assert copy.rewind_version == game.rewind_version == 4
+
+    bot = TikTacToeBot('hard', 'O')
+    bot.make_bot_move()
+    bot.bot_ready_at = 123.5
+    copy = decode_game(encode_game(bot), TikTacToeBot)
+    assert (copy.difficulty, copy.human_player, copy.bot_player) == ('hard', 'O', 'X')
+    assert copy.last_bot_move == bot.last_bot_move
+    assert copy.bot_ready_at == 123.5 and copy.move_count == 1
+    with pytest.raises(ValueError):
+        decode_game(encode_game(bot), TikTacToe)
+
+
+def test_every_difficulty_round_trips():
+    for difficulty in ('easy', 'medium', 'hard') + LEARNED_DIFFICULTIES:
+        game = decode_game(encode_game(TikTacToeBot(difficulty)), TikTacToeBot)
+        assert game.difficulty == difficulty
+
+
+def test_workers_share_games_and_conflicts_are_refused(redis_url):
+    first = SharedGameStore(TikTacToe, RedisClient(redis_url), 'test')
+    second = SharedGameStore(TikTacToe, RedisClient(redis_url), 'test')
+    with first.checkout('g') as game:
+        game.make_move(4)
+    with second.checkout('g') as game:
+        assert game.board.cell(4) == 'X'
+        game.make_move(0)
+
+    # The cached copy is only used while it matches what the server holds
+    with first.checkout('g') as game:
+        assert game.board.cell(0) == 'O'
+
+    with pytest.raises(GameConflict):
+        with first.checkout('g') as game:
+            with second.checkout('g') as other:
+                other.make_move(8)
+            game.make_move(2)
+    assert first.conflicts == 1
+    with first.checkout('g') as game:
+        assert game.board.cell(8) == 'X' and game.board.is_empty(2)
+
+
+def test_app_on_shared_store(monkeypatch, redis_url):
+    games = SharedGameStore(TikTacToe, RedisClient(redis_url), 'tiktactoe:human')
+    monkeypatch.setattr(app_module, 'games', games)
+    client = app_module.app.test_client()
+    client.post('/make_move', json={'game_id': 'shared', 'position': 4})
+
+    # Another worker, with nothing cached, sees the move
+    monkeypatch.setattr(app_module, 'games', SharedGameStore(
+        TikTacToe, RedisClient(redis_url), 'tiktactoe:human'))
+    state = client.get('/get_game_state?game_id=shared').get_json()
+    assert state['board'][4] == 'X' and state['version'] == 1
+
+
+def test_refused_move_is_neither_counted_nor_recorded(monkeypatch, redis_url):
+    games = SharedGameStore(TikTacToe, RedisClient(redis_url), 'tiktactoe:human')
+    monkeypatch.setattr(app_module, 'games', games)
+    client = app_module.app.test_client()
+    for position in (0, 3, 1, 4):
+        client.post('/make_move', json={'game_id': 'race', 'position': position})
+
+    counted, recorded = [], []
+    monkeypatch.setattr(app_module, 'record_move', lambda *args: counted.append(args))
+    monkeypatch.setattr(app_module, 'record_game', recorded.append)
+    other = SharedGameStore(TikTacToe, RedisClient(redis_url), 'tiktactoe:human')
+    make_move = TikTacToe.make_move
+
+    def racing_make_move(self, position):
+        # Another worker resets the game while this move is being made
+        with other.checkout('race') as game:
+            game.reset_game()
+        return make_move(self, position)
+
+    monkeypatch.setattr(TikTacToe, 'make_move', racing_make_move)
+    # The winning move, had it been saved
+    response = client.post('/make_move', json={'game_id': 'race', 'position': 2})
+    assert response.status_code == 409
+    assert counted == [] and recorded == []
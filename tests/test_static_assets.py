@@ -0,0 +1,39 @@
+import gzip
+import re
+
+import app
+import app_bot
+
+
+def test_page_points_at_versioned_assets():
+    client = app_bot.app.test_client()
+    page = client.get('/', headers={'Accept-Encoding': 'identity'})
+    assert page.headers['Cache-Control'] == 'no-cache'
+    assert 'Content-Encoding' not in page.headers
+
+    html = page.get_data(as_text=True)
+    names = re.findall(r'"assets/(bot\.[0-9a-f]{8}\.(?:css|js))', html)
+    assert len(names) == 2
+
+    for name in names:
+        asset = client.get(f'/assets/{name}')
+        assert asset.status_code == 200
+        assert asset.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+    assert client.get('/assets/bot.css').status_code == 404
+
+
+def test_page_is_compressed_and_revalidated():
+    client = app.app.test_client()
+    plain = client.get('/', headers={'Accept-Encoding': 'identity'}).get_data()
+    zipped = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert zipped.headers['Vary'] == 'Accept-Encoding'
+    assert gzip.decompress(zipped.get_data()) == plain
+    assert len(zipped.get_data()) < len(plain)
+
+    again = client.get('/', headers={'Accept-Encoding': 'gzip',
+                                     'If-None-Match': zipped.headers['ETag']})
+    assert again.status_code == 304
+    assert again.get_data() == b''
+    changed = client.get('/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': '"old"'})
+    assert changed.status_code == 200
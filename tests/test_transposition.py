@@ -0,0 +1,39 @@
+from engine import Board
+from transposition import (SYMMETRIES, TranspositionTable, canonicalize,
+                           from_canonical_mask, to_canonical_move)
+
+
+def transformed(board, perm):
+    cells = [''] * 9
+    for i, cell in enumerate(board.to_list()):
+        cells[perm[i]] = cell
+    return Board.from_list(cells)
+
+
+def test_symmetric_positions_share_a_key():
+    board = Board.from_list(['X', 'O', '', '', 'X', '', '', '', ''])
+    keys = set()
+    for perm in SYMMETRIES:
+        image = transformed(board, perm)
+        keys.add(canonicalize(image.x, image.o)[0])
+    assert len(SYMMETRIES) == 8
+    assert len(keys) == 1
+
+
+def test_moves_map_back_to_real_orientation():
+    board = Board.from_list(['', '', 'X', '', 'O', '', '', '', ''])
+    key, symmetry = canonicalize(board.x, board.o)
+    canonical = Board.from_key(key)
+    for move in board.available_moves():
+        assert canonical.is_empty(to_canonical_move(move, symmetry))
+        assert from_canonical_mask(1 << to_canonical_move(move, symmetry), symmetry) == 1 << move
+
+
+def test_table_is_bounded_and_counts():
+    table = TranspositionTable(max_entries=2)
+    for key in 'abc':
+        table.put(key, key.upper())
+    assert len(table) == 2
+    assert table.get('a') is None
+    assert table.get('c') == 'C'
+    assert table.stats() == {'entries': 2, 'max_entries': 2, 'hits': 1, 'misses': 1}
@@ -0,0 +1,115 @@
+"""Symmetry-aware transposition table shared by the bot's move logic
+
+A tic-tac-toe position looks the same under the eight rotations and
+reflections of the board, so results are cached under the canonical form of
+the position: the smallest packed key (see ``engine.Board.key``) over all
+eight symmetries. Moves and cell masks are stored in canonical orientation
+and mapped back to the real board on the way out.
+"""
+import os
+import threading
+
+# SYMMETRIES[s][i] is where cell i ends up under symmetry s
+_ROTATE = (6, 3, 0, 7, 4, 1, 8, 5, 2)
+_MIRROR = (2, 1, 0, 5, 4, 3, 8, 7, 6)
+
+
+def _compose(first, then):
+    return tuple(then[first[i]] for i in range(9))
+
+
+def _build_symmetries():
+    symmetries = []
+    perm = tuple(range(9))
+    for _ in range(4):
+        symmetries.append(perm)
+        symmetries.append(_compose(perm, _MIRROR))
+        perm = _compose(perm, _ROTATE)
+    return tuple(symmetries)
+
+
+SYMMETRIES = _build_symmetries()
+INVERSE_SYMMETRIES = tuple(
+    SYMMETRIES.index(tuple(perm.index(i) for i in range(9))) for perm in SYMMETRIES
+)
+
+# _MASK_TRANSFORMS[s][mask] is mask with every cell moved by symmetry s
+_MASK_TRANSFORMS = tuple(
+    tuple(sum(1 << perm[i] for i in range(9) if mask >> i & 1) for mask in range(512))
+    for perm in SYMMETRIES
+)
+
+
+def canonicalize(first, second):
+    """Canonical packed key of a pair of masks, and the symmetry that gives it"""
+    best_key = None
+    best_symmetry = 0
+    for s, transform in enumerate(_MASK_TRANSFORMS):
+        key = transform[first] | (transform[second] << 9)
+        if best_key is None or key < best_key:
+            best_key = key
+            best_symmetry = s
+    return best_key, best_symmetry
+
+
+def to_canonical_move(move, symmetry):
+    return SYMMETRIES[symmetry][move]
+
+
+def from_canonical_mask(mask, symmetry):
+    """Map a mask of cells from canonical orientation back to the real board"""
+    return _MASK_TRANSFORMS[INVERSE_SYMMETRIES[symmetry]][mask]
+
+
+class TranspositionTable:
+    """Bounded cache with hit and miss counters.
+
+    Lookups take no lock. Once full, the oldest entries are dropped first, so
+    memory stays flat in long-running workers.
+    """
+
+    def __init__(self, max_entries=200000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def put(self, key, value):
+        with self._lock:
+            entries = self._entries
+            if key not in entries:
+                while entries and len(entries) >= self.max_entries:
+                    del entries[next(iter(entries))]
+            entries[key] = value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+
+# One table per process, shared by every game and difficulty
+TRANSPOSITIONS = TranspositionTable(
+    int(os.environ.get('TIKTACTOE_TT_SIZE', 200000))
+)